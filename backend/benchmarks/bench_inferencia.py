@@ -0,0 +1,245 @@
+"""
+Benchmark de inferencia del modelo fine-tuned (fineTuning/modelo_final).
+
+Recorre la matriz motor × max_length × hilos de PyTorch × tamaño de lote y mide
+textos/seg y latencia p50/p95 por lote. Además calcula la exactitud (accuracy)
+de cada combinación motor × max_length sobre
+fineTuning/dataset_balanceado_3000_for_finetuning.json.
+
+Motores:
+    pipeline  transformers.pipeline("sentiment-analysis"), igual que el backend.
+    directo   tokenizer + modelo en torch.inference_mode(), sin la capa de pipeline.
+    pretokenizado  como 'directo', pero con los ids calculados de antemano (pretokenizado.py);
+                   la diferencia con 'directo' es el tiempo de tokenización que se ahorra.
+
+El reporte se guarda en JSON para comparar la relación velocidad/exactitud entre
+ejecuciones (hardware, versión de torch, modelo).
+
+Uso (desde la carpeta backend):
+
+    python benchmarks/bench_inferencia.py --salida benchmarks/reporte_inferencia.json
+    python benchmarks/bench_inferencia.py --lotes 1,16 --hilos 1,4 --max-length 64,128 --num-textos 128
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import torch
+import transformers
+from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from pretokenizado import lote_de_tensores  # noqa: E402
+MODEL_DIR = os.path.join(BACKEND_DIR, "..", "fineTuning", "modelo_final")
+RUTA_DATASET = os.path.join(BACKEND_DIR, "..", "fineTuning", "dataset_balanceado_3000_for_finetuning.json")
+
+ETIQUETAS_DATASET = {"negative": "NEG", "neutral": "NEU", "positive": "POS"}
+
+
+def normalizar_etiqueta(label):
+    """Misma normalización de etiquetas que aplica el backend a la salida del modelo."""
+    return label.upper().replace("NEGATIVE", "NEG").replace("POSITIVE", "POS").replace("NEUTRAL", "NEU")
+
+
+def cargar_dataset(ruta):
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    return [(d["text"], ETIQUETAS_DATASET[d["label"]]) for d in datos if d.get("label") in ETIQUETAS_DATASET]
+
+
+# --------------------------------------------------------------------------------------
+# Motores de inferencia: cada uno devuelve una función textos -> etiquetas
+# --------------------------------------------------------------------------------------
+def crear_motor_pipeline(modelo_dir, max_length):
+    pipe = pipeline("sentiment-analysis", model=modelo_dir, device=-1, truncation=True, max_length=max_length)
+
+    def predecir(textos):
+        salida = pipe(textos, batch_size=len(textos), truncation=True, max_length=max_length)
+        return [normalizar_etiqueta(r["label"]) for r in salida]
+
+    return predecir
+
+
+def crear_motor_directo(modelo_dir, max_length):
+    tokenizer = AutoTokenizer.from_pretrained(modelo_dir)
+    modelo = AutoModelForSequenceClassification.from_pretrained(modelo_dir)
+    modelo.eval()
+    id2label = modelo.config.id2label
+
+    def predecir(textos):
+        entradas = tokenizer(textos, padding=True, truncation=True, max_length=max_length, return_tensors="pt")
+        with torch.inference_mode():
+            logits = modelo(**entradas).logits
+        return [normalizar_etiqueta(id2label[int(i)]) for i in logits.argmax(dim=-1)]
+
+    return predecir
+
+
+def crear_motor_pretokenizado(modelo_dir, max_length, textos):
+    tokenizer = AutoTokenizer.from_pretrained(modelo_dir)
+    modelo = AutoModelForSequenceClassification.from_pretrained(modelo_dir)
+    modelo.eval()
+    id2label = modelo.config.id2label
+    pad_id = tokenizer.pad_token_id or 0
+
+    # Tokenización offline (fuera de la medición), como el archivo de pretokenizado.py
+    codificados = tokenizer(textos, truncation=True, max_length=max_length)["input_ids"]
+    ids_por_texto = {t: np.array(ids, dtype=np.int64) for t, ids in zip(textos, codificados)}
+
+    def predecir(lote):
+        input_ids, attention_mask = lote_de_tensores([ids_por_texto[t] for t in lote], pad_id)
+        with torch.inference_mode():
+            logits = modelo(input_ids=input_ids, attention_mask=attention_mask).logits
+        return [normalizar_etiqueta(id2label[int(i)]) for i in logits.argmax(dim=-1)]
+
+    return predecir
+
+
+MOTORES = {
+    "pipeline": crear_motor_pipeline,
+    "directo": crear_motor_directo,
+    "pretokenizado": crear_motor_pretokenizado,
+}
+
+
+# --------------------------------------------------------------------------------------
+# Medición
+# --------------------------------------------------------------------------------------
+def percentil(valores, p):
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1]
+
+
+def medir_rendimiento(predecir, textos, lote):
+    """Procesa 'textos' en lotes; devuelve textos/seg y latencias p50/p95 por lote (ms)."""
+    predecir(textos[:lote])  # calentamiento
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(0, len(textos), lote):
+        t0 = time.perf_counter()
+        predecir(textos[i:i + lote])
+        latencias.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - inicio
+    return {
+        "textos_por_seg": round(len(textos) / total, 2),
+        "latencia_p50_ms": round(percentil(latencias, 50), 2),
+        "latencia_p95_ms": round(percentil(latencias, 95), 2),
+    }
+
+
+def medir_exactitud(predecir, dataset, lote=32):
+    aciertos = 0
+    for i in range(0, len(dataset), lote):
+        bloque = dataset[i:i + lote]
+        predichas = predecir([texto for texto, _ in bloque])
+        aciertos += sum(p == esperada for p, (_, esperada) in zip(predichas, bloque))
+    return round(aciertos / len(dataset), 4) if dataset else None
+
+
+def ejecutar(args):
+    dataset = cargar_dataset(args.dataset)
+    aleatorio = random.Random(42)
+    textos = [t for t, _ in aleatorio.sample(dataset, min(args.num_textos, len(dataset)))]
+    dataset_exactitud = dataset if not args.max_exactitud else dataset[:args.max_exactitud]
+
+    reporte = {
+        "metadatos": {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "modelo": os.path.abspath(args.modelo),
+            "dataset": os.path.abspath(args.dataset),
+            "num_textos_rendimiento": len(textos),
+            "num_textos_exactitud": len(dataset_exactitud),
+            "torch": torch.__version__,
+            "transformers": transformers.__version__,
+            "cpu": platform.processor() or platform.machine(),
+            "nucleos": os.cpu_count(),
+        },
+        "rendimiento": [],
+        "exactitud": [],
+    }
+
+    for nombre_motor in args.motores:
+        for max_length in args.max_length:
+            if nombre_motor == "pretokenizado":
+                predecir = crear_motor_pretokenizado(args.modelo, max_length, [t for t, _ in dataset])
+            else:
+                predecir = MOTORES[nombre_motor](args.modelo, max_length)
+
+            if not args.sin_exactitud:
+                exactitud = medir_exactitud(predecir, dataset_exactitud)
+                reporte["exactitud"].append({"motor": nombre_motor, "max_length": max_length, "accuracy": exactitud})
+                print(f"[{nombre_motor} max_length={max_length}] accuracy={exactitud}")
+
+            for hilos in args.hilos:
+                torch.set_num_threads(hilos)
+                for lote in args.lotes:
+                    resultado = medir_rendimiento(predecir, textos, lote)
+                    fila = {"motor": nombre_motor, "max_length": max_length, "hilos": hilos, "lote": lote, **resultado}
+                    reporte["rendimiento"].append(fila)
+                    print(
+                        f"[{nombre_motor} max_length={max_length} hilos={hilos} lote={lote}] "
+                        f"{resultado['textos_por_seg']} textos/s p50={resultado['latencia_p50_ms']}ms "
+                        f"p95={resultado['latencia_p95_ms']}ms"
+                    )
+
+    reporte["ahorro_pretokenizado"] = resumir_ahorro(reporte["rendimiento"])
+    for fila in reporte["ahorro_pretokenizado"]:
+        print(
+            f"[ahorro pretokenizado max_length={fila['max_length']} hilos={fila['hilos']} lote={fila['lote']}] "
+            f"{fila['porcentaje_tiempo_ahorrado']}% del tiempo de inferencia"
+        )
+    return reporte
+
+
+def resumir_ahorro(rendimiento):
+    """Porcentaje del tiempo de 'directo' que se ahorra con 'pretokenizado' en cada configuración."""
+    directo = {(f["max_length"], f["hilos"], f["lote"]): f for f in rendimiento if f["motor"] == "directo"}
+    resumen = []
+    for fila in rendimiento:
+        clave = (fila["max_length"], fila["hilos"], fila["lote"])
+        if fila["motor"] != "pretokenizado" or clave not in directo:
+            continue
+        ahorro = 1 - directo[clave]["textos_por_seg"] / fila["textos_por_seg"]
+        resumen.append({
+            "max_length": clave[0], "hilos": clave[1], "lote": clave[2],
+            "porcentaje_tiempo_ahorrado": round(ahorro * 100, 1),
+        })
+    return resumen
+
+
+def _lista_enteros(valor):
+    return [int(v) for v in valor.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia del modelo de sentimiento.")
+    parser.add_argument("--modelo", default=MODEL_DIR)
+    parser.add_argument("--dataset", default=RUTA_DATASET)
+    parser.add_argument("--motores", default=",".join(MOTORES), help=f"Motores separados por coma ({', '.join(MOTORES)}).")
+    parser.add_argument("--lotes", type=_lista_enteros, default=[1, 8, 32])
+    parser.add_argument("--hilos", type=_lista_enteros, default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--max-length", type=_lista_enteros, default=[64, 128, 256])
+    parser.add_argument("--num-textos", type=int, default=256, help="Textos usados para medir rendimiento.")
+    parser.add_argument("--max-exactitud", type=int, default=None, help="Limitar los textos usados para la exactitud.")
+    parser.add_argument("--sin-exactitud", action="store_true")
+    parser.add_argument("--salida", default=None, help="Ruta del reporte JSON.")
+    args = parser.parse_args()
+    args.motores = [m for m in args.motores.split(",") if m]
+
+    reporte = ejecutar(args)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"\nReporte guardado en '{args.salida}'")
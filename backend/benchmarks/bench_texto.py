@@ -0,0 +1,219 @@
+"""
+Microbenchmarks de las funciones de texto del backend (rutas calientes de /analizar).
+
+Mide operaciones por segundo y memoria pico (tracemalloc) de:
+    es_insulto, normalizar_palabra, analizar_texto_con_diccionario,
+    limpiar_texto_para_wordcloud, filtrar_por_diccionario y el filtrado por fechas
+sobre el corpus real (data/corpus_completo.json) y un corpus sintético escalado (x100).
+
+Uso (desde la carpeta backend):
+
+    python benchmarks/bench_texto.py                                  # solo mostrar resultados
+    python benchmarks/bench_texto.py --guardar-base benchmarks/base_texto.json
+    python benchmarks/bench_texto.py --comparar benchmarks/base_texto.json --umbral 0.15
+
+Con --comparar, el proceso termina con código 1 si algún caso es más lento
+(ops/seg) o usa más memoria que la base por encima del umbral relativo.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.append(os.path.join(BACKEND_DIR, "..", "webScraping"))
+
+import main  # noqa: E402
+
+RUTA_CORPUS = os.path.join(BACKEND_DIR, "data", "corpus_completo.json")
+
+_temporales = []
+
+
+# --------------------------------------------------------------------------------------
+# Datos de entrada
+# --------------------------------------------------------------------------------------
+def cargar_corpus_real():
+    with open(RUTA_CORPUS, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def escalar_corpus(corpus, factor):
+    """Replica el corpus 'factor' veces con ids nuevos y fechas desplazadas (para que el filtro de fechas discrimine)."""
+    if factor == 1:
+        return corpus
+    escalado = []
+    for copia in range(factor):
+        for post in corpus:
+            nuevo = dict(post)
+            nuevo["id_post"] = len(escalado) + 1
+            fecha = post.get("fecha")
+            if fecha and copia:
+                try:
+                    dt = datetime.fromisoformat(fecha.replace('Z', '+00:00')) - timedelta(days=copia)
+                    nuevo["fecha"] = dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                except ValueError:
+                    pass
+            escalado.append(nuevo)
+    return escalado
+
+
+def extraer_textos(corpus):
+    textos = []
+    for post in corpus:
+        if post.get("texto"):
+            textos.append(post["texto"])
+        for com in post.get("comentarios", []):
+            if com.get("texto_comentario"):
+                textos.append(com["texto_comentario"])
+    return textos
+
+
+# --------------------------------------------------------------------------------------
+# Medición
+# --------------------------------------------------------------------------------------
+def medir(funcion, operaciones, tiempo_minimo, repeticiones):
+    """
+    Ejecuta 'funcion' (que procesa 'operaciones' elementos por llamada) hasta cubrir
+    tiempo_minimo, 'repeticiones' veces; devuelve la mejor tasa y la memoria pico de una llamada.
+    """
+    funcion()  # calentamiento (cachés de regex, imports perezosos)
+
+    mejor = 0.0
+    for _ in range(repeticiones):
+        llamadas = 0
+        inicio = time.perf_counter()
+        while True:
+            funcion()
+            llamadas += 1
+            transcurrido = time.perf_counter() - inicio
+            if transcurrido >= tiempo_minimo:
+                break
+        mejor = max(mejor, llamadas * operaciones / transcurrido)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ops_por_seg": round(mejor, 1), "memoria_pico_kib": round(pico / 1024, 1)}
+
+
+def casos_de_prueba(corpus, max_elementos):
+    """Devuelve (nombre, funcion, operaciones por llamada) para un corpus dado."""
+    aleatorio = random.Random(42)
+    textos = extraer_textos(corpus)
+    muestra_textos = textos if len(textos) <= max_elementos else aleatorio.sample(textos, max_elementos)
+    palabras = [p for t in muestra_textos for p in re.findall(r'\b\w+\b', t.lower())]
+    palabras = palabras if len(palabras) <= max_elementos else aleatorio.sample(palabras, max_elementos)
+
+    desde = main.parse_date("2024-09-01")
+    hasta = main.parse_date("2025-02-28", is_end=True)
+
+    casos = [
+        ("es_insulto", lambda: [main.es_insulto(p) for p in palabras], len(palabras)),
+        ("normalizar_palabra", lambda: [main.normalizar_palabra(p) for p in palabras], len(palabras)),
+        ("analizar_texto_con_diccionario",
+         lambda: [main.analizar_texto_con_diccionario(t, "NEU", 0.6) for t in muestra_textos], len(muestra_textos)),
+        ("limpiar_texto_para_wordcloud",
+         lambda: [main.limpiar_texto_para_wordcloud(t) for t in muestra_textos], len(muestra_textos)),
+        ("filtrar_por_diccionario",
+         lambda: main.filtrar_por_diccionario(muestra_textos, "NEU"), len(muestra_textos)),
+        ("filtrar_fechas",
+         lambda: main.filtrar_publicaciones(corpus, "a", desde, hasta), len(corpus)),
+    ]
+
+    # Filtrado sobre el corpus columnar mapeado (si pyarrow está disponible)
+    if main.abrir_corpus_mapeado:
+        from preprocessing.convertir_corpus_columnar import convertir_json_a_columnar
+        temporal = tempfile.TemporaryDirectory(prefix="bench_corpus_")
+        _temporales.append(temporal)  # se borra al terminar el proceso
+        carpeta = temporal.name
+        ruta_json = os.path.join(carpeta, "corpus.json")
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            json.dump(corpus, f, ensure_ascii=False)
+        convertir_json_a_columnar(ruta_json, carpeta)
+        mapeado = main.abrir_corpus_mapeado(carpeta)
+        casos.append(("filtrar_fechas_mapeado",
+                      lambda: main.filtrar_publicaciones(mapeado, "a", desde, hasta), len(corpus)))
+
+    return casos
+
+
+def ejecutar(escalas, max_elementos, tiempo_minimo, repeticiones, filtro=None):
+    corpus_real = cargar_corpus_real()
+    resultados = {}
+    for factor in escalas:
+        corpus = escalar_corpus(corpus_real, factor)
+        etiqueta = f"x{factor}"
+        print(f"\n=== Corpus {etiqueta}: {len(corpus)} publicaciones ===")
+        for nombre, funcion, operaciones in casos_de_prueba(corpus, max_elementos):
+            if filtro and filtro not in nombre:
+                continue
+            # El filtrado por fecha imprime una línea por llamada; se silencia durante la medición
+            with open(os.devnull, "w") as nulo:
+                salida, sys.stdout = sys.stdout, nulo
+                try:
+                    resultado = medir(funcion, operaciones, tiempo_minimo, repeticiones)
+                finally:
+                    sys.stdout = salida
+            resultados.setdefault(nombre, {})[etiqueta] = resultado
+            print(f"{nombre:<34} {resultado['ops_por_seg']:>14,.1f} ops/s {resultado['memoria_pico_kib']:>12,.1f} KiB")
+    return resultados
+
+
+def comparar(resultados, base, umbral):
+    """Compara con la base guardada; devuelve la lista de regresiones encontradas."""
+    regresiones = []
+    print(f"\n=== Comparación con la base (umbral {umbral:.0%}) ===")
+    for nombre, por_escala in resultados.items():
+        for escala, actual in por_escala.items():
+            previo = base.get(nombre, {}).get(escala)
+            if not previo:
+                continue
+            ratio_velocidad = actual["ops_por_seg"] / previo["ops_por_seg"] if previo["ops_por_seg"] else 1.0
+            ratio_memoria = actual["memoria_pico_kib"] / previo["memoria_pico_kib"] if previo["memoria_pico_kib"] else 1.0
+            estado = "OK"
+            if ratio_velocidad < 1 - umbral:
+                estado = "REGRESIÓN (velocidad)"
+                regresiones.append((nombre, escala, "velocidad", ratio_velocidad))
+            elif ratio_memoria > 1 + umbral:
+                estado = "REGRESIÓN (memoria)"
+                regresiones.append((nombre, escala, "memoria", ratio_memoria))
+            print(f"{nombre:<34} {escala:>5} velocidad x{ratio_velocidad:.2f} memoria x{ratio_memoria:.2f}  {estado}")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks de las funciones de texto del backend.")
+    parser.add_argument("--escalas", default="1,100", help="Factores de escala del corpus, separados por coma.")
+    parser.add_argument("--max-elementos", type=int, default=20000, help="Máximo de textos/palabras por caso.")
+    parser.add_argument("--tiempo-minimo", type=float, default=0.5, help="Segundos mínimos por repetición.")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--caso", default=None, help="Ejecutar solo los casos cuyo nombre contenga este texto.")
+    parser.add_argument("--guardar-base", default=None, help="Guardar los resultados como base en este JSON.")
+    parser.add_argument("--comparar", default=None, help="Comparar con una base guardada previamente.")
+    parser.add_argument("--umbral", type=float, default=0.15, help="Regresión relativa tolerada (0.15 = 15%%).")
+    args = parser.parse_args()
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    resultados = ejecutar(escalas, args.max_elementos, args.tiempo_minimo, args.repeticiones, args.caso)
+
+    if args.guardar_base:
+        with open(args.guardar_base, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\nBase guardada en '{args.guardar_base}'")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        if comparar(resultados, base, args.umbral):
+            sys.exit(1)
@@ -0,0 +1,287 @@
+"""
+Lectura del corpus en formato columnar (Arrow IPC).
+
+El corpus se guarda como dos tablas (publicaciones.arrow y comentarios.arrow)
+generadas por webScraping/preprocessing/convertir_corpus_columnar.py. Aquí solo
+se leen las columnas que usa la API, sin pasar por json.load.
+
+CorpusMapeado abre ambas tablas como memory-map de solo lectura: los textos,
+fechas e ids de candidato quedan en la caché de páginas del sistema operativo
+(una sola copia para todos los workers) y cada publicación o comentario se
+materializa como objeto Python solo cuando se consulta.
+
+El corpus puede estar dividido en segmentos de solo anexado (ver
+webScraping/preprocessing/segmentos_corpus.py): segmentos.json lista las
+subcarpetas con su propio par de tablas y aquí se leen todas como un solo corpus.
+Las filas de comentarios de un segmento que quedan después de los bloques de sus
+publicaciones son comentarios nuevos de publicaciones de segmentos anteriores y se
+agregan al final de los comentarios de esa publicación.
+"""
+
+import json
+
+import os
+from collections.abc import Mapping
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from metricas import registrar_cache
+
+ARCHIVO_PUBLICACIONES = "publicaciones.arrow"
+ARCHIVO_COMENTARIOS = "comentarios.arrow"
+ARCHIVO_SEGMENTOS = "segmentos.json"
+
+# Columnas que necesita /analizar y /salud (las columnas *_limpio no se cargan)
+COLUMNAS_PUBLICACION = ["id_post", "candidato", "usuario", "fecha", "texto"]
+COLUMNAS_COMENTARIO = ["id_post", "id_comentario", "texto_comentario"]
+
+
+def listar_segmentos(carpeta):
+    """Carpetas de los segmentos del corpus, en orden ("." es el corpus base)."""
+    ruta = os.path.join(carpeta, ARCHIVO_SEGMENTOS)
+    if os.path.isfile(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            return [os.path.join(carpeta, s) for s in json.load(f)["segmentos"]]
+    return [carpeta]
+
+
+def existe_corpus_columnar(carpeta):
+    """Indica si la carpeta contiene las dos tablas del corpus columnar (en todos sus segmentos)."""
+    if not os.path.isdir(carpeta):
+        return False
+    return all(
+        os.path.isfile(os.path.join(segmento, ARCHIVO_PUBLICACIONES))
+        and os.path.isfile(os.path.join(segmento, ARCHIVO_COMENTARIOS))
+        for segmento in listar_segmentos(carpeta)
+    )
+
+
+def leer_tabla(ruta, columnas):
+    """Lee solo las columnas indicadas de un archivo Arrow IPC mapeado en memoria."""
+    with pa.memory_map(ruta, "r") as fuente:
+        tabla = ipc.open_file(fuente).read_all()
+    disponibles = [c for c in columnas if c in tabla.column_names]
+    return tabla.select(disponibles)
+
+
+def cargar_corpus_columnar(carpeta, columnas_publicacion=None, columnas_comentario=None):
+    """
+    Carga el corpus columnar y lo devuelve con la misma forma que corpus_completo.json:
+    una lista de publicaciones, cada una con su lista de 'comentarios'.
+    """
+    columnas_publicacion = columnas_publicacion or COLUMNAS_PUBLICACION
+    columnas_comentario = columnas_comentario or COLUMNAS_COMENTARIO
+    if "id_post" not in columnas_comentario:
+        columnas_comentario = ["id_post"] + list(columnas_comentario)
+
+    # Los comentarios se unen a su publicación por id_post en todo el corpus: un
+    # segmento puede traer comentarios nuevos de publicaciones de otro anterior
+    corpus = []
+    comentarios_por_post = {}
+    for segmento in listar_segmentos(carpeta):
+        corpus.extend(leer_tabla(os.path.join(segmento, ARCHIVO_PUBLICACIONES), columnas_publicacion).to_pylist())
+        for com in leer_tabla(os.path.join(segmento, ARCHIVO_COMENTARIOS), columnas_comentario).to_pylist():
+            comentarios_por_post.setdefault(com.pop("id_post"), []).append(com)
+
+    for post in corpus:
+        post["comentarios"] = comentarios_por_post.get(post.get("id_post"), [])
+    return corpus
+
+
+# --------------------------------------------------------------------------------------
+# Corpus mapeado en memoria (zero-copy, compartido entre workers)
+# --------------------------------------------------------------------------------------
+class ComentarioMapeado(Mapping):
+    """Vista de solo lectura de un comentario; los valores se leen del memory-map al acceder."""
+    __slots__ = ("_corpus", "_fila")
+
+    def __init__(self, corpus, fila):
+        self._corpus = corpus
+        self._fila = fila
+
+    def __getitem__(self, clave):
+        return self._corpus.valor(self._corpus.comentarios, clave, self._fila)
+
+    def __iter__(self):
+        # Solo las columnas con valor en esta fila (los nulos son claves ausentes)
+        return iter([c for c in self._corpus.columnas_con_valor(self._corpus.comentarios, self._fila) if c != "id_post"])
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+
+class PublicacionMapeada(Mapping):
+    """Vista de solo lectura de una publicación con sus comentarios (como en corpus_completo.json)."""
+    __slots__ = ("_corpus", "_fila")
+
+    def __init__(self, corpus, fila):
+        self._corpus = corpus
+        self._fila = fila
+
+    def __getitem__(self, clave):
+        if clave == "comentarios":
+            return self._corpus.comentarios_de(self._fila)
+        if clave not in COLUMNAS_PUBLICACION:
+            raise KeyError(clave)
+        return self._corpus.valor(self._corpus.publicaciones, clave, self._fila)
+
+    def __iter__(self):
+        # Solo las columnas con valor en esta fila (los nulos son claves ausentes)
+        columnas = {c: self._corpus.publicaciones[c] for c in COLUMNAS_PUBLICACION if c in self._corpus.publicaciones}
+        return iter(self._corpus.columnas_con_valor(columnas, self._fila) + ["comentarios"])
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+
+class CorpusMapeado:
+    """
+    Corpus columnar mapeado en memoria. Se comporta como una secuencia de
+    publicaciones y además permite filtrar por query y fechas sin materializar
+    las publicaciones que no coinciden.
+    """
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.firma = firma_corpus_columnar(carpeta)
+
+        # Cada segmento se mapea por separado y las tablas se concatenan sin copiar los datos
+        tablas_pub, tablas_com = [], []
+        desplazamiento = 0
+        # id_post -> filas de comentarios agregados después de su bloque (en otro segmento)
+        filas_extra = {}
+        for segmento in listar_segmentos(carpeta):
+            tabla_pub = _abrir_tabla(os.path.join(segmento, ARCHIVO_PUBLICACIONES))
+            tabla_com = _abrir_tabla(os.path.join(segmento, ARCHIVO_COMENTARIOS))
+            for columna in ("fecha_ts", "inicio_comentarios", "num_comentarios"):
+                if columna not in tabla_pub.column_names:
+                    raise ValueError(f"El corpus columnar no tiene la columna '{columna}'; vuelva a convertirlo.")
+            cubiertos = pc.sum(tabla_pub.column("num_comentarios")).as_py() or 0
+            if tabla_com.num_rows > cubiertos:
+                ids_extra = tabla_com.column("id_post").slice(cubiertos).to_pylist()
+                for j, id_post in enumerate(ids_extra, start=desplazamiento + cubiertos):
+                    filas_extra.setdefault(id_post, []).append(j)
+            if desplazamiento:
+                # Los inicios de comentarios pasan a ser relativos a la tabla unida
+                indice = tabla_pub.schema.get_field_index("inicio_comentarios")
+                tabla_pub = tabla_pub.set_column(
+                    indice, "inicio_comentarios", pc.add(tabla_pub.column("inicio_comentarios"), desplazamiento)
+                )
+            desplazamiento += tabla_com.num_rows
+            tablas_pub.append(tabla_pub)
+            tablas_com.append(tabla_com)
+
+        tabla_pub = tablas_pub[0] if len(tablas_pub) == 1 else pa.concat_tables(tablas_pub, promote_options="default").unify_dictionaries()
+        tabla_com = tablas_com[0] if len(tablas_com) == 1 else pa.concat_tables(tablas_com, promote_options="default")
+
+        self.publicaciones = {c: tabla_pub.column(c) for c in tabla_pub.column_names}
+        self.comentarios = {c: tabla_com.column(c) for c in COLUMNAS_COMENTARIO if c in tabla_com.column_names}
+        self.num_publicaciones = tabla_pub.num_rows
+
+        # fila de la publicación -> filas de sus comentarios agregados en segmentos posteriores
+        self._comentarios_extra = {}
+        if filas_extra:
+            for fila, id_post in enumerate(self.publicaciones["id_post"].to_pylist()):
+                if id_post in filas_extra:
+                    self._comentarios_extra[fila] = filas_extra[id_post]
+
+    def __len__(self):
+        return self.num_publicaciones
+
+    def __getitem__(self, fila):
+        if not 0 <= fila < self.num_publicaciones:
+            raise IndexError(fila)
+        return PublicacionMapeada(self, fila)
+
+    def __iter__(self):
+        return (PublicacionMapeada(self, i) for i in range(self.num_publicaciones))
+
+    def valor(self, columnas, clave, fila):
+        """Lee un único valor; los nulos se tratan como clave ausente (igual que en el JSON)."""
+        if clave not in columnas:
+            raise KeyError(clave)
+        valor = columnas[clave][fila].as_py()
+        if valor is None:
+            raise KeyError(clave)
+        return valor
+
+    def columnas_con_valor(self, columnas, fila):
+        """Nombres de las columnas que no son nulas en la fila indicada."""
+        return [c for c, columna in columnas.items() if columna[fila].is_valid]
+
+    def comentarios_de(self, fila):
+        inicio = self.publicaciones["inicio_comentarios"][fila].as_py()
+        cantidad = self.publicaciones["num_comentarios"][fila].as_py()
+        filas = list(range(inicio, inicio + cantidad)) + self._comentarios_extra.get(fila, [])
+        return [ComentarioMapeado(self, j) for j in filas]
+
+    def filtrar(self, query, start_date=None, end_date=None):
+        """
+        Misma lógica que el filtrado de /analizar (query en candidato o texto y rango
+        de fechas), evaluada sobre las columnas con pyarrow.compute.
+        """
+        query = query.lower()
+
+        # El candidato está codificado como diccionario: se evalúa una vez por candidato distinto
+        candidatos = self.publicaciones["candidato"].combine_chunks()
+        coincide_candidato = pc.match_substring(
+            pc.utf8_lower(pc.replace_substring(candidatos.dictionary, "_", " ")), query
+        )
+        mascara = pc.fill_null(pc.take(coincide_candidato, candidatos.indices), False)
+
+        if "texto" in self.publicaciones:
+            coincide_texto = pc.match_substring(pc.utf8_lower(self.publicaciones["texto"]), query)
+            mascara = pc.or_(mascara, pc.fill_null(coincide_texto, False))
+
+        # Las publicaciones sin fecha válida (nulo) quedan fuera si se filtra por fecha
+        fechas = self.publicaciones["fecha_ts"]
+        tipo_fecha = fechas.type
+        if start_date:
+            mascara = pc.and_(mascara, pc.fill_null(pc.greater_equal(fechas, pa.scalar(start_date, tipo_fecha)), False))
+        if end_date:
+            mascara = pc.and_(mascara, pc.fill_null(pc.less_equal(fechas, pa.scalar(end_date, tipo_fecha)), False))
+
+        return [PublicacionMapeada(self, i) for i in pc.indices_nonzero(mascara).to_pylist()]
+
+    def rango_fechas(self):
+        """Fecha mínima y máxima del corpus en formato YYYY-MM-DD."""
+        extremos = pc.min_max(self.publicaciones["fecha_ts"]).as_py()
+        if extremos["min"] is None:
+            return None, None
+        return extremos["min"].strftime("%Y-%m-%d"), extremos["max"].strftime("%Y-%m-%d")
+
+
+def _abrir_tabla(ruta):
+    """Abre un archivo Arrow IPC como memory-map; las columnas apuntan al archivo sin copiarse."""
+    return ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+
+
+def archivos_corpus_columnar(carpeta):
+    """Rutas de todas las tablas del corpus (dos por segmento)."""
+    return [
+        os.path.join(segmento, nombre)
+        for segmento in listar_segmentos(carpeta)
+        for nombre in (ARCHIVO_PUBLICACIONES, ARCHIVO_COMENTARIOS)
+    ]
+
+
+def firma_corpus_columnar(carpeta):
+    """Fechas de modificación de la lista de segmentos y de todas las tablas; cambian con cada ingesta."""
+    rutas = [os.path.join(carpeta, ARCHIVO_SEGMENTOS)] + archivos_corpus_columnar(carpeta)
+    return tuple((ruta, os.stat(ruta).st_mtime_ns if os.path.exists(ruta) else None) for ruta in rutas)
+
+
+# Un único mapeo por proceso; se vuelve a abrir solo si los archivos cambian
+_corpus_mapeados = {}
+
+def abrir_corpus_mapeado(carpeta):
+    """Devuelve el CorpusMapeado de la carpeta, reutilizando el ya abierto si no cambió."""
+    corpus = _corpus_mapeados.get(carpeta)
+    acierto = corpus is not None and corpus.firma == firma_corpus_columnar(carpeta)
+    registrar_cache("corpus", acierto)
+    if not acierto:
+        corpus = CorpusMapeado(carpeta)
+        _corpus_mapeados[carpeta] = corpus
+    return corpus
@@ -0,0 +1,127 @@
+"""
+Lectura del corpus desde MongoDB (SENTIVOTE_ALMACENAMIENTO=mongo).
+
+La colección la llena webScraping/storage/mongodb_loader.py (un documento por
+publicación, con sus comentarios y el campo fecha_ts con la fecha parseada). En
+lugar de cargar todo el corpus en cada petición, /analizar envía la búsqueda y el
+rango de fechas a la base de datos y solo recibe las publicaciones que coinciden.
+
+- Un único MongoClient por proceso (el cliente mantiene su propio pool de
+  conexiones y es seguro entre hilos).
+- Índices en id_post, candidato, fecha_ts y un índice de texto sobre texto.
+- La query se evalúa con $regex (sin distinguir mayúsculas) en candidato y texto:
+  mismo resultado que el filtrado sobre el JSON. Con busqueda="texto" se usa el
+  índice de texto ($text), más rápido en colecciones grandes, pero busca palabras
+  completas (con stemming) en lugar de subcadenas.
+- Recorrer el corpus completo (puntuación en segundo plano) usa un cursor por lotes.
+"""
+
+import re
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+from metricas import registrar_cache
+
+# Campos que no se devuelven a la API
+PROYECCION = {"_id": 0, "fecha_ts": 0}
+DOCUMENTOS_POR_LOTE = 500
+# Colección con el contador de cargas que escribe mongodb_loader.py
+SUFIJO_VERSION = "_version"
+
+
+class CorpusMongo:
+    """
+    Corpus guardado en una colección de MongoDB. Ofrece la misma interfaz que
+    CorpusMapeado (len, iteración, filtrar y rango_fechas), así que main.py lo usa
+    sin cambios en las rutas.
+    """
+
+    def __init__(self, coleccion, busqueda="regex"):
+        self.coleccion = coleccion
+        self.versiones = coleccion.database[coleccion.name + SUFIJO_VERSION]
+        self.busqueda = busqueda
+        self.crear_indices()
+
+    def crear_indices(self):
+        """Crea los índices que usan las consultas (no hace nada si ya existen)."""
+        self.coleccion.create_index("id_post")
+        self.coleccion.create_index("candidato")
+        self.coleccion.create_index("fecha_ts")
+        self.coleccion.create_index([("texto", "text")], default_language="spanish")
+
+    def __len__(self):
+        return self.coleccion.estimated_document_count()
+
+    def __iter__(self):
+        return iter(self.coleccion.find({}, PROYECCION, batch_size=DOCUMENTOS_POR_LOTE).sort("id_post", ASCENDING))
+
+    def consulta(self, query, start_date=None, end_date=None):
+        """Filtro de MongoDB equivalente al filtrado de /analizar."""
+        if self.busqueda == "texto":
+            filtro = {"$text": {"$search": query}}
+        else:
+            patron = re.escape(query)
+            condiciones = [{"texto": {"$regex": patron, "$options": "i"}}]
+            # En candidato los "_" se comparan como espacios ("daniel noboa" -> "Daniel_Noboa")
+            if "_" not in query:
+                condiciones.append({"candidato": {"$regex": patron.replace("\\ ", "[ _]"), "$options": "i"}})
+            filtro = {"$or": condiciones}
+
+        # Las publicaciones sin fecha válida (fecha_ts nulo) quedan fuera si se filtra por fecha
+        rango = {}
+        if start_date:
+            rango["$gte"] = start_date
+        if end_date:
+            rango["$lte"] = end_date
+        if rango:
+            filtro["fecha_ts"] = rango
+        return filtro
+
+    def filtrar(self, query, start_date=None, end_date=None):
+        """Publicaciones que coinciden, leídas por lotes y ordenadas por id_post."""
+        cursor = self.coleccion.find(
+            self.consulta(query, start_date, end_date), PROYECCION, batch_size=DOCUMENTOS_POR_LOTE
+        )
+        return list(cursor.sort("id_post", ASCENDING))
+
+    def rango_fechas(self):
+        """Fecha mínima y máxima del corpus en formato YYYY-MM-DD (con el índice de fecha_ts)."""
+        extremos = []
+        for orden in (ASCENDING, DESCENDING):
+            documento = self.coleccion.find_one({"fecha_ts": {"$ne": None}}, {"fecha_ts": 1}, sort=[("fecha_ts", orden)])
+            if documento is None:
+                return None, None
+            extremos.append(documento["fecha_ts"].strftime("%Y-%m-%d"))
+        return tuple(extremos)
+
+    def firma(self):
+        """
+        Cambia cuando se agregan, eliminan o actualizan publicaciones: número de
+        documentos, último _id y contador de cargas (lo incrementa mongodb_loader.py
+        cuando una carga modifica documentos, p. ej. comentarios nuevos).
+        """
+        ultimo = self.coleccion.find_one({}, {"_id": 1}, sort=[("_id", DESCENDING)])
+        version = self.versiones.find_one({"_id": "corpus"})
+        return (
+            self.coleccion.estimated_document_count(),
+            ultimo["_id"] if ultimo else None,
+            version["cargas"] if version else None,
+        )
+
+
+# Un único cliente y corpus por proceso y colección
+_clientes = {}
+_corpus_mongo = {}
+
+def abrir_corpus_mongo(uri, base_datos, coleccion, tamano_pool=20, busqueda="regex"):
+    """Devuelve el CorpusMongo de la colección, reutilizando el cliente del proceso."""
+    clave = (uri, base_datos, coleccion, busqueda)
+    corpus = _corpus_mongo.get(clave)
+    registrar_cache("corpus", corpus is not None)
+    if corpus is None:
+        if uri not in _clientes:
+            # connect=False: la conexión se abre en la primera consulta (después de un fork)
+            _clientes[uri] = MongoClient(uri, maxPoolSize=tamano_pool, connect=False)
+        corpus = CorpusMongo(_clientes[uri][base_datos][coleccion], busqueda)
+        _corpus_mongo[clave] = corpus
+    return corpus
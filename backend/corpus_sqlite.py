@@ -0,0 +1,154 @@
+"""
+Lectura del corpus desde SQLite (SENTIVOTE_ALMACENAMIENTO=sqlite).
+
+La base la genera webScraping/storage/sqlite_loader.py: tablas publicaciones y
+comentarios, índice en fecha_ts y una tabla FTS5 (unicode61 remove_diacritics 2)
+sobre candidato y texto. /analizar resuelve la búsqueda y el rango de fechas con
+una sola consulta SQL indexada y recibe solo las publicaciones que coinciden.
+
+- Cada hilo de cada worker abre su propia conexión de solo lectura (las conexiones
+  de sqlite3 no se comparten entre hilos) y la reutiliza en las peticiones siguientes.
+  Con mmap las páginas de la base quedan en la caché del sistema operativo,
+  compartidas por todos los workers.
+- Por defecto la query se busca con FTS5: palabras completas, sin distinguir
+  mayúsculas ni tildes, y la última palabra como prefijo ("gonz" encuentra
+  "González"). Con busqueda="subcadena" se usa la misma lógica que el filtrado
+  sobre el JSON (subcadena, sin índice de texto).
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from metricas import registrar_cache
+
+COLUMNAS_PUBLICACION = ["id_post", "candidato", "usuario", "fecha", "texto"]
+BYTES_MMAP = 256 << 20
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Mismos caracteres de palabra que el tokenizador unicode61 (el "_" separa palabras)
+_PALABRA = re.compile(r"[^\W_]+")
+
+_CONSULTA = (
+    "SELECT " + ", ".join(f"p.{c}" for c in COLUMNAS_PUBLICACION) + ", c.rowid, c.id_comentario, c.texto_comentario"
+    " FROM publicaciones p LEFT JOIN comentarios c ON c.id_post = p.id_post"
+    " {donde} ORDER BY p.id_post, c.rowid"
+)
+
+
+def microsegundos_utc(fecha):
+    """Igual que en sqlite_loader: fecha como microsegundos Unix."""
+    return (fecha - _EPOCA) // timedelta(microseconds=1)
+
+
+def expresion_fts(query):
+    """Frase FTS5 con las palabras de la query y la última como prefijo, o None si no tiene palabras."""
+    palabras = _PALABRA.findall(query)
+    if not palabras:
+        return None
+    return '"' + " ".join(palabras) + '" *'
+
+
+def _contiene(texto, query):
+    return texto is not None and query in texto.lower()
+
+
+class CorpusSQLite:
+    """
+    Corpus guardado en una base SQLite. Ofrece la misma interfaz que CorpusMapeado
+    (len, iteración, filtrar y rango_fechas), así que main.py lo usa sin cambios en las rutas.
+    """
+
+    def __init__(self, ruta, busqueda="fts"):
+        self.ruta = ruta
+        self.busqueda = busqueda
+        self._local = threading.local()
+
+    def conexion(self):
+        """Conexión de solo lectura del hilo actual (se abre la primera vez)."""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(Path(self.ruta).absolute().as_uri() + "?mode=ro", uri=True)
+            conexion.execute(f"PRAGMA mmap_size={BYTES_MMAP}")
+            conexion.create_function("contiene", 2, _contiene, deterministic=True)
+            self._local.conexion = conexion
+        return conexion
+
+    def __len__(self):
+        return self.conexion().execute("SELECT count(*) FROM publicaciones").fetchone()[0]
+
+    def __iter__(self):
+        return self._publicaciones(self.conexion().execute(_CONSULTA.format(donde="")))
+
+    def consulta(self, query, start_date=None, end_date=None):
+        """Condición WHERE y parámetros equivalentes al filtrado de /analizar."""
+        expresion = expresion_fts(query) if self.busqueda == "fts" else None
+        if expresion:
+            condiciones = ["p.id_post IN (SELECT rowid FROM publicaciones_fts WHERE publicaciones_fts MATCH ?)"]
+            parametros = [expresion]
+        else:
+            condiciones = ["(contiene(replace(p.candidato, '_', ' '), ?) OR contiene(p.texto, ?))"]
+            parametros = [query.lower()] * 2
+
+        # Las publicaciones sin fecha válida (fecha_ts NULL) quedan fuera si se filtra por fecha
+        if start_date:
+            condiciones.append("p.fecha_ts >= ?")
+            parametros.append(microsegundos_utc(start_date))
+        if end_date:
+            condiciones.append("p.fecha_ts <= ?")
+            parametros.append(microsegundos_utc(end_date))
+        return "WHERE " + " AND ".join(condiciones), parametros
+
+    def filtrar(self, query, start_date=None, end_date=None):
+        """Publicaciones que coinciden (con sus comentarios), ordenadas por id_post."""
+        donde, parametros = self.consulta(query, start_date, end_date)
+        return list(self._publicaciones(self.conexion().execute(_CONSULTA.format(donde=donde), parametros)))
+
+    def rango_fechas(self):
+        """Fecha mínima y máxima del corpus en formato YYYY-MM-DD (con el índice de fecha_ts)."""
+        minimo, maximo = self.conexion().execute("SELECT min(fecha_ts), max(fecha_ts) FROM publicaciones").fetchone()
+        if minimo is None:
+            return None, None
+        return tuple(
+            (_EPOCA + timedelta(microseconds=valor)).strftime("%Y-%m-%d") for valor in (minimo, maximo)
+        )
+
+    def _publicaciones(self, filas):
+        """Agrupa las filas del LEFT JOIN en publicaciones con su lista de comentarios (los nulos se omiten, como en el JSON)."""
+        post = None
+        for fila in filas:
+            if post is None or fila[0] != post["id_post"]:
+                if post is not None:
+                    yield post
+                post = {c: v for c, v in zip(COLUMNAS_PUBLICACION, fila) if v is not None}
+                post["comentarios"] = []
+            rowid_comentario, id_comentario, texto_comentario = fila[len(COLUMNAS_PUBLICACION):]
+            if rowid_comentario is not None:
+                comentario = {"id_comentario": id_comentario, "texto_comentario": texto_comentario}
+                post["comentarios"].append({c: v for c, v in comentario.items() if v is not None})
+        if post is not None:
+            yield post
+
+
+def firma_corpus_sqlite(ruta):
+    """Fechas de modificación de la base y de su WAL: cambian con cada carga."""
+    return tuple(
+        (r, os.stat(r).st_mtime_ns if os.path.exists(r) else None) for r in (ruta, ruta + "-wal")
+    )
+
+
+# Un único corpus por proceso y base (cada uno con sus conexiones por hilo)
+_corpus_sqlite = {}
+
+def abrir_corpus_sqlite(ruta, busqueda="fts"):
+    """Devuelve el CorpusSQLite de la base, reutilizando el ya abierto en este proceso."""
+    clave = (ruta, busqueda)
+    corpus = _corpus_sqlite.get(clave)
+    registrar_cache("corpus", corpus is not None)
+    if corpus is None:
+        corpus = CorpusSQLite(ruta, busqueda)
+        _corpus_sqlite[clave] = corpus
+    return corpus
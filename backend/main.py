@@ -1,9 +1,14 @@
 import os
+import sys
 import json
+import hashlib
 import re
 import io
 import base64
+import time
 import unicodedata
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 # Librerías de Machine Learning / NLP
 from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification 
@@ -12,13 +17,13 @@ from nltk.corpus import stopwords
 from nltk.stem.snowball import SnowballStemmer
 
 # Librerías de la Web (Flask)
-from flask import Flask, request, jsonify # Eliminamos 'send_file' si no se usa
+from flask import Flask, request, jsonify, g # Eliminamos 'send_file' si no se usa
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # Librerías de Visualización
 import matplotlib
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from wordcloud import WordCloud
 matplotlib.use('Agg') # Para evitar problemas con GUI
 
@@ -27,6 +32,49 @@ import google.generativeai as genai
 
 from datetime import datetime, timezone 
 
+# Módulos locales del backend (funciona tanto con 'python main.py' como con 'backend.main')
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Métricas por etapa (Server-Timing y /metrics)
+from metricas import (
+    medir, acumular, iniciar_peticion, finalizar_peticion, observar_duracion,
+    encabezado_server_timing, incrementar, registrar_cache, exportar_prometheus
+)
+
+# Puntuación del corpus en segundo plano
+from puntuacion_fondo import AlmacenPuntajes, PuntuadorFondo
+
+# Corpus columnar (Arrow IPC); requiere pyarrow
+try:
+    from corpus_columnar import (
+        abrir_corpus_mapeado, archivos_corpus_columnar, cargar_corpus_columnar, existe_corpus_columnar,
+        firma_corpus_columnar
+    )
+except ImportError as e:
+    print(f"⚠️ ADVERTENCIA: Corpus columnar no disponible (instale pyarrow): {e}")
+    abrir_corpus_mapeado = None
+    archivos_corpus_columnar = None
+    cargar_corpus_columnar = None
+    existe_corpus_columnar = None
+    firma_corpus_columnar = None
+
+# Tokens precalculados del corpus; requiere numpy y PyTorch
+try:
+    from pretokenizado import cargar_tokens_corpus, inferir_ids
+except ImportError as e:
+    print(f"⚠️ ADVERTENCIA: Tokens precalculados no disponibles: {e}")
+    cargar_tokens_corpus = None
+    inferir_ids = None
+
+# Corpus en SQLite con FTS5 (SENTIVOTE_ALMACENAMIENTO=sqlite)
+from corpus_sqlite import abrir_corpus_sqlite, firma_corpus_sqlite
+
+# Corpus en MongoDB (SENTIVOTE_ALMACENAMIENTO=mongo); requiere pymongo
+try:
+    from corpus_mongo import abrir_corpus_mongo
+except ImportError as e:
+    print(f"⚠️ ADVERTENCIA: Corpus en MongoDB no disponible (instale pymongo): {e}")
+    abrir_corpus_mongo = None
 
 # Configurar variables de entorno
 load_dotenv()
@@ -48,6 +96,26 @@ else:
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:5173", "http://localhost:3000"])
 
+# ---------------------------------------------------------------------------------------------------
+# Ejecutor acotado para las etapas CPU-intensivas (modelo, wordclouds)
+# ---------------------------------------------------------------------------------------------------
+# Limita cuántas etapas pesadas corren a la vez en este proceso, sin importar cuántas
+# peticiones estén abiertas; las rutas ligeras (/salud) no pasan por aquí.
+HILOS_CPU = int(os.getenv("SENTIVOTE_HILOS_CPU", "2"))
+ejecutor_cpu = ThreadPoolExecutor(max_workers=HILOS_CPU, thread_name_prefix="sentivote-cpu")
+
+def ejecutar_en_cpu(funcion, *args, **kwargs):
+    """Ejecuta una etapa CPU-intensiva en el ejecutor acotado y espera su resultado."""
+    # Copiar el contexto para que las etapas medidas en el hilo del ejecutor cuenten para esta petición
+    contexto = contextvars.copy_context()
+    encolado = time.perf_counter()
+
+    def tarea():
+        acumular("cola_cpu", time.perf_counter() - encolado)
+        return funcion(*args, **kwargs)
+
+    return ejecutor_cpu.submit(contexto.run, tarea).result()
+
 # ---------------------------------------------------------------------------------------------------
 # Cargar modelo de análisis de sentimiento BETO desde Hugging Face
 # ---------------------------------------------------------------------------------------------------
@@ -65,6 +133,16 @@ CORS(app, origins=["http://localhost:5173", "http://localhost:3000"])
 # ---------------------------------------------------------------------------------------------------
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "fineTuning", "modelo_final")
+MAX_LENGTH_MODELO = 128
+
+# Hilos de PyTorch por proceso (opcional). Con varios workers conviene repartir los núcleos.
+HILOS_TORCH = os.getenv("SENTIVOTE_HILOS_TORCH")
+if HILOS_TORCH:
+    try:
+        import torch
+        torch.set_num_threads(int(HILOS_TORCH))
+    except ImportError:
+        print("⚠️ ADVERTENCIA: SENTIVOTE_HILOS_TORCH definido pero PyTorch no está instalado")
 
 try:
     print(f"Intentando cargar modelo fine-tuned desde: {MODEL_DIR}")
@@ -73,7 +151,7 @@ try:
         model=MODEL_DIR, 
         device=-1, # -1 para usar CPU, 0 para usar GPU 
         truncation=True,
-        max_length=128 #Mejorar modelo para que acepte textos más largos
+        max_length=MAX_LENGTH_MODELO #Mejorar modelo para que acepte textos más largos
     )
     print("Modelo fine-tuned 'sentimiento-politica' cargado exitosamente.")
 
@@ -87,6 +165,18 @@ except Exception as e:
     except Exception as e_fallback:
         print(f"ERROR: No se pudo cargar ningún modelo. {e_fallback}")
         modelo = None # Si todo falla, no hay modelo.
+
+# Tokens precalculados de los textos del corpus (python pretokenizado.py): los textos que
+# estén en el archivo pasan directo al modelo sin tokenizarse en cada petición
+TOKENS_DIR = os.path.join(os.path.dirname(__file__), "data", "tokens")
+tokens_corpus = None
+if modelo is not None and cargar_tokens_corpus:
+    try:
+        tokens_corpus = cargar_tokens_corpus(TOKENS_DIR, modelo.tokenizer, MAX_LENGTH_MODELO)
+        if tokens_corpus is not None:
+            print(f"Tokens precalculados cargados: {len(tokens_corpus)} textos.")
+    except Exception as e:
+        print(f"⚠️ ADVERTENCIA: No se pudieron cargar los tokens precalculados: {e}")
 # ---------------------------------------------------------------------------------------------------
     
 # Diccionarios
@@ -204,27 +294,29 @@ def generar_wordcloud(textos, colormap='viridis'):
         if not texto_combinado.strip() or len(texto_combinado) < 3:
             return None, {} 
         
-        wordcloud = WordCloud(
-            width=800, height=400,
-            background_color='white',
-            max_words=80,             # Menos palabras para que sea más legible
-            stopwords=STOP_WORDS_ES,
-            min_font_size=10, max_font_size=90,
-            colormap=colormap,        
-            relative_scaling=0.5,
-            collocations=False,       # Evita frases repetidas
-            random_state=42
-        ).generate(texto_combinado)
+        with medir("wordcloud"):
+            wordcloud = WordCloud(
+                width=800, height=400,
+                background_color='white',
+                max_words=80,             # Menos palabras para que sea más legible
+                stopwords=STOP_WORDS_ES,
+                min_font_size=10, max_font_size=90,
+                colormap=colormap,        
+                relative_scaling=0.5,
+                collocations=False,       # Evita frases repetidas
+                random_state=42
+            ).generate(texto_combinado)
         
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
+            # Figure directa (sin pyplot): pyplot usa estado global y no es seguro entre hilos
+            fig = Figure(figsize=(10, 5))
+            ax = fig.add_subplot()
+            ax.imshow(wordcloud, interpolation='bilinear')
+            ax.axis('off')
         
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format='png', bbox_inches='tight', dpi=150, facecolor='white')
-        img_buffer.seek(0)
-        img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-        plt.close()
+            img_buffer = io.BytesIO()
+            fig.savefig(img_buffer, format='png', bbox_inches='tight', dpi=150, facecolor='white')
+            img_buffer.seek(0)
+            img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
         
         return img_base64, wordcloud.words_
         
@@ -367,7 +459,15 @@ def extraer_palabras_clave_gemini(textos, sentimiento):
         print(f"Error Gemini WordCloud ({sentimiento}): {e}")
         return None
 
+def wordcloud_con_diccionario(textos, sentimiento, colormap='viridis'):
+    """Nube de palabras con el filtrado local (regex + diccionario), sin Gemini."""
+    with medir("wordcloud_filtrado"):
+        textos_filtrados = filtrar_por_diccionario(textos, sentimiento)
+    return generar_wordcloud(textos_filtrados, colormap=colormap)
+
 def generar_wordclouds_por_sentimiento(publicaciones):
+    # Se llama desde el hilo de la petición: las llamadas a Gemini (espera de red) no
+    # ocupan el ejecutor acotado; solo el filtrado y el dibujo de cada nube pasan por él
     textos_por_sentimiento = {
         "POS": [],
         "NEG": [],
@@ -417,17 +517,22 @@ def generar_wordclouds_por_sentimiento(publicaciones):
         # Intentar usar Gemini para filtrar ruido y extraer esencia si hay suficientes textos
         if model_gemini and textos and len(textos) > 5:
              print(f"Mejorando WordCloud {sentimiento} con IA Gemini...")
-             texto_para_nube = extraer_palabras_clave_gemini(textos, sentimiento)
+             with medir("gemini"):
+                 texto_para_nube = extraer_palabras_clave_gemini(textos, sentimiento)
+        
+        if textos and len(textos) > 5 and not texto_para_nube:
+             incrementar("sentivote_gemini_fallbacks_total", origen="wordcloud")
         
         if texto_para_nube:
              # Si Gemini funcionó, generamos la nube directamente con su respuesta "limpia"
              # Pasamos como lista de 1 elemento, generar_wordcloud lo limpiará (quita acentos/letras sueltas) pero mantendrá la esencia
-             img_base64, palabras_frecuentes = generar_wordcloud([texto_para_nube], colormap=color)
+             img_base64, palabras_frecuentes = ejecutar_en_cpu(generar_wordcloud, [texto_para_nube], colormap=color)
         else:
              # Fallback lógica clásica (filtrado regex + diccionario) si falla Gemini o hay pocos textos
              print(f"Generando WordCloud {sentimiento} con lógica local (Regex/Diccionario)...")
-             textos_filtrados = filtrar_por_diccionario(textos, sentimiento)
-             img_base64, palabras_frecuentes = generar_wordcloud(textos_filtrados, colormap=color)
+             img_base64, palabras_frecuentes = ejecutar_en_cpu(
+                 wordcloud_con_diccionario, textos, sentimiento, colormap=color
+             )
         
         wordclouds_sentimiento[sentimiento] = {
             "imagen": img_base64, 
@@ -437,32 +542,147 @@ def generar_wordclouds_por_sentimiento(publicaciones):
     return wordclouds_sentimiento
 
 # --------------------------------------------------------------------------------------
-# Cargar corpus desde archivo JSON 
+# Cargar corpus desde formato columnar (si existe) o desde archivo JSON 
 #--------------------------------------------------------------------------------------
+CORPUS_COLUMNAR_DIR = os.path.join(os.path.dirname(__file__), "data", "corpus_columnar")
+CORPUS_JSON = os.path.join(os.path.dirname(__file__), "data/corpus_completo.json")
+
+CORPUS_SQLITE = os.getenv("SENTIVOTE_SQLITE", os.path.join(os.path.dirname(__file__), "data", "corpus.sqlite"))
+
+# "archivo" (columnar o JSON), "sqlite" (la base que genera webScraping/storage/sqlite_loader.py)
+# o "mongo" (la colección que llena webScraping/storage/mongodb_loader.py)
+ALMACENAMIENTO = os.getenv("SENTIVOTE_ALMACENAMIENTO", "archivo")
+
+def usa_sqlite():
+    return ALMACENAMIENTO == "sqlite" and os.path.isfile(CORPUS_SQLITE)
+
+def usa_mongo():
+    return ALMACENAMIENTO == "mongo" and abrir_corpus_mongo is not None
+
+def abrir_corpus_mongo_configurado():
+    """Corpus de MongoDB según las mismas variables MONGO_* que usa el cargador."""
+    return abrir_corpus_mongo(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017"),
+        os.getenv("MONGO_DB_NAME", "tesis_analisis_sentimiento"),
+        os.getenv("MONGO_COLLECTION_NAME", "corpus_politico"),
+        tamano_pool=int(os.getenv("SENTIVOTE_MONGO_POOL", "20")),
+        busqueda=os.getenv("SENTIVOTE_MONGO_BUSQUEDA", "regex"),
+    )
+
 def cargar_corpus():
-    ruta = os.path.join(os.path.dirname(__file__), "data/corpus_completo.json") 
+    # MongoDB: la búsqueda y las fechas se filtran en la base de datos (ver corpus_mongo.py)
+    if usa_mongo():
+        return abrir_corpus_mongo_configurado()
+
+    # SQLite: una sola consulta indexada (FTS5 + fecha_ts) por búsqueda (ver corpus_sqlite.py)
+    if usa_sqlite():
+        return abrir_corpus_sqlite(CORPUS_SQLITE, os.getenv("SENTIVOTE_SQLITE_BUSQUEDA", "fts"))
+    if ALMACENAMIENTO == "sqlite":
+        print(f"ERROR: No existe la base SQLite {CORPUS_SQLITE}, usando los archivos del corpus")
+
+    # Preferir el corpus columnar mapeado en memoria: una sola copia (caché de páginas del SO)
+    # compartida por todos los workers, abierta una vez por proceso
+    if abrir_corpus_mapeado and existe_corpus_columnar(CORPUS_COLUMNAR_DIR):
+        try:
+            return abrir_corpus_mapeado(CORPUS_COLUMNAR_DIR)
+        except Exception as e:
+            print(f"ERROR: No se pudo mapear el corpus columnar: {e}")
+        try:
+            return cargar_corpus_columnar(CORPUS_COLUMNAR_DIR)
+        except Exception as e:
+            print(f"ERROR: No se pudo leer el corpus columnar, usando JSON: {e}")
+
+    # El JSON no tiene caché: cada llamada lo vuelve a parsear
+    registrar_cache("corpus", acierto=False)
     try:
-        with open(ruta, "r", encoding="utf-8") as f:
+        with open(CORPUS_JSON, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
         print("ERROR: Archivo corpus.json no encontrado")
         return []
 
+def firma_corpus():
+    """Fechas de modificación de los archivos del corpus: cambian cuando el corpus se reemplaza o crece."""
+    if usa_mongo():
+        try:
+            return abrir_corpus_mongo_configurado().firma()
+        except Exception as e:
+            print(f"ERROR: No se pudo consultar MongoDB: {e}")
+            return None
+    if usa_sqlite():
+        return firma_corpus_sqlite(CORPUS_SQLITE)
+    if existe_corpus_columnar and existe_corpus_columnar(CORPUS_COLUMNAR_DIR):
+        return firma_corpus_columnar(CORPUS_COLUMNAR_DIR)
+    try:
+        return ((CORPUS_JSON, os.stat(CORPUS_JSON).st_mtime_ns),)
+    except FileNotFoundError:
+        return None
+
+# Manifiesto generado junto a los datos (conteos, fechas, hash): /salud lo sirve sin recorrer el corpus
+_manifiesto_cache = {}
+# ruta -> ((tamaño, mtime), huella); la huella se recalcula solo si cambia el stat del archivo
+_huellas_cache = {}
+BLOQUE_HUELLA = 1 << 16
+
+def huella_archivo(ruta):
+    """[tamaño, sha256 del primer y último bloque], igual que huella_archivos en manifiesto_corpus.py."""
+    stat = os.stat(ruta)
+    guardada = _huellas_cache.get(ruta)
+    if guardada and guardada[0] == (stat.st_size, stat.st_mtime_ns):
+        return guardada[1]
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        sha.update(f.read(BLOQUE_HUELLA))
+        if stat.st_size > BLOQUE_HUELLA:
+            f.seek(max(BLOQUE_HUELLA, stat.st_size - BLOQUE_HUELLA))
+            sha.update(f.read())
+    huella = [stat.st_size, sha.hexdigest()]
+    _huellas_cache[ruta] = ((stat.st_size, stat.st_mtime_ns), huella)
+    return huella
+
+def leer_manifiesto_corpus():
+    """
+    Manifiesto del corpus en uso, o None si no existe o está desactualizado (el tamaño
+    o la huella de los datos no coinciden). El archivo se vuelve a leer solo cuando cambia.
+    """
+    # Con MongoDB o SQLite los conteos y fechas se consultan a la base de datos (con índices)
+    if usa_mongo() or usa_sqlite():
+        return None
+    if existe_corpus_columnar and existe_corpus_columnar(CORPUS_COLUMNAR_DIR):
+        ruta = os.path.join(CORPUS_COLUMNAR_DIR, "manifiesto.json")
+        rutas_datos = archivos_corpus_columnar(CORPUS_COLUMNAR_DIR)
+    else:
+        ruta = os.path.splitext(CORPUS_JSON)[0] + ".manifiesto.json"
+        rutas_datos = [CORPUS_JSON]
+    try:
+        clave = (ruta, os.stat(ruta).st_mtime_ns)
+        if _manifiesto_cache.get("clave") != clave:
+            with open(ruta, "r", encoding="utf-8") as f:
+                _manifiesto_cache.update(clave=clave, manifiesto=json.load(f))
+        manifiesto = _manifiesto_cache["manifiesto"]
+        vigente = (
+            manifiesto.get("bytes_datos") == sum(os.path.getsize(r) for r in rutas_datos)
+            and manifiesto.get("huella_datos") == [huella_archivo(r) for r in rutas_datos]
+        )
+    except (OSError, ValueError):
+        return None
+    registrar_cache("manifiesto", vigente)
+    return manifiesto if vigente else None
+
 # --------------------------------------------------------------------------------------
 # FUNCIÓN DE ANÁLISIS DE DICCIONARIO MEJORADA CON MANEJO DE NEGACIÓN
 # --------------------------------------------------------------------------------------
-def analizar_texto_con_diccionario(texto, sentimiento_modelo, confianza_modelo):
+def analisis_lexico(texto):
     """
-    Analiza el texto buscando palabras clave para reforzar la confianza del modelo,
-    con manejo mejorado de negación, frases y sarcasmo.
+    Parte del análisis de diccionario que no depende del modelo: palabras del texto,
+    si contiene insultos y conteo de términos positivos/negativos (con negación).
     """
     texto_lower = texto.lower()
-
-    # Refuerzo: Si el texto contiene insultos, forzar NEG
     palabras = re.findall(r'\b\w+\b', texto_lower)
-    for palabra in palabras:
-        if es_insulto(palabra):
-            return "NEG", 1.0
+
+    # Con un insulto el resultado ya es NEG: no hace falta contar términos
+    if any(es_insulto(palabra) for palabra in palabras):
+        return palabras, True, 0, 0
 
     # 1. Limpieza y Tokenización del texto de entrada
     # Mantener el orden para la negación y buscar frases completas
@@ -487,6 +707,26 @@ def analizar_texto_con_diccionario(texto, sentimiento_modelo, confianza_modelo):
         if word in diccionario_negativo and is_negated:
             palabras_negativas_contadas -= 1
 
+    return palabras, False, palabras_positivas_contadas, palabras_negativas_contadas
+
+
+def es_sarcasmo(texto):
+    """Detección simple de sarcasmo: "claro", "seguro" u "obvio" junto a signos de exclamación o pregunta."""
+    texto_lower = texto.lower()
+    return any(s in texto_lower for s in ["claro", "seguro", "obvio"]) and ("!" in texto or "¿" in texto)
+
+
+def analizar_texto_con_diccionario(texto, sentimiento_modelo, confianza_modelo, lexico=None):
+    """
+    Analiza el texto buscando palabras clave para reforzar la confianza del modelo,
+    con manejo mejorado de negación, frases y sarcasmo.
+    """
+    words, insulto, palabras_positivas_contadas, palabras_negativas_contadas = lexico or analisis_lexico(texto)
+
+    # Refuerzo: Si el texto contiene insultos, forzar NEG
+    if insulto:
+        return "NEG", 1.0
+
     # Refuerzo según confianza del modelo
     if palabras_positivas_contadas > palabras_negativas_contadas and palabras_positivas_contadas > 0:
         if confianza_modelo < 0.7:
@@ -498,8 +738,7 @@ def analizar_texto_con_diccionario(texto, sentimiento_modelo, confianza_modelo):
         return "NEG", min(confianza_modelo + 0.15, 1.0)
     
     # Detección simple de sarcasmo: si hay "claro", "seguro", "obvio" y signos de exclamación
-    sarcasmo = any(s in texto_lower for s in ["claro", "seguro", "obvio"]) and ("!" in texto or "¿" in texto)
-    if sarcasmo:
+    if es_sarcasmo(texto):
         # Invertir el sentimiento si el modelo no está seguro
         if confianza_modelo < 0.8:
             if sentimiento_modelo == "POS":
@@ -513,6 +752,25 @@ def analizar_texto_con_diccionario(texto, sentimiento_modelo, confianza_modelo):
     
     return sentimiento_modelo, confianza_modelo
 
+
+def decision_sin_modelo(texto, lexico):
+    """
+    Devuelve (sentimiento, confianza, etapa) cuando analizar_texto_con_diccionario daría
+    el mismo resultado sin importar la salida del modelo; None si el texto necesita el modelo.
+    """
+    words, insulto, positivas, negativas = lexico
+    if insulto:
+        return "NEG", 1.0, "insulto"
+    # Con mayoría de términos la etiqueta es fija, pero la confianza depende del modelo
+    if (positivas > negativas and positivas > 0) or (negativas > positivas and negativas > 0):
+        return None
+    # El sarcasmo invierte la etiqueta del modelo según su confianza
+    if es_sarcasmo(texto):
+        return None
+    if len(words) <= 7 and negativas > 0:
+        return "NEG", 1.0, "diccionario"
+    return None
+
 # Funciones de manejo de fechas y rangos
 def parse_date(date_str, is_end=False):
     """
@@ -544,6 +802,10 @@ def obtener_rango_fechas(corpus):
     if not corpus:
         return None, None
     
+    # Corpus mapeado o en una base de datos: las fechas ya están parseadas (columna o campo indexado)
+    if hasattr(corpus, "rango_fechas"):
+        return corpus.rango_fechas()
+    
     fechas = []
     
     for post in corpus:
@@ -567,9 +829,281 @@ def obtener_rango_fechas(corpus):
     # Nota: Usamos el formato ISO completo si es necesario, pero YYYY-MM-DD es suficiente para el selector
     return min_date.strftime("%Y-%m-%d"), max_date.strftime("%Y-%m-%d")
 
+# Filtrado de publicaciones por query y rango de fechas
+def filtrar_publicaciones(corpus, query, start_date=None, end_date=None):
+    """Devuelve las publicaciones cuyo candidato o texto contiene la query, dentro del rango de fechas."""
+    # Corpus mapeado o en una base de datos: filtrado sin materializar las publicaciones descartadas
+    if hasattr(corpus, "filtrar"):
+        return corpus.filtrar(query, start_date, end_date)
+    
+    # 1. FILTRADO INICIAL POR QUERY (Mantener la funcionalidad actual)
+    publicaciones_filtradas_por_query = [
+        p for p in corpus 
+        if query.lower() in p.get("candidato", "").replace("_", " ").lower() or 
+        query.lower() in p.get("texto", "").lower()
+    ]
+    
+    if not (start_date or end_date):
+        # Si no hay filtros de fecha, se mantienen solo los filtrados por query
+        return publicaciones_filtradas_por_query
+    
+    # 2. FILTRADO POR FECHA
+    print(f"Aplicando filtro de fecha: Desde {start_date} hasta {end_date}")
+    publicaciones_filtradas = []
+    for p in publicaciones_filtradas_por_query:
+        post_date_str = p.get("fecha") # Asume el formato ISO del corpus (ej. 2025-01-05T17:57:48.000Z)
+        if not post_date_str:
+            continue
+        
+        try:
+            # fromisoformat es la mejor opción para formatos ISO con Z (lo convierte a +00:00)
+            post_date = datetime.fromisoformat(post_date_str.replace('Z', '+00:00'))
+        except ValueError:
+            # Si el formato no es válido, lo ignoramos.
+            continue 
+
+        is_within_start = (not start_date) or (post_date >= start_date)
+        is_within_end = (not end_date) or (post_date <= end_date)
+        
+        if is_within_start and is_within_end:
+            publicaciones_filtradas.append(p)
+    
+    return publicaciones_filtradas
+
+# --------------------------------------------------------------------------------------
+# Análisis de sentimiento de publicaciones y comentarios (Modelo FT + Diccionario)
+# --------------------------------------------------------------------------------------
+# Modo cascada: el diccionario decide primero y solo los textos indecisos pasan por el modelo.
+# Los resultados son idénticos; SENTIVOTE_CASCADA=0 vuelve a consultar el modelo en todos los textos.
+CASCADA_DICCIONARIO = os.getenv("SENTIVOTE_CASCADA", "1") != "0"
+
+def inferir(texto):
+    """Salida del modelo para un texto; usa sus tokens precalculados si existen."""
+    if tokens_corpus is not None:
+        ids = tokens_corpus.buscar(texto)
+        registrar_cache("tokens", ids is not None)
+        if ids is not None:
+            return inferir_ids(modelo.model, ids)
+    return modelo([texto])[0]
+
+def puntuar_texto(texto):
+    """Sentimiento y confianza de un texto (modelo FT + refuerzo del diccionario); None si falla."""
+    try:
+        with medir("diccionario"):
+            lexico = analisis_lexico(texto)
+            # Sin modelo cargado todos los textos caen en el caso de error, igual que sin cascada
+            decision = decision_sin_modelo(texto, lexico) if CASCADA_DICCIONARIO and modelo is not None else None
+        if decision:
+            sentimiento, confianza, etapa = decision
+            incrementar("sentivote_textos_resueltos_total", etapa=etapa)
+            return sentimiento, confianza
+
+        with medir("inferencia"):
+            res = inferir(texto)
+
+        # Resultado PURO del modelo FT (antes del diccionario)
+        sentimiento_modelo = res["label"].upper().replace("NEGATIVE", "NEG").replace("POSITIVE", "POS").replace("NEUTRAL", "NEU")
+        confianza_modelo = res["score"]
+
+        # Aplicar Normalización y Refuerzo del Diccionario
+        with medir("diccionario"):
+            sentimiento, confianza = analizar_texto_con_diccionario(texto, sentimiento_modelo, confianza_modelo, lexico)
+        incrementar("sentivote_textos_resueltos_total", etapa="modelo")
+        return sentimiento, confianza
+    except Exception:
+        incrementar("sentivote_textos_resueltos_total", etapa="error")
+        return None
+
+def clasificar_texto(texto):
+    """Como puntuar_texto, pero un texto que no se pudo clasificar queda neutral (0.5)."""
+    return puntuar_texto(texto) or ("NEU", 0.5)
+
+def clasificar_textos(textos):
+    """
+    Clasifica cada texto distinto una sola vez. Devuelve {texto: (sentimiento, confianza)}
+    para repartir el resultado entre todas las apariciones del texto.
+    """
+    resultados = {}
+    for texto in textos:
+        if texto in resultados:
+            continue
+        # Los puntajes ya calculados (por otra petición o en segundo plano) se reutilizan
+        puntaje = puntajes_cache.get(texto)
+        registrar_cache("puntajes", puntaje is not None)
+        if puntaje is None:
+            puntaje = puntuar_texto(texto)
+            if puntaje is not None:
+                puntajes_cache[texto] = puntaje
+        resultados[texto] = puntaje or ("NEU", 0.5)
+    return resultados
+
+def textos_de_publicaciones(publicaciones):
+    """Textos que se clasifican: cada publicación con texto y sus comentarios, en orden."""
+    textos = []
+    for post in publicaciones:
+        texto_publicacion = post.get("texto", "")
+        if not texto_publicacion: continue
+        textos.append(texto_publicacion)
+        textos.extend(
+            com.get("texto_comentario") for com in post.get("comentarios", []) if com.get("texto_comentario")
+        )
+    return textos
+
+def huella_puntajes():
+    """
+    Versión de los puntajes: cambia si cambia algo que determina el puntaje de un texto
+    (configuración y pesos del modelo, max_length, modo cascada o diccionarios). De los
+    pesos se usa la huella de cada archivo (tamaño y hash de su primer y último bloque).
+    """
+    partes = [
+        str(MAX_LENGTH_MODELO), str(CASCADA_DICCIONARIO),
+        json.dumps([diccionario_positivo, diccionario_negativo, diccionario_insultos_ecuador,
+                    sorted(NEGATORS), regex_insultos, palabras_negativas_extra], ensure_ascii=False, default=str),
+    ]
+    if modelo is not None:
+        partes.append(modelo.model.config.to_json_string())
+        carpeta = str(modelo.model.name_or_path)
+        if os.path.isdir(carpeta):
+            for nombre in sorted(os.listdir(carpeta)):
+                if nombre.endswith((".safetensors", ".bin")):
+                    partes.append(json.dumps(huella_archivo(os.path.join(carpeta, nombre))))
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()[:16]
+
+# Caché de puntajes (texto -> (sentimiento, confianza)). La cola de fondo la llena cuando
+# cambia el corpus y descarta los textos que ya no están en él. Con SENTIVOTE_PUNTAJES (lo
+# define servidor.py con varios workers) es un SQLite compartido por todos los procesos y
+# un solo proceso puntúa en segundo plano; si no, un diccionario de este proceso.
+PUNTAJES_COMPARTIDOS = os.getenv("SENTIVOTE_PUNTAJES", "")
+puntajes_cache = AlmacenPuntajes(PUNTAJES_COMPARTIDOS, huella_puntajes()) if PUNTAJES_COMPARTIDOS else {}
+
+PUNTUACION_FONDO = os.getenv("SENTIVOTE_PUNTUACION_FONDO", "1") != "0"
+puntuador = PuntuadorFondo(
+    firma_corpus=firma_corpus,
+    textos_corpus=lambda: textos_de_publicaciones(cargar_corpus()),
+    clasificar=puntuar_texto,
+    puntajes=puntajes_cache,
+    intervalo=float(os.getenv("SENTIVOTE_PUNTUACION_INTERVALO", "30")),
+    coordinacion=PUNTAJES_COMPARTIDOS or None,
+)
+
+def iniciar_puntuacion_fondo():
+    """
+    Arranca la cola de puntuación en segundo plano si hay modelo y no está desactivada.
+    Se llama solo en el proceso que atiende peticiones (lifespan de servidor.py o el
+    proceso hijo del recargador de Flask), nunca al importar el módulo.
+    """
+    if PUNTUACION_FONDO and modelo is not None:
+        puntuador.iniciar()
+
+def analizar_publicaciones(publicaciones_filtradas):
+    """
+    Clasifica cada publicación y sus comentarios. Devuelve las publicaciones procesadas
+    (con la forma que espera el frontend) y la lista de todos los textos analizados.
+    """
+    publicaciones_procesadas = []
+    todos_los_textos = textos_de_publicaciones(publicaciones_filtradas)
+
+    # Los textos repetidos (retuits, comentarios como "Fuera!") se clasifican una sola vez
+    resultados = clasificar_textos(todos_los_textos)
+    if todos_los_textos:
+        duplicados = len(todos_los_textos) - len(resultados)
+        incrementar("sentivote_textos_duplicados_total", duplicados)
+        print(f"Textos a clasificar: {len(todos_los_textos)} ({len(resultados)} únicos, {duplicados / len(todos_los_textos):.1%} duplicados)")
+
+    # Procesar cada publicación 
+    for post in publicaciones_filtradas:
+        texto_publicacion = post.get("texto", "")
+        if not texto_publicacion: continue
+        
+        # 1. Análisis del Post
+        sent_post, conf_post = resultados[texto_publicacion]
+
+        # 2. Análisis de Comentarios
+        comentarios_procesados = []
+        sentimientos_comments = []
+        confianzas_comments = []
+
+
+        for com in post.get("comentarios", []):
+            txt_com = com.get("texto_comentario", "")
+            if not txt_com: continue
+            
+            sent_com, conf_com = resultados[txt_com]
+            
+            comentarios_procesados.append({
+                "id_comentario": com.get("id_comentario"),
+                "texto_comentario": txt_com,
+                "sentimiento_comentario": sent_com,
+                "confianza_comentario": round(conf_com, 3)
+            })
+            sentimientos_comments.append(sent_com)
+            confianzas_comments.append(conf_com)
+
+        # 3. Lógica de Sentimiento Final (Ponderado)
+        if sentimientos_comments:
+            avg_sent_comments = max(set(sentimientos_comments), key=sentimientos_comments.count)
+            avg_conf_comments = sum(confianzas_comments) / len(confianzas_comments)
+        else:
+            avg_sent_comments = "NEU"
+            avg_conf_comments = 0.5
+
+        # Si el post es NEG o los comentarios son mayormente NEG -> Final NEG
+        if sent_post == "NEG" or avg_sent_comments == "NEG":
+            sent_final = "NEG"
+        elif sent_post == "POS" and avg_sent_comments == "POS":
+            sent_final = "POS"
+        else:
+            sent_final = "NEU"
+        
+        conf_final = alpha * conf_post + (1 - alpha) * avg_conf_comments
+        
+        fecha = post.get("fecha", "")
+        
+        usuario = post.get("usuario", "Anónimo")
+        
+        publicaciones_procesadas.append({
+            "id_post": str(post.get("id_post")), # Aseguramos que coincida con la interface
+            "texto": texto_publicacion, # CAMBIO: "text" -> "texto"
+            "usuario": usuario, # CAMBIO: Enviamos el usuario real (@JacoboG_Ecu)
+            "candidato": post.get("candidato"), 
+            "fecha": post.get("fecha"),
+            
+            "sentiment": sent_final,
+            "confidence": round(conf_final, 3),
+            "platform": "twitter",
+            "candidato": post.get("candidato"),
+            "comentarios": comentarios_procesados,
+            # Datos extra para el frontend si los necesita
+            "sentimiento_publicacion": sent_post,
+            "sentimiento_comentarios": avg_sent_comments,
+            "sentimiento_final": sent_final,
+            "confianza_final": round(conf_final, 3),
+            "comentarios": comentarios_procesados
+        })
+
+    incrementar("sentivote_textos_analizados_total", len(todos_los_textos))
+    return publicaciones_procesadas, todos_los_textos
+
 # --------------------------------------------------------------------------------------
 # Rutas de la API
 # --------------------------------------------------------------------------------------
+# Métricas por petición: Server-Timing en la respuesta y contadores para /metrics
+@app.before_request
+def iniciar_metricas_peticion():
+    g.inicio_peticion = time.perf_counter()
+    iniciar_peticion()
+
+@app.after_request
+def registrar_metricas_peticion(response):
+    tiempos = finalizar_peticion()
+    total = time.perf_counter() - g.get("inicio_peticion", time.perf_counter())
+    observar_duracion("total", total)
+    response.headers["Server-Timing"] = encabezado_server_timing({**tiempos, "total": total})
+    
+    ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+    incrementar("sentivote_peticiones_total", ruta=ruta, metodo=request.method, estado=response.status_code)
+    return response
+
 # Ruta raíz 
 @app.route("/", methods=["GET"])
 def home():
@@ -578,18 +1112,33 @@ def home():
 # Ruta de salud
 @app.route("/salud", methods=["GET"])
 def salud():
-    corpus = cargar_corpus()
-    min_date_str, max_date_str = obtener_rango_fechas(corpus) # <--- Llamada a la nueva función
+    # Con manifiesto vigente no se carga el corpus (tiempo constante para las sondas de salud)
+    manifiesto = leer_manifiesto_corpus()
+    if manifiesto is not None:
+        num_publicaciones = manifiesto["publicaciones"]
+        min_date_str, max_date_str = manifiesto["fecha_min"], manifiesto["fecha_max"]
+    else:
+        corpus = cargar_corpus()
+        num_publicaciones = len(corpus)
+        min_date_str, max_date_str = obtener_rango_fechas(corpus) # <--- Llamada a la nueva función
     
     return jsonify({
         "estado": "activo",
-        "publicaciones": len(corpus),
+        "publicaciones": num_publicaciones,
         "modelos": "Gemini 2.5 Flash + Robertuito Electoral FT",
         "minDate": min_date_str, # <--- ¡Nuevo campo!
-        "maxDate": max_date_str  # <--- ¡Nuevo campo!
+        "maxDate": max_date_str,  # <--- ¡Nuevo campo!
+        "manifiesto": manifiesto,
+        "puntuacion": puntuador.progreso()
     })
     
     
+# Ruta de métricas (formato de texto de Prometheus)
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return app.response_class(exportar_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    
+    
 # Ruta para análisis de sentimiento 
 @app.route("/analizar", methods=["POST"])
 def analizar():
@@ -604,178 +1153,34 @@ def analizar():
             return jsonify({"error": "Query requerida"}), 400
         
         print(f"Búsqueda recibida: '{query}'")
-        corpus = cargar_corpus()
-        
-        start_date = parse_date(fecha_desde_str, is_end=False)
-        end_date = parse_date(fecha_hasta_str, is_end=True)
-        
-        if not query:
-            return jsonify({"error": "Query requerida"}), 400
-        
-        print(f"Búsqueda recibida: '{query}'")
-        corpus = cargar_corpus()
+        with medir("corpus"):
+            corpus = cargar_corpus()
         
         # 1. PARSEO DE FECHAS DE ENTRADA
         start_date = parse_date(fecha_desde_str, is_end=False)
         end_date = parse_date(fecha_hasta_str, is_end=True)
         
-        # 2. FILTRADO INICIAL POR QUERY (Mantener la funcionalidad actual)
-        publicaciones_filtradas_por_query = [
-            p for p in corpus 
-            if query.lower() in p.get("candidato", "").replace("_", " ").lower() or 
-            query.lower() in p.get("texto", "").lower()
-        ]
-        
-        # 3. FILTRADO POR FECHA (Lógica Completada)
-        publicaciones_filtradas = []
-        
-        if start_date or end_date:
-            print(f"Aplicando filtro de fecha: Desde {start_date} hasta {end_date}")
-            for p in publicaciones_filtradas_por_query:
-                post_date_str = p.get("fecha") # Asume el formato ISO del corpus (ej. 2025-01-05T17:57:48.000Z)
-                if not post_date_str:
-                    continue
-                
-                # CORRECCIÓN CLAVE: Asegurar que la fecha del corpus sea consciente de la zona horaria.
-                try:
-                    # fromisoformat es la mejor opción para formatos ISO con Z (lo convierte a +00:00)
-                    post_date = datetime.fromisoformat(post_date_str.replace('Z', '+00:00'))
-                    
-                    # SI el corpus no tiene Z o +00:00, hay que forzarlo, pero fromisoformat generalmente lo maneja.
-                    # Si el error persiste, deberíamos forzar: post_date = post_date.replace(tzinfo=timezone.utc)
-                    
-                except ValueError:
-                    # Si el formato no es válido, lo ignoramos.
-                    continue 
-
-                is_within_start = (not start_date) or (post_date >= start_date)
-                is_within_end = (not end_date) or (post_date <= end_date)
-                
-                if is_within_start and is_within_end:
-                    publicaciones_filtradas.append(p)
-        else:
-            # Si no hay filtros de fecha, se mantienen solo los filtrados por query
-            publicaciones_filtradas = publicaciones_filtradas_por_query
+        # 2. FILTRADO POR QUERY Y FECHA
+        with medir("filtrado"):
+            publicaciones_filtradas = filtrar_publicaciones(corpus, query, start_date, end_date)
 
         print(f"Publicaciones encontradas: {len(publicaciones_filtradas)}")
         
         if not publicaciones_filtradas:
             return jsonify({"mensaje": "No se encontraron resultados", "publicaciones": []}), 200
 
-        publicaciones_procesadas = []
-        todos_los_textos = [] 
-        # Procesar cada publicación 
-        
-        for post in publicaciones_filtradas:
-            texto_publicacion = post.get("texto", "")
-            if not texto_publicacion: continue
-            
-            todos_los_textos.append(texto_publicacion)
-            
-            # 1. Análisis del Post
-            try:
-                res_post = modelo([texto_publicacion])[0]
-                
-                # Almacenar resultado PURO del modelo FT (antes del diccionario)
-                raw_post_sentiment = res_post["label"].upper().replace("NEGATIVE", "NEG").replace("POSITIVE", "POS").replace("NEUTRAL", "NEU")
-                raw_post_confidence = res_post["score"]
-                
-                # Aplicar Normalización y Refuerzo del Diccionario
-                normalized_label = raw_post_sentiment
-                sent_post, conf_post = analizar_texto_con_diccionario(
-                    texto_publicacion, normalized_label, raw_post_confidence
-                )
-            except:
-                raw_post_sentiment = "NEU (Error)"
-                raw_post_confidence = 0.0
-                sent_post, conf_post = "NEU", 0.5
-
-            # 2. Análisis de Comentarios
-            comentarios_procesados = []
-            sentimientos_comments = []
-            confianzas_comments = []
-
-
-            for com in post.get("comentarios", []):
-                txt_com = com.get("texto_comentario", "")
-                if not txt_com: continue
-                
-                todos_los_textos.append(txt_com)
-                
-                try:
-                    res_com = modelo([txt_com])[0]
-                    
-                    # Resultado PURO del modelo FT
-                    raw_com_sentiment = res_com["label"].upper().replace("NEGATIVE", "NEG").replace("POSITIVE", "POS").replace("NEUTRAL", "NEU")
-                    raw_com_confidence = res_com["score"]
-                    
-                    # Aplicar Normalización y Refuerzo del Diccionario
-                    normalized_label_com = raw_com_sentiment
-                    sent_com, conf_com = analizar_texto_con_diccionario(
-                        txt_com, normalized_label_com, raw_com_confidence
-                    )
-                except:
-                    raw_com_sentiment = "NEU (Error)"
-                    raw_com_confidence = 0.0
-                    sent_com, conf_com = "NEU", 0.5
-                
-                comentarios_procesados.append({
-                    "id_comentario": com.get("id_comentario"),
-                    "texto_comentario": txt_com,
-                    "sentimiento_comentario": sent_com,
-                    "confianza_comentario": round(conf_com, 3)
-                })
-                sentimientos_comments.append(sent_com)
-                confianzas_comments.append(conf_com)
-
-            # 3. Lógica de Sentimiento Final (Ponderado)
-            if sentimientos_comments:
-                avg_sent_comments = max(set(sentimientos_comments), key=sentimientos_comments.count)
-                avg_conf_comments = sum(confianzas_comments) / len(confianzas_comments)
-            else:
-                avg_sent_comments = "NEU"
-                avg_conf_comments = 0.5
-
-            # Si el post es NEG o los comentarios son mayormente NEG -> Final NEG
-            if sent_post == "NEG" or avg_sent_comments == "NEG":
-                sent_final = "NEG"
-            elif sent_post == "POS" and avg_sent_comments == "POS":
-                sent_final = "POS"
-            else:
-                sent_final = "NEU"
-            
-            conf_final = alpha * conf_post + (1 - alpha) * avg_conf_comments
-            
-            fecha = post.get("fecha", "")
-            
-            usuario = post.get("usuario", "Anónimo")
-            
-            publicaciones_procesadas.append({
-                "id_post": str(post.get("id_post")), # Aseguramos que coincida con la interface
-                "texto": texto_publicacion, # CAMBIO: "text" -> "texto"
-                "usuario": usuario, # CAMBIO: Enviamos el usuario real (@JacoboG_Ecu)
-                "candidato": post.get("candidato"), 
-                "fecha": post.get("fecha"),
-                
-                "sentiment": sent_final,
-                "confidence": round(conf_final, 3),
-                "platform": "twitter",
-                "candidato": post.get("candidato"),
-                "comentarios": comentarios_procesados,
-                # Datos extra para el frontend si los necesita
-                "sentimiento_publicacion": sent_post,
-                "sentimiento_comentarios": avg_sent_comments,
-                "sentimiento_final": sent_final,
-                "confianza_final": round(conf_final, 3),
-                "comentarios": comentarios_procesados
-            })
+        # La cola de puntuación en segundo plano se pausa mientras hay análisis en curso
+        with puntuador.peticion_activa():
+            # 3. ANÁLISIS DE SENTIMIENTO (etapa CPU-intensiva, en el ejecutor acotado)
+            publicaciones_procesadas, todos_los_textos = ejecutar_en_cpu(analizar_publicaciones, publicaciones_filtradas)
 
-        print("\nGenerando wordclouds...")
-       # Wordcloud General (Multicolor por defecto 'viridis' o 'Set2')
-        wc_general, _ = generar_wordcloud(todos_los_textos, colormap='Dark2') 
-        
-        # Wordclouds por sentimiento (Con colores específicos)
-        wc_sentimientos = generar_wordclouds_por_sentimiento(publicaciones_procesadas)
+            print("\nGenerando wordclouds...")
+           # Wordcloud General (Multicolor por defecto 'viridis' o 'Set2')
+            wc_general, _ = ejecutar_en_cpu(generar_wordcloud, todos_los_textos, colormap='Dark2') 
+            
+            # Wordclouds por sentimiento (Con colores específicos). Las llamadas a Gemini se
+            # hacen en este hilo; solo el dibujo de cada nube pasa por el ejecutor
+            wc_sentimientos = generar_wordclouds_por_sentimiento(publicaciones_procesadas)
 
         return jsonify({
             "publicaciones": publicaciones_procesadas,
@@ -814,12 +1219,14 @@ def generar_conclusiones():
         
         try:
             if model_gemini:
-                resp = model_gemini.generate_content(prompt)
+                with medir("gemini"):
+                    resp = model_gemini.generate_content(prompt)
                 return jsonify({"conclusion": resp.text.strip()})
             else:
                 raise Exception("Modelo no configurado")
         except Exception as ia_error:
             print(f"Error IA: {ia_error}")
+            incrementar("sentivote_gemini_fallbacks_total", origen="conclusiones")
             return jsonify({
                 "conclusion": "El análisis muestra tendencias mixtas. Se recomienda revisar los comentarios destacados para mayor contexto.",
                 "nota": "Generado localmente (IA no disponible)"
@@ -854,4 +1261,8 @@ if __name__ == "__main__":
     
 
     
+    # Con debug=True el recargador de Flask vuelve a ejecutar este bloque en un proceso
+    # hijo (WERKZEUG_RUN_MAIN=true) que es el que atiende; el padre solo vigila archivos
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        iniciar_puntuacion_fondo()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
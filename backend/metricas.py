@@ -0,0 +1,146 @@
+"""
+Métricas de rendimiento del backend.
+
+- medir("etapa"): mide una etapa con nombre. Dentro de una petición, las duraciones
+  se acumulan por etapa y se devuelven en la cabecera Server-Timing; al terminar la
+  petición cada total se registra en un histograma.
+- Contadores: peticiones, textos analizados, aciertos/fallos de caché y respaldos
+  (fallbacks) cuando Gemini no está disponible.
+- exportar_prometheus(): todo lo anterior en formato de texto de Prometheus (/metrics).
+
+Las métricas son por proceso: con varios workers, cada uno expone las suyas.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites (en segundos) de los buckets de los histogramas de duración
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_histogramas = {}   # etapa -> {"buckets": [..], "suma": float, "cuenta": int}
+_contadores = {}    # (nombre, etiquetas ordenadas) -> valor
+
+# Duraciones acumuladas de la petición en curso (etapa -> segundos)
+_tiempos_peticion = contextvars.ContextVar("tiempos_peticion", default=None)
+
+DESCRIPCIONES = {
+    "sentivote_peticiones_total": "Peticiones HTTP atendidas por ruta, método y estado.",
+    "sentivote_textos_analizados_total": "Textos (publicaciones y comentarios) clasificados.",
+    "sentivote_textos_resueltos_total": "Textos clasificados por etapa de la cascada (insulto, diccionario, modelo, error).",
+    "sentivote_textos_duplicados_total": "Textos repetidos dentro de una petición que no se volvieron a clasificar.",
+    "sentivote_cache_consultas_total": "Consultas a cachés internas por resultado (acierto/fallo).",
+    "sentivote_gemini_fallbacks_total": "Veces que se usó la lógica local porque Gemini no respondió o no está configurado.",
+}
+
+
+# --------------------------------------------------------------------------------------
+# Medición de etapas
+# --------------------------------------------------------------------------------------
+def iniciar_peticion():
+    """Empieza a acumular las duraciones de etapas de la petición actual."""
+    tiempos = {}
+    _tiempos_peticion.set(tiempos)
+    return tiempos
+
+
+def finalizar_peticion():
+    """Registra en los histogramas los totales de la petición y devuelve sus duraciones."""
+    tiempos = _tiempos_peticion.get()
+    _tiempos_peticion.set(None)
+    if not tiempos:
+        return {}
+    for etapa, segundos in tiempos.items():
+        observar_duracion(etapa, segundos)
+    return tiempos
+
+
+@contextmanager
+def medir(etapa):
+    """Mide el bloque con el nombre de etapa indicado."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        acumular(etapa, time.perf_counter() - inicio)
+
+
+def acumular(etapa, segundos):
+    """Suma una duración ya medida a la etapa indicada."""
+    tiempos = _tiempos_peticion.get()
+    if tiempos is None:
+        # Fuera de una petición (p. ej. tareas en segundo plano): registrar directamente
+        observar_duracion(etapa, segundos)
+    else:
+        tiempos[etapa] = tiempos.get(etapa, 0.0) + segundos
+
+
+def observar_duracion(etapa, segundos):
+    with _lock:
+        hist = _histogramas.setdefault(etapa, {"buckets": [0] * len(BUCKETS_SEGUNDOS), "suma": 0.0, "cuenta": 0})
+        for i, limite in enumerate(BUCKETS_SEGUNDOS):
+            if segundos <= limite:
+                hist["buckets"][i] += 1
+        hist["suma"] += segundos
+        hist["cuenta"] += 1
+
+
+def encabezado_server_timing(tiempos):
+    """Formatea las duraciones como cabecera Server-Timing (en milisegundos)."""
+    return ", ".join(f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in tiempos.items())
+
+
+# --------------------------------------------------------------------------------------
+# Contadores
+# --------------------------------------------------------------------------------------
+def incrementar(nombre, cantidad=1, **etiquetas):
+    clave = (nombre, tuple(sorted(etiquetas.items())))
+    with _lock:
+        _contadores[clave] = _contadores.get(clave, 0) + cantidad
+
+
+def registrar_cache(cache, acierto):
+    incrementar("sentivote_cache_consultas_total", cache=cache, resultado="acierto" if acierto else "fallo")
+
+
+# --------------------------------------------------------------------------------------
+# Exportación en formato Prometheus
+# --------------------------------------------------------------------------------------
+def _formatear_etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    partes = []
+    for clave, valor in etiquetas:
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{clave}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def exportar_prometheus():
+    """Devuelve todas las métricas en el formato de texto de Prometheus."""
+    with _lock:
+        contadores = sorted(_contadores.items())
+        histogramas = {etapa: {**h, "buckets": list(h["buckets"])} for etapa, h in sorted(_histogramas.items())}
+
+    lineas = []
+    nombres_vistos = set()
+    for (nombre, etiquetas), valor in contadores:
+        if nombre not in nombres_vistos:
+            nombres_vistos.add(nombre)
+            lineas.append(f"# HELP {nombre} {DESCRIPCIONES.get(nombre, nombre)}")
+            lineas.append(f"# TYPE {nombre} counter")
+        lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+
+    nombre = "sentivote_etapa_duracion_segundos"
+    lineas.append(f"# HELP {nombre} Duración de cada etapa por petición (corpus, filtrado, inferencia, diccionario, wordcloud, gemini, puntuacion_fondo).")
+    lineas.append(f"# TYPE {nombre} histogram")
+    for etapa, hist in histogramas.items():
+        for limite, cuenta in zip(BUCKETS_SEGUNDOS, hist["buckets"]):
+            lineas.append(f'{nombre}_bucket{{etapa="{etapa}",le="{limite}"}} {cuenta}')
+        lineas.append(f'{nombre}_bucket{{etapa="{etapa}",le="+Inf"}} {hist["cuenta"]}')
+        lineas.append(f'{nombre}_sum{{etapa="{etapa}"}} {hist["suma"]}')
+        lineas.append(f'{nombre}_count{{etapa="{etapa}"}} {hist["cuenta"]}')
+
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,170 @@
+"""
+Tokens precalculados del corpus para el modelo fine-tuned.
+
+Los textos del corpus (publicaciones y comentarios) no cambian entre peticiones,
+así que se tokenizan una sola vez, offline, con el tokenizer del modelo. Se guardan
+en un archivo .npz compacto:
+- hashes:      hash de 64 bits de cada texto (ordenados, para búsqueda binaria)
+- inicios:     posición de los ids de cada texto dentro de 'ids'
+- longitudes:  cantidad de tokens de cada texto
+- ids:         input ids concatenados (uint16 si el vocabulario cabe)
+
+El archivo se nombra con la huella del tokenizer (vocabulario, normalización y
+max_length): si el modelo cambia, el archivo anterior simplemente deja de usarse.
+Los textos que no están en el archivo (p. ej. un corpus más nuevo) se tokenizan
+como siempre.
+
+Uso (desde la carpeta backend):
+
+    python pretokenizado.py
+    python pretokenizado.py --corpus data/corpus_completo.json --salida data/tokens
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import torch
+
+# Debe coincidir con el max_length del pipeline del backend
+MAX_LENGTH_MODELO = 128
+
+
+def hash_texto(texto):
+    """Hash de 64 bits (sin signo) del texto exacto."""
+    return int.from_bytes(hashlib.blake2b(texto.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def huella_tokenizer(tokenizer, max_length=MAX_LENGTH_MODELO):
+    """Huella del tokenizer: cambia si cambia el vocabulario, la normalización o max_length."""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        config = json.loads(backend.to_str())
+        # El truncado y el relleno son estado de la última llamada, no del tokenizer
+        config.pop("truncation", None)
+        config.pop("padding", None)
+        serializado = json.dumps(config, sort_keys=True)
+    else:
+        serializado = json.dumps(sorted(tokenizer.get_vocab().items()))
+    serializado += f"|{type(tokenizer).__name__}|{max_length}"
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()[:16]
+
+
+def ruta_tokens(carpeta, huella):
+    return os.path.join(carpeta, f"tokens_{huella}.npz")
+
+
+def textos_del_corpus(corpus):
+    """Textos que clasifica /analizar: cada publicación y sus comentarios (sin repetir)."""
+    textos = {}
+    for post in corpus:
+        if post.get("texto"):
+            textos[post["texto"]] = None
+        for com in post.get("comentarios", []):
+            if com.get("texto_comentario"):
+                textos[com["texto_comentario"]] = None
+    return list(textos)
+
+
+def pretokenizar(textos, tokenizer, ruta_salida, max_length=MAX_LENGTH_MODELO):
+    """Tokeniza los textos igual que el pipeline (truncation + max_length) y guarda el archivo."""
+    codificados = tokenizer(textos, truncation=True, max_length=max_length)["input_ids"]
+    hashes = np.array([hash_texto(t) for t in textos], dtype=np.uint64)
+    orden = np.argsort(hashes, kind="stable")
+
+    longitudes = np.array([len(codificados[i]) for i in orden], dtype=np.int32)
+    inicios = np.zeros(len(longitudes), dtype=np.int64)
+    np.cumsum(longitudes[:-1], out=inicios[1:])
+    tipo_ids = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+    ids = np.fromiter((tok for i in orden for tok in codificados[i]), dtype=tipo_ids, count=int(longitudes.sum()))
+
+    os.makedirs(os.path.dirname(ruta_salida) or ".", exist_ok=True)
+    np.savez(ruta_salida, hashes=hashes[orden], inicios=inicios, longitudes=longitudes, ids=ids)
+    return len(textos), ids.nbytes
+
+
+class TokensCorpus:
+    """Índice de tokens precalculados: texto -> input ids."""
+
+    def __init__(self, ruta):
+        with np.load(ruta) as datos:
+            self.hashes = datos["hashes"]
+            self.inicios = datos["inicios"]
+            self.longitudes = datos["longitudes"]
+            self.ids = datos["ids"]
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def buscar(self, texto):
+        """Input ids del texto, o None si no se pretokenizó."""
+        clave = np.uint64(hash_texto(texto))
+        fila = int(np.searchsorted(self.hashes, clave))
+        if fila >= len(self.hashes) or self.hashes[fila] != clave:
+            return None
+        inicio = self.inicios[fila]
+        return self.ids[inicio:inicio + self.longitudes[fila]]
+
+
+def cargar_tokens_corpus(carpeta, tokenizer, max_length=MAX_LENGTH_MODELO):
+    """Carga el archivo de tokens que corresponde al tokenizer actual; None si no existe."""
+    ruta = ruta_tokens(carpeta, huella_tokenizer(tokenizer, max_length))
+    if not os.path.isfile(ruta):
+        return None
+    return TokensCorpus(ruta)
+
+
+# --------------------------------------------------------------------------------------
+# Inferencia a partir de ids
+# --------------------------------------------------------------------------------------
+def lote_de_tensores(secuencias, pad_id):
+    """Rellena una lista de secuencias de ids y devuelve (input_ids, attention_mask)."""
+    largo = max(len(s) for s in secuencias)
+    input_ids = torch.full((len(secuencias), largo), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(secuencias), largo), dtype=torch.long)
+    for i, secuencia in enumerate(secuencias):
+        input_ids[i, :len(secuencia)] = torch.as_tensor(secuencia.astype(np.int64))
+        attention_mask[i, :len(secuencia)] = 1
+    return input_ids, attention_mask
+
+
+def inferir_ids(modelo_hf, ids):
+    """
+    Clasifica un texto ya tokenizado. Devuelve {"label", "score"} con el mismo
+    post-procesamiento (softmax en numpy) que el pipeline de sentiment-analysis.
+    """
+    input_ids, attention_mask = lote_de_tensores([ids], pad_id=0)
+    with torch.inference_mode():
+        logits = modelo_hf(input_ids=input_ids, attention_mask=attention_mask).logits[0]
+    logits = logits.float().numpy()
+    exp = np.exp(logits - np.max(logits, axis=-1, keepdims=True))
+    puntajes = exp / exp.sum(axis=-1, keepdims=True)
+    indice = int(puntajes.argmax())
+    return {"label": modelo_hf.config.id2label[indice], "score": puntajes[indice].item()}
+
+
+if __name__ == "__main__":
+    from transformers import AutoTokenizer
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Pretokeniza los textos del corpus con el tokenizer del modelo.")
+    parser.add_argument("--modelo", default=os.path.join(backend_dir, "..", "fineTuning", "modelo_final"))
+    parser.add_argument("--corpus", default=os.path.join(backend_dir, "data", "corpus_completo.json"),
+                        help="corpus_completo.json o carpeta del corpus columnar.")
+    parser.add_argument("--salida", default=os.path.join(backend_dir, "data", "tokens"))
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH_MODELO)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.corpus):
+        from corpus_columnar import cargar_corpus_columnar
+        corpus = cargar_corpus_columnar(args.corpus)
+    else:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+
+    tokenizer = AutoTokenizer.from_pretrained(args.modelo)
+    ruta = ruta_tokens(args.salida, huella_tokenizer(tokenizer, args.max_length))
+    cantidad, tamano = pretokenizar(textos_del_corpus(corpus), tokenizer, ruta, args.max_length)
+    print(f"{cantidad} textos pretokenizados en '{ruta}' ({tamano / 1024:.0f} KiB de ids)")
@@ -0,0 +1,287 @@
+"""
+Puntuación en segundo plano de los textos del corpus.
+
+Cuando el corpus cambia (nuevo corpus_completo.json o corpus columnar), un hilo
+compara sus textos con los ya puntuados y clasifica solo los nuevos, en lotes,
+guardando el resultado en la caché de puntajes del proceso. Así las primeras
+consultas después de una actualización no pagan el costo completo del modelo.
+
+La prioridad es baja: antes de cada lote el hilo espera a que no haya peticiones
+de análisis en curso, de modo que nunca compite con una consulta en vivo.
+
+Con varios workers (servidor.py con SENTIVOTE_WORKERS > 1) se usa una ruta de
+coordinación compartida:
+- Los puntajes se guardan en AlmacenPuntajes (un SQLite en esa ruta), así que lo
+  que puntúa un proceso lo reutilizan todos. Cada puntaje lleva la versión del
+  modelo y la configuración que lo produjeron; al abrir el almacén con otra
+  versión se descartan los de versiones anteriores.
+- Un solo proceso puntúa: el que obtiene el bloqueo exclusivo <ruta>.lider. Los
+  demás esperan y toman el relevo si ese proceso termina.
+- Cada petición de análisis, en cualquier worker, mantiene un bloqueo compartido
+  sobre <ruta>.peticiones; el puntuador solo procesa un lote cuando nadie lo tiene.
+"""
+
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from metricas import iniciar_peticion, observar_duracion
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class AlmacenPuntajes(MutableMapping):
+    """
+    Diccionario texto -> (sentimiento, confianza) guardado en SQLite y compartido
+    entre procesos. Solo se ven los puntajes de `version` (huella del modelo y de la
+    configuración, ver huella_puntajes en main.py): con otro modelo el mismo texto
+    puede tener otro puntaje. Un proceso que aún use la versión anterior (p. ej.
+    durante un reinicio) escribe sus puntajes aparte, sin mezclarlos.
+
+    Cada proceso guarda además en memoria los puntajes ya leídos: dentro de una
+    versión el puntaje de un texto no cambia, así que esa copia no se desactualiza.
+    """
+
+    def __init__(self, ruta, version=""):
+        self.ruta = ruta
+        self.version = version
+        self._memoria = {}
+        self._local = threading.local()
+        conexion = self.conexion()
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS puntajes_version (texto TEXT NOT NULL, version TEXT NOT NULL, "
+            "sentimiento TEXT, confianza REAL, PRIMARY KEY (version, texto))"
+        )
+        # Los puntajes de otras versiones (y la tabla anterior, sin versión) no se vuelven a usar
+        descartados = conexion.execute("DELETE FROM puntajes_version WHERE version != ?", (version,)).rowcount
+        conexion.execute("DROP TABLE IF EXISTS puntajes")
+        if descartados:
+            print(f"Puntajes descartados por cambio de modelo o configuración: {descartados}")
+
+    def conexion(self):
+        """Conexión del hilo actual (se abre la primera vez)."""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def __getitem__(self, texto):
+        puntaje = self._memoria.get(texto)
+        if puntaje is None:
+            fila = self.conexion().execute(
+                "SELECT sentimiento, confianza FROM puntajes_version WHERE version = ? AND texto = ?",
+                (self.version, texto),
+            ).fetchone()
+            if fila is None:
+                raise KeyError(texto)
+            puntaje = self._memoria[texto] = (fila[0], fila[1])
+        return puntaje
+
+    def __setitem__(self, texto, puntaje):
+        self.conexion().execute(
+            "INSERT OR REPLACE INTO puntajes_version VALUES (?, ?, ?, ?)", (texto, self.version, *puntaje)
+        )
+        self._memoria[texto] = tuple(puntaje)
+
+    def __delitem__(self, texto):
+        self._memoria.pop(texto, None)
+        borrados = self.conexion().execute(
+            "DELETE FROM puntajes_version WHERE version = ? AND texto = ?", (self.version, texto)
+        ).rowcount
+        if not borrados:
+            raise KeyError(texto)
+
+    def __contains__(self, texto):
+        try:
+            self[texto]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        consulta = self.conexion().execute("SELECT texto FROM puntajes_version WHERE version = ?", (self.version,))
+        return iter([fila[0] for fila in consulta])
+
+    def __len__(self):
+        consulta = self.conexion().execute("SELECT count(*) FROM puntajes_version WHERE version = ?", (self.version,))
+        return consulta.fetchone()[0]
+
+
+class PuntuadorFondo:
+    """
+    Cola de puntuación en segundo plano.
+
+    Args:
+        firma_corpus: función sin argumentos que cambia de valor cuando cambia el corpus.
+        textos_corpus: función sin argumentos que devuelve los textos a puntuar.
+        clasificar: función texto -> (sentimiento, confianza) o None si no se pudo clasificar.
+        puntajes: diccionario compartido texto -> (sentimiento, confianza).
+        coordinacion: ruta base de los bloqueos entre procesos (ver el docstring del
+            módulo); None coordina solo las peticiones de este proceso.
+    """
+
+    def __init__(self, firma_corpus, textos_corpus, clasificar, puntajes, tamano_lote=32, intervalo=30.0,
+                 coordinacion=None):
+        self.firma_corpus = firma_corpus
+        self.textos_corpus = textos_corpus
+        self.clasificar = clasificar
+        self.puntajes = puntajes
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.coordinacion = coordinacion
+        if coordinacion and fcntl is None:
+            print("⚠️ ADVERTENCIA: fcntl no disponible; la puntuación en segundo plano no se coordina entre procesos.")
+            self.coordinacion = None
+        self._archivo_lider = None
+
+        self._firma = None
+        self._pendientes = []
+        self._total = 0
+        self._puntuados = 0
+        # Puntajes en la caché: se cuentan al revisar el corpus y se suman los de cada lote
+        # (/salud no recorre la caché en cada consulta)
+        self._en_cache = None
+        self._estado = "detenido"
+        self._hilo = None
+
+        self._lock = threading.Lock()
+        self._peticiones_activas = 0
+        self._sin_peticiones = threading.Condition(self._lock)
+
+    # ----------------------------------------------------------------------------------
+    # Prioridad: las peticiones en vivo pausan la cola
+    # ----------------------------------------------------------------------------------
+    @contextmanager
+    def peticion_activa(self):
+        """Marca una petición de análisis en curso mientras dura el bloque."""
+        with self._lock:
+            self._peticiones_activas += 1
+        # Bloqueo compartido visible para el puntuador de cualquier worker (uno por petición:
+        # flock se asocia al archivo abierto, no al proceso)
+        archivo = None
+        if self.coordinacion:
+            archivo = open(self.coordinacion + ".peticiones", "a")
+            fcntl.flock(archivo, fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if archivo is not None:
+                archivo.close()
+            with self._lock:
+                self._peticiones_activas -= 1
+                if self._peticiones_activas == 0:
+                    self._sin_peticiones.notify_all()
+
+    def _esperar_turno(self, pausa=0.05):
+        with self._lock:
+            if self._peticiones_activas:
+                self._estado = "en_pausa"
+                self._sin_peticiones.wait_for(lambda: self._peticiones_activas == 0)
+            self._estado = "en_curso"
+        if self.coordinacion:
+            # Sin bloquear: si algún worker atiende una petición, se reintenta tras una pausa
+            with open(self.coordinacion + ".peticiones", "a") as archivo:
+                while True:
+                    try:
+                        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        self._estado = "en_pausa"
+                        time.sleep(pausa)
+            self._estado = "en_curso"
+
+    def es_lider(self):
+        """True si este proceso es el que puntúa (siempre, sin coordinación entre procesos)."""
+        if not self.coordinacion or self._archivo_lider is not None:
+            return True
+        archivo = open(self.coordinacion + ".lider", "a")
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            archivo.close()
+            return False
+        # El bloqueo se mantiene mientras viva el proceso
+        self._archivo_lider = archivo
+        return True
+
+    # ----------------------------------------------------------------------------------
+    # Bucle de trabajo
+    # ----------------------------------------------------------------------------------
+    def iniciar(self):
+        """Arranca el hilo de fondo (una sola vez por proceso)."""
+        if self._hilo is not None:
+            return
+        self._estado = "inactivo"
+        self._hilo = threading.Thread(target=self._bucle, name="sentivote-puntuacion", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            try:
+                if not self.es_lider():
+                    self._estado = "otro_proceso"
+                    time.sleep(self.intervalo)
+                    continue
+                self.revisar_corpus()
+                while self._pendientes:
+                    self._esperar_turno()
+                    self.procesar_lote()
+                self._estado = "inactivo"
+            except Exception as e:
+                print(f"ERROR en la puntuación en segundo plano: {e}")
+                self._estado = "error"
+            time.sleep(self.intervalo)
+
+    def revisar_corpus(self):
+        """Si el corpus cambió, encola los textos que aún no tienen puntaje."""
+        firma = self.firma_corpus()
+        if firma is None or firma == self._firma:
+            return
+        textos = list(dict.fromkeys(self.textos_corpus()))
+        vigentes = set(textos)
+
+        # Los puntajes de textos que ya no están en el corpus se descartan
+        for texto in [t for t in list(self.puntajes) if t not in vigentes]:
+            self.puntajes.pop(texto, None)
+
+        self._pendientes = [t for t in textos if t not in self.puntajes]
+        self._en_cache = len(self.puntajes)
+        self._total = len(self._pendientes)
+        self._puntuados = 0
+        self._firma = firma
+        print(f"Corpus actualizado: {self._total} textos nuevos por puntuar en segundo plano.")
+
+    def procesar_lote(self):
+        lote, self._pendientes = self._pendientes[:self.tamano_lote], self._pendientes[self.tamano_lote:]
+        # Las etapas internas (inferencia, diccionario) se acumulan aparte y no se mezclan
+        # con las de las peticiones; solo se registra la duración total del lote
+        iniciar_peticion()
+        inicio = time.perf_counter()
+        for texto in lote:
+            if texto in self.puntajes:
+                continue
+            resultado = self.clasificar(texto)
+            if resultado is not None:
+                self.puntajes[texto] = resultado
+                if self._en_cache is not None:
+                    self._en_cache += 1
+        observar_duracion("puntuacion_fondo", time.perf_counter() - inicio)
+        self._puntuados += len(lote)
+
+    def progreso(self):
+        """Estado de la cola para /salud."""
+        return {
+            "estado": self._estado,
+            "puntuados": self._puntuados,
+            "pendientes": len(self._pendientes),
+            "total": self._total,
+            "en_cache": self._en_cache,
+        }
@@ -0,0 +1,84 @@
+"""
+Modo de servicio de producción (ASGI) para la API de SentiVote.
+
+La app Flask de main.py se sirve con uvicorn a través de un adaptador WSGI→ASGI:
+las rutas y las respuestas son exactamente las mismas que en desarrollo. Cada
+petición se atiende en un pool de hilos HTTP (espera de red, barato) y las etapas
+CPU-intensivas de /analizar pasan por el ejecutor acotado de main.py, de modo que
+las rutas ligeras como /salud siguen respondiendo mientras hay análisis en curso.
+
+Uso (desde la carpeta backend):
+
+    python servidor.py
+
+Variables de entorno:
+    SENTIVOTE_HOST         Interfaz de escucha (por defecto 0.0.0.0)
+    SENTIVOTE_PUERTO       Puerto (por defecto 5000)
+    SENTIVOTE_WORKERS      Procesos de uvicorn; cada uno carga su propio modelo (por defecto 1)
+    SENTIVOTE_HILOS_HTTP   Hilos por proceso para atender peticiones (por defecto 32)
+    SENTIVOTE_HILOS_CPU    Etapas CPU-intensivas simultáneas por proceso (por defecto 2)
+    SENTIVOTE_HILOS_TORCH  Hilos de PyTorch por proceso (opcional)
+    SENTIVOTE_PUNTUACION_FONDO  0 desactiva la puntuación del corpus en segundo plano (por defecto 1)
+    SENTIVOTE_PUNTAJES          SQLite de puntajes compartido entre workers; con más de un worker
+                                por defecto data/puntajes.sqlite (un solo worker puntúa en
+                                segundo plano y se pausa con las peticiones de todos)
+    SENTIVOTE_ALMACENAMIENTO    "mongo" lee el corpus de MongoDB (MONGO_URI, MONGO_DB_NAME,
+                                MONGO_COLLECTION_NAME) y "sqlite" de SENTIVOTE_SQLITE, en lugar
+                                del archivo (por defecto "archivo")
+    SENTIVOTE_SQLITE            Base SQLite del corpus (por defecto data/corpus.sqlite)
+    SENTIVOTE_SQLITE_BUSQUEDA   "subcadena" busca igual que sobre el JSON en lugar de FTS5 (por defecto "fts")
+    SENTIVOTE_MONGO_POOL        Conexiones máximas del pool de MongoDB por proceso (por defecto 20)
+    SENTIVOTE_MONGO_BUSQUEDA    "texto" usa el índice de texto en lugar de $regex (por defecto "regex")
+"""
+
+import os
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+
+HOST = os.getenv("SENTIVOTE_HOST", "0.0.0.0")
+PUERTO = int(os.getenv("SENTIVOTE_PUERTO", "5000"))
+WORKERS = int(os.getenv("SENTIVOTE_WORKERS", "1"))
+HILOS_HTTP = int(os.getenv("SENTIVOTE_HILOS_HTTP", "32"))
+
+# Con varios workers los puntajes se comparten (antes de importar main, que lo lee; los
+# workers heredan la variable del supervisor)
+if WORKERS > 1:
+    os.environ.setdefault("SENTIVOTE_PUNTAJES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "puntajes.sqlite"))
+
+
+class ConPuntuacionFondo:
+    """
+    Envuelve la app ASGI y arranca la puntuación en segundo plano en el evento startup
+    del lifespan. Ese evento solo llega a los procesos que atienden peticiones, no al
+    supervisor de uvicorn.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            await self.app(scope, receive, send)
+            return
+        while True:
+            mensaje = await receive()
+            if mensaje["type"] == "lifespan.startup":
+                iniciar_puntuacion_fondo()
+                await send({"type": "lifespan.startup.complete"})
+            elif mensaje["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+if __name__ == "__main__":
+    print(f"Iniciando servidor ASGI en {HOST}:{PUERTO} ({WORKERS} workers, {HILOS_HTTP} hilos HTTP)...")
+    uvicorn.run("servidor:asgi_app", host=HOST, port=PUERTO, workers=WORKERS)
+else:
+    # Solo los procesos que importan "servidor" (los que sirven) cargan main, con su modelo
+    # y su corpus; el proceso lanzado con `python servidor.py` solo supervisa
+    from main import app, iniciar_puntuacion_fondo
+
+    # Los hilos HTTP deben superar a los de CPU: una petición a /analizar que espera su turno
+    # en el ejecutor acotado ocupa un hilo HTTP, y siempre deben quedar hilos libres para /salud.
+    asgi_app = ConPuntuacionFondo(WSGIMiddleware(app, workers=HILOS_HTTP))
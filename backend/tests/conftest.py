@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from webScraping.preprocessing.convertir_corpus_columnar import convertir_json_a_columnar
+
+
+def _corpus_de_prueba():
+    return [
+        {
+            "id_post": 1, "candidato": "Daniel_Noboa", "usuario": "@a",
+            "fecha": "2025-01-10T00:00:00.000Z", "texto": "post uno", "texto_limpio": "post uno",
+            "comentarios": [
+                {"id_comentario": 1, "texto_comentario": "bien", "texto_comentario_limpio": "bien"},
+                {"id_comentario": 2, "texto_comentario": "mal", "texto_comentario_limpio": "mal"},
+            ],
+        },
+        {
+            "id_post": 2, "candidato": "Luisa_Gonzalez", "usuario": "@b",
+            "fecha": "2025-02-15T00:00:00.000Z", "texto": "post dos", "texto_limpio": "post dos",
+            "comentarios": [],
+        },
+        {
+            "id_post": 3, "candidato": "Daniel_Noboa", "usuario": "@c",
+            "fecha": "fecha invalida", "texto": "sin fecha", "texto_limpio": "sin fecha",
+            "comentarios": [{"id_comentario": 1, "texto_comentario": "ok", "texto_comentario_limpio": "ok"}],
+        },
+    ]
+
+
+def _convertir(tmp_path, corpus):
+    ruta_json = tmp_path / "corpus.json"
+    ruta_json.write_text(json.dumps(corpus), encoding="utf-8")
+    convertir_json_a_columnar(str(ruta_json), str(tmp_path / "columnar"))
+    return str(tmp_path / "columnar")
+
+
+@pytest.fixture
+def corpus_de_prueba():
+    """Función que devuelve una copia nueva del corpus de prueba (las pruebas la modifican)."""
+    return _corpus_de_prueba
+
+
+@pytest.fixture
+def convertir_corpus():
+    """Función (carpeta, corpus) -> carpeta del corpus columnar convertido desde JSON."""
+    return _convertir
@@ -0,0 +1,175 @@
+import json
+from backend.main import (
+    cargar_corpus_columnar,
+    abrir_corpus_mapeado,
+    filtrar_publicaciones,
+    obtener_rango_fechas,
+    parse_date
+)
+
+
+def test_corpus_columnar_equivale_al_json(tmp_path, corpus_de_prueba, convertir_corpus):
+    corpus = corpus_de_prueba()[:2]
+    convertir_corpus(tmp_path, corpus)
+    cargado = cargar_corpus_columnar(str(tmp_path / "columnar"))
+
+    # Las columnas *_limpio no las usa la API y no se cargan
+    assert cargado == [
+        {
+            "id_post": 1, "candidato": "Daniel_Noboa", "usuario": "@a",
+            "fecha": "2025-01-10T00:00:00.000Z", "texto": "post uno",
+            "comentarios": [
+                {"id_comentario": 1, "texto_comentario": "bien"},
+                {"id_comentario": 2, "texto_comentario": "mal"},
+            ],
+        },
+        {
+            "id_post": 2, "candidato": "Luisa_Gonzalez", "usuario": "@b",
+            "fecha": "2025-02-15T00:00:00.000Z", "texto": "post dos",
+            "comentarios": [],
+        },
+    ]
+
+
+def _como_dict(post):
+    return {**post, "comentarios": [dict(c) for c in post["comentarios"]]}
+
+
+def test_corpus_mapeado_filtra_igual_que_la_lista(tmp_path, corpus_de_prueba, convertir_corpus):
+    corpus = corpus_de_prueba()
+    mapeado = abrir_corpus_mapeado(convertir_corpus(tmp_path, corpus))
+    lista = cargar_corpus_columnar(str(tmp_path / "columnar"))
+
+    assert len(mapeado) == 3
+    assert obtener_rango_fechas(mapeado) == obtener_rango_fechas(lista) == ("2025-01-10", "2025-02-15")
+
+    casos = [
+        ("daniel noboa", None, None),
+        ("POST", None, None),
+        ("noboa", parse_date("2025-01-01"), parse_date("2025-01-31", is_end=True)),
+        ("post", parse_date("2025-02-01"), None),
+    ]
+    for query, desde, hasta in casos:
+        esperado = [_como_dict(p) for p in filtrar_publicaciones(lista, query, desde, hasta)]
+        obtenido = [_como_dict(p) for p in filtrar_publicaciones(mapeado, query, desde, hasta)]
+        assert obtenido == esperado
+
+
+def test_corpus_mapeado_con_valores_nulos(tmp_path, corpus_de_prueba, convertir_corpus):
+    corpus = corpus_de_prueba()
+    corpus[0]["usuario"] = None
+    corpus[0]["comentarios"][1]["texto_comentario"] = None
+    del corpus[1]["texto"]
+    mapeado = abrir_corpus_mapeado(convertir_corpus(tmp_path, corpus))
+
+    # Los nulos son claves ausentes, igual que en la lista cargada del corpus
+    lista = cargar_corpus_columnar(str(tmp_path / "columnar"))
+    assert [_como_dict(p) for p in mapeado] == [
+        {**{k: v for k, v in p.items() if v is not None},
+         "comentarios": [{k: v for k, v in c.items() if v is not None} for c in p["comentarios"]]}
+        for p in lista
+    ]
+    assert "usuario" not in dict(mapeado[0]) and mapeado[0].get("usuario") is None
+    assert len(mapeado[1]) == 5 and "texto" not in mapeado[1]
+    assert dict(mapeado[0]["comentarios"][1]) == {"id_comentario": 2}
+
+
+def test_reconvertir_no_altera_el_corpus_mapeado(tmp_path, corpus_de_prueba, convertir_corpus):
+    corpus = corpus_de_prueba()
+    carpeta = convertir_corpus(tmp_path, corpus)
+    mapeado = abrir_corpus_mapeado(carpeta)
+
+    # Reconvertir con otro corpus reemplaza los archivos; el mapeo abierto sigue leyendo los anteriores
+    convertir_corpus(tmp_path, [{**corpus[1], "texto": "otro texto " * 50}])
+    assert [p["texto"] for p in mapeado] == ["post uno", "post dos", "sin fecha"]
+    assert [p["texto"] for p in abrir_corpus_mapeado(carpeta)] == ["otro texto " * 50]
+    assert not [f for f in (tmp_path / "columnar").iterdir() if f.name.endswith(".tmp")]
+
+
+def test_segmentos_ingesta_y_compactacion(tmp_path, corpus_de_prueba, convertir_corpus):
+    from webScraping.preprocessing.segmentos_corpus import ingerir_segmento, compactar_segmentos
+
+    corpus = corpus_de_prueba()
+    carpeta = convertir_corpus(tmp_path, corpus[:2])
+    nuevas = tmp_path / "nuevas.json"
+    # La publicación 1 ya existe (mismo candidato y fecha) y se omite
+    nuevas.write_text(json.dumps([corpus[0], {**corpus[2], "id_post": 99}]), encoding="utf-8")
+    ingerir_segmento(str(nuevas), carpeta)
+
+    (tmp_path / "completo").mkdir()
+    esperado = cargar_corpus_columnar(convertir_corpus(tmp_path / "completo", corpus))
+    assert cargar_corpus_columnar(carpeta) == esperado
+    assert [_como_dict(p) for p in abrir_corpus_mapeado(carpeta)] == esperado
+    assert len(filtrar_publicaciones(abrir_corpus_mapeado(carpeta), "noboa")) == 2
+
+    # El manifiesto se actualiza solo con el segmento nuevo y coincide con el del corpus completo
+    manifiesto = json.loads((tmp_path / "columnar" / "manifiesto.json").read_text(encoding="utf-8"))
+    completo = json.loads((tmp_path / "completo" / "columnar" / "manifiesto.json").read_text(encoding="utf-8"))
+    campos = ["publicaciones", "comentarios", "publicaciones_por_candidato", "fecha_min", "fecha_max"]
+    assert {c: manifiesto[c] for c in campos} == {c: completo[c] for c in campos}
+    assert manifiesto["publicaciones_por_candidato"] == {"Daniel_Noboa": 2, "Luisa_Gonzalez": 1}
+
+    compactar_segmentos(carpeta)
+    assert [_como_dict(p) for p in abrir_corpus_mapeado(carpeta)] == esperado
+    manifiesto_compactado = json.loads((tmp_path / "columnar" / "manifiesto.json").read_text(encoding="utf-8"))
+    assert manifiesto_compactado["hash"] == manifiesto["hash"]
+
+
+def test_segmentos_agregan_comentarios_nuevos_de_publicaciones_existentes(tmp_path, corpus_de_prueba, convertir_corpus):
+    from webScraping.preprocessing.segmentos_corpus import ingerir_segmento, compactar_segmentos
+
+    corpus = corpus_de_prueba()
+    carpeta = convertir_corpus(tmp_path, corpus[:2])
+    regular = {"texto_comentario": "regular", "texto_comentario_limpio": "regular"}
+    otra_vez = {"texto_comentario": "otra vez", "texto_comentario_limpio": "otra vez"}
+
+    # La publicación 1 vuelve con un comentario nuevo (los que ya tiene no se repiten)
+    # y la 2, que no tenía comentarios, con uno; la 3 es nueva
+    nuevas = tmp_path / "nuevas.json"
+    nuevas.write_text(json.dumps([
+        {**corpus[0], "comentarios": corpus[0]["comentarios"] + [{"id_comentario": 3, **regular}]},
+        {**corpus[1], "comentarios": [{"id_comentario": 1, **otra_vez}]},
+        corpus[2],
+    ]), encoding="utf-8")
+    ingerir_segmento(str(nuevas), carpeta)
+    # Un segmento solo con comentarios nuevos, de una publicación de un segmento anterior
+    nuevas.write_text(json.dumps([{**corpus[2], "comentarios": [{"id_comentario": 1, **regular}]}]), encoding="utf-8")
+    ingerir_segmento(str(nuevas), carpeta)
+
+    completo = corpus_de_prueba()
+    completo[0]["comentarios"].append({"id_comentario": 3, **regular})
+    completo[1]["comentarios"].append({"id_comentario": 1, **otra_vez})
+    completo[2]["comentarios"].append({"id_comentario": 2, **regular})
+    (tmp_path / "completo").mkdir()
+    esperado = cargar_corpus_columnar(convertir_corpus(tmp_path / "completo", completo))
+
+    assert cargar_corpus_columnar(carpeta) == esperado
+    assert [_como_dict(p) for p in abrir_corpus_mapeado(carpeta)] == esperado
+    manifiesto = json.loads((tmp_path / "columnar" / "manifiesto.json").read_text(encoding="utf-8"))
+    assert manifiesto["comentarios"] == 6
+
+    compactar_segmentos(carpeta)
+    assert cargar_corpus_columnar(carpeta) == esperado
+    assert [_como_dict(p) for p in abrir_corpus_mapeado(carpeta)] == esperado
+
+
+def test_segmentos_unen_copias_repetidas_de_una_publicacion_nueva(tmp_path, corpus_de_prueba, convertir_corpus):
+    from webScraping.preprocessing.segmentos_corpus import ingerir_segmento
+
+    corpus = corpus_de_prueba()
+    carpeta = convertir_corpus(tmp_path, corpus[:2])
+    nuevo = {"id_comentario": 1, "texto_comentario": "nuevo", "texto_comentario_limpio": "nuevo"}
+    # La publicación 3 aparece dos veces en el JSON: la segunda copia trae un comentario más
+    nuevas = tmp_path / "nuevas.json"
+    nuevas.write_text(json.dumps([corpus[2], {**corpus[2], "comentarios": corpus[2]["comentarios"] + [nuevo]}]),
+                      encoding="utf-8")
+    ingerir_segmento(str(nuevas), carpeta)
+
+    completo = corpus_de_prueba()
+    completo[2]["comentarios"].append({**nuevo, "id_comentario": 2})
+    (tmp_path / "completo").mkdir()
+    esperado = cargar_corpus_columnar(convertir_corpus(tmp_path / "completo", completo))
+    assert cargar_corpus_columnar(carpeta) == esperado
+    assert [_como_dict(p) for p in abrir_corpus_mapeado(carpeta)] == esperado
+    manifiesto = json.loads((tmp_path / "columnar" / "manifiesto.json").read_text(encoding="utf-8"))
+    assert manifiesto["comentarios"] == 4
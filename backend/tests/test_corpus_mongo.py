@@ -0,0 +1,54 @@
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+# backend.main agrega la carpeta backend al path (corpus_mongo importa metricas)
+from backend.main import filtrar_publicaciones, obtener_rango_fechas, parse_date
+from backend.corpus_mongo import CorpusMongo
+from webScraping.storage.mongodb_loader import cargar_publicaciones_a_mongo
+
+
+def _corpus_mongo(corpus_de_prueba):
+    coleccion = mongomock.MongoClient()["tesis"]["corpus"]
+    cargar_publicaciones_a_mongo(corpus_de_prueba(), coleccion)
+    return CorpusMongo(coleccion)
+
+
+@pytest.mark.parametrize("query, desde, hasta", [
+    ("daniel noboa", None, None),
+    ("POST", "2025-01-01", "2025-01-31"),
+    ("post", "2025-02-01", None),
+    ("fecha", None, None),
+    ("luisa_gonzalez", None, None),
+    ("noboa", "2025-01-01", None),
+])
+def test_corpus_mongo_filtra_igual_que_la_lista(query, desde, hasta, corpus_de_prueba):
+    corpus = _corpus_mongo(corpus_de_prueba)
+    start_date, end_date = parse_date(desde), parse_date(hasta, is_end=True)
+    assert corpus.filtrar(query, start_date, end_date) == filtrar_publicaciones(corpus_de_prueba(), query, start_date, end_date)
+
+
+def test_corpus_mongo_rango_fechas_e_indices(corpus_de_prueba):
+    corpus = _corpus_mongo(corpus_de_prueba)
+    assert obtener_rango_fechas(corpus) == ("2025-01-10", "2025-02-15")
+    assert len(corpus) == 3
+    assert [p["id_post"] for p in corpus] == [1, 2, 3]
+
+    claves = [indice["key"] for indice in corpus.coleccion.index_information().values()]
+    for campo in ("id_post", "candidato", "fecha_ts"):
+        assert [(campo, 1)] in claves
+
+
+def test_firma_cambia_si_se_actualizan_publicaciones(corpus_de_prueba):
+    corpus = _corpus_mongo(corpus_de_prueba)
+    firma = corpus.firma()
+
+    # Volver a cargar lo mismo no cambia nada
+    cargar_publicaciones_a_mongo(corpus_de_prueba(), corpus.coleccion)
+    assert corpus.firma() == firma
+
+    # La publicación 1 gana un comentario: mismos documentos, pero la firma cambia
+    actualizado = corpus_de_prueba()
+    actualizado[0]["comentarios"].append({"id_comentario": 3, "texto_comentario": "nuevo"})
+    cargar_publicaciones_a_mongo(actualizado, corpus.coleccion)
+    assert corpus.firma() != firma
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+
+# backend.main agrega la carpeta backend al path (corpus_sqlite importa metricas)
+from backend.main import filtrar_publicaciones, obtener_rango_fechas, parse_date
+from backend.corpus_sqlite import CorpusSQLite
+from webScraping.storage.sqlite_loader import cargar_publicaciones_a_sqlite
+
+
+def _sin_columnas_limpias(publicaciones):
+    # La base solo guarda las columnas que usa la API (como el corpus columnar)
+    return [
+        {
+            **{k: v for k, v in p.items() if k not in ("texto_limpio", "comentarios")},
+            "comentarios": [{k: v for k, v in c.items() if k != "texto_comentario_limpio"} for c in p["comentarios"]],
+        }
+        for p in publicaciones
+    ]
+
+
+def _base_sqlite(tmp_path, corpus_de_prueba):
+    ruta = str(tmp_path / "corpus.sqlite")
+    conexion = sqlite3.connect(ruta)
+    # Dos cargas: la segunda actualiza sin duplicar publicaciones ni comentarios
+    cargar_publicaciones_a_sqlite(corpus_de_prueba(), conexion)
+    reporte = cargar_publicaciones_a_sqlite(corpus_de_prueba(), conexion)
+    conexion.close()
+    assert (reporte["documentos"], reporte["comentarios"]) == (3, 3)
+    return ruta
+
+
+@pytest.mark.parametrize("query, desde, hasta", [
+    ("daniel noboa", None, None),
+    ("POST", "2025-01-01", "2025-01-31"),
+    ("post", "2025-02-01", None),
+    ("fecha", None, None),
+    ("luisa_gonzalez", None, None),
+])
+def test_corpus_sqlite_filtra_igual_que_la_lista(tmp_path, query, desde, hasta, corpus_de_prueba):
+    corpus = CorpusSQLite(_base_sqlite(tmp_path, corpus_de_prueba), busqueda="subcadena")
+    start_date, end_date = parse_date(desde), parse_date(hasta, is_end=True)
+    esperado = filtrar_publicaciones(corpus_de_prueba(), query, start_date, end_date)
+    assert corpus.filtrar(query, start_date, end_date) == _sin_columnas_limpias(esperado)
+
+
+def test_corpus_sqlite_busqueda_fts_sin_tildes(tmp_path, corpus_de_prueba):
+    corpus = CorpusSQLite(_base_sqlite(tmp_path, corpus_de_prueba))
+    assert [p["id_post"] for p in corpus.filtrar("GONZÁLEZ")] == [2]
+    assert [p["id_post"] for p in corpus.filtrar("daniel nob")] == [1, 3]
+    assert [p["id_post"] for p in corpus.filtrar("post", parse_date("2025-02-01"))] == [2]
+
+    assert obtener_rango_fechas(corpus) == ("2025-01-10", "2025-02-15")
+    assert list(corpus) == _sin_columnas_limpias(corpus_de_prueba())
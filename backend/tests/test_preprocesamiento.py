@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+
+import nltk
+import pandas as pd
+import pytest
+
+from webScraping.preprocessing.casi_duplicados import agrupar_casi_duplicados, eliminar_casi_duplicados
+from webScraping.preprocessing.consolidar_corpus import consolidar_corpus_csvs_streaming
+from webScraping.preprocessing.limpieza_texto import (
+    NORMALIZATION_DICT,
+    limpiar_dataframe,
+    limpiar_dataframe_en_paralelo,
+    preprocesar_serie,
+    preprocess_text,
+)
+from webScraping.preprocessing import limpieza_texto, unificar_corpus
+from webScraping.preprocessing.pipeline import pipeline_corpus
+from webScraping.preprocessing.reestructurar_csv_a_json import reestructurar_csv_a_json_simple
+
+CORPUS_PREPROCESADO = os.path.join(
+    os.path.dirname(__file__), "..", "..", "webScraping", "datasets", "processed", "corpus_preprocesado.csv"
+)
+
+
+def _comentarios_de_prueba():
+    return pd.DataFrame({
+        "candidato": ["Daniel_Noboa", "Luisa_Gonzalez"] * 5,
+        "usuario": [f"@u{i}" for i in range(10)],
+        "fecha": ["2025-01-10T00:00:00.000Z"] * 10,
+        "texto": [f"Post {i}: q opinan?" for i in range(10)],
+        "texto_comentario": ["xq no!!", "Bn hecho, tmb apoyo", "jaja", "¿Y ahora?", "ok"] * 2,
+    })
+
+
+def test_limpieza_en_paralelo_igual_a_serial():
+    df = _comentarios_de_prueba()
+    serial = limpiar_dataframe(df, NORMALIZATION_DICT)
+    paralelo = limpiar_dataframe_en_paralelo(df, NORMALIZATION_DICT, procesos=2, tamano_bloque=3)
+
+    pd.testing.assert_frame_equal(serial, paralelo)
+    assert serial.loc[0, "texto_comentario_limpio"] == "porque no"
+    assert serial.loc[1, "texto_comentario_limpio"] == "bien hecho también apoyo"
+
+
+def test_preprocesar_serie_casos_de_tokenizer():
+    serie = pd.Series(["Yo cannot, q “tal”—bien", None, "  XQ   salu2\tpa ti ", 3.5, "wanna"])
+    assert preprocesar_serie(serie).tolist() == [
+        "yo can not que “ tal ” — bien", "", "porque saludos para ti", "35", "wan na",
+    ]
+
+
+def test_preprocesar_serie_igual_a_preprocess_text_en_el_corpus(monkeypatch):
+    # El texto normalizado no tiene . ? ! ASCII, así que Punkt no divide oraciones y
+    # word_tokenize equivale a tokenizar la línea entera (no hacen falta los datos punkt_tab)
+    monkeypatch.setattr(
+        limpieza_texto, "word_tokenize",
+        lambda texto, language="spanish": nltk.word_tokenize(texto, language=language, preserve_line=True),
+    )
+    df = pd.read_csv(CORPUS_PREPROCESADO)
+    for columna in ["texto", "texto_comentario"]:
+        esperado = df[columna].apply(lambda x: preprocess_text(x, NORMALIZATION_DICT))
+        pd.testing.assert_series_equal(preprocesar_serie(df[columna]), esperado)
+
+
+@pytest.mark.parametrize("motor", ["pyarrow", "pandas"])
+def test_consolidacion_por_bloques_une_columnas_en_orden(tmp_path, motor):
+    entrada = tmp_path / "raw"
+    entrada.mkdir()
+    pd.DataFrame({"candidato": ["B"] * 3, "texto": ["uno", "dos,\ncon salto", "tres"]}).to_csv(entrada / "b.csv", index=False)
+    pd.DataFrame({"candidato": ["A", "A"], "texto": ["x", None], "usuario": ["@a", "@b"]}).to_csv(entrada / "a.csv", index=False)
+
+    salida = tmp_path / "corpus.csv"
+    reporte = consolidar_corpus_csvs_streaming(str(entrada), str(salida), hilos=2, filas_por_bloque=1, motor=motor)
+
+    esperado = pd.concat([pd.read_csv(entrada / "a.csv", dtype=str), pd.read_csv(entrada / "b.csv", dtype=str)], ignore_index=True)
+    pd.testing.assert_frame_equal(pd.read_csv(salida, dtype=str), esperado)
+    assert reporte["archivos"] == 2 and reporte["filas"] == 5
+
+
+def test_consolidacion_por_bloques_se_detiene_si_falla_la_escritura(tmp_path, monkeypatch):
+    entrada = tmp_path / "csvs"
+    entrada.mkdir()
+    for nombre in ("a", "b", "c"):
+        pd.DataFrame({"texto": [f"{nombre}{i}" for i in range(20)]}).to_csv(entrada / f"{nombre}.csv", index=False)
+
+    escribir = pd.DataFrame.to_csv
+    llamadas = []
+
+    def to_csv_con_disco_lleno(self, *args, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) == 3:
+            raise OSError(28, "No queda espacio en el dispositivo")
+        return escribir(self, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, "to_csv", to_csv_con_disco_lleno)
+    salida = tmp_path / "corpus.csv"
+    errores = []
+
+    def consolidar():
+        try:
+            consolidar_corpus_csvs_streaming(str(entrada), str(salida), hilos=3, filas_por_bloque=1, motor="pandas")
+        except OSError as e:
+            errores.append(e)
+
+    # Los lectores quedan con las colas llenas: sin cancelarlos, la consolidación no termina
+    hilo = threading.Thread(target=consolidar, daemon=True)
+    hilo.start()
+    hilo.join(timeout=10)
+    assert not hilo.is_alive()
+    assert len(errores) == 1
+    assert not salida.exists() and not (tmp_path / "corpus.csv.tmp").exists()
+
+
+@pytest.mark.parametrize("formato", ["json", "ndjson"])
+def test_reestructurar_agrupa_comentarios_por_publicacion(tmp_path, formato):
+    csv = tmp_path / "corpus.csv"
+    pd.DataFrame({
+        "candidato": ["B", "A", "B", "A"],
+        "usuario": ["@b", "@a", "@otro", "@a"],
+        "fecha": ["2025-01-02T00:00:00.000Z", "2025-01-01T00:00:00.000Z", "2025-01-02T00:00:00.000Z", "2025-01-01T00:00:00.000Z"],
+        "texto": ["post b", "post a", "post b", "post a"],
+        "texto_comentario": ["c1", "c2", None, "c3"],
+    }).to_csv(csv, index=False)
+
+    salida = tmp_path / f"corpus.{formato}"
+    reestructurar_csv_a_json_simple(str(csv), str(salida), formato=formato)
+    with open(salida, encoding="utf-8") as f:
+        corpus = json.load(f) if formato == "json" else [json.loads(linea) for linea in f]
+
+    assert [(p["id_post"], p["candidato"], p["usuario"]) for p in corpus] == [(1, "B", "@b"), (2, "A", "@a")]
+    assert corpus[0]["comentarios"] == [{"id_comentario": 1, "texto_comentario": "c1"}]
+    assert [c["texto_comentario"] for c in corpus[1]["comentarios"]] == ["c2", "c3"]
+
+    with open(tmp_path / "corpus.manifiesto.json", encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    assert (manifiesto["publicaciones"], manifiesto["comentarios"]) == (2, 3)
+    assert manifiesto["bytes_datos"] == os.path.getsize(salida)
+
+
+def test_casi_duplicados_agrupa_spam_con_variaciones(tmp_path):
+    spam = "vota por el cambio este domingo todos a las urnas por un ecuador mejor"
+    textos = [
+        spam + " 🔥",
+        "me parece una pésima propuesta del candidato",
+        spam + " @usuario1",
+        "",
+        spam + " 👍",
+        "qué buen debate el de anoche",
+    ]
+    assert agrupar_casi_duplicados(textos, umbral=0.8) == [[0, 2, 4]]
+
+    df = pd.DataFrame({"texto_comentario_limpio": textos})
+    reporte_json = tmp_path / "casi_duplicados.json"
+    filtrado, reporte = eliminar_casi_duplicados(df, umbral=0.8, ruta_reporte=str(reporte_json))
+    assert filtrado["texto_comentario_limpio"].tolist() == [textos[0], textos[1], "", textos[5]]
+    assert reporte[0]["tamano"] == 3 and reporte[0]["texto_conservado"] == textos[0]
+    assert json.loads(reporte_json.read_text(encoding="utf-8")) == reporte
+
+
+def test_unificar_limpia_solo_filas_nuevas(tmp_path, monkeypatch):
+    original, nuevo, salida = tmp_path / "original.csv", tmp_path / "nuevo.csv", tmp_path / "unificado.csv"
+    df = _comentarios_de_prueba()
+    df.iloc[:6].to_csv(original, index=False)
+    df.iloc[6:8].to_csv(nuevo, index=False)
+    unificar_corpus.unificar_y_limpiar(str(original), str(nuevo), str(salida))
+    primera = pd.read_csv(salida)
+
+    # Segunda ejecución con dos filas más: solo esas se limpian
+    df.iloc[6:].to_csv(nuevo, index=False)
+    limpiadas = []
+    limpiar = unificar_corpus.limpiar_dataframe
+    monkeypatch.setattr(unificar_corpus, "limpiar_dataframe", lambda d, n: limpiadas.append(len(d)) or limpiar(d, n))
+    unificar_corpus.unificar_y_limpiar(str(original), str(nuevo), str(salida))
+
+    assert limpiadas == [2]
+    segunda = pd.read_csv(salida)
+    pd.testing.assert_frame_equal(segunda.iloc[:len(primera)], primera)
+    with open(unificar_corpus.ruta_manifiesto_filas(str(salida)), encoding="utf-8") as f:
+        assert len(json.load(f)["filas"]) == 10
+
+    # Con otras reglas de limpieza el manifiesto ya no sirve y se limpia todo
+    from webScraping.preprocessing import limpieza_texto
+    monkeypatch.setattr(limpieza_texto, "VERSION_LIMPIEZA", limpieza_texto.VERSION_LIMPIEZA + 1)
+    limpiadas.clear()
+    unificar_corpus.unificar_y_limpiar(str(original), str(nuevo), str(salida))
+    assert limpiadas == [10]
+
+
+def test_pipeline_reutiliza_etapas_en_cache(tmp_path):
+    entrada, cache, salida = tmp_path / "raw", tmp_path / "cache", tmp_path / "corpus.json"
+    entrada.mkdir()
+    df = _comentarios_de_prueba()
+    df.iloc[:5].to_csv(entrada / "a.csv", index=False)
+    df.iloc[5:].to_csv(entrada / "b.csv", index=False)
+
+    pipeline_corpus(str(salida), carpeta_cache=str(cache)).ejecutar(str(entrada))
+    primera = salida.read_text(encoding="utf-8")
+    assert [p["candidato"] for p in json.loads(primera)] == ["Daniel_Noboa", "Luisa_Gonzalez"]
+
+    # Otra instancia con la misma carpeta de caché: solo se repite la escritura
+    pipeline = pipeline_corpus(str(salida), carpeta_cache=str(cache))
+    pipeline.ejecutar(str(entrada))
+    assert [(e["etapa"], e["cache"]) for e in pipeline.reporte] == [
+        ("consolidar", "disco"), ("limpiar", "disco"), ("reestructurar", "no"),
+    ]
+    assert salida.read_text(encoding="utf-8") == primera
+
+    pipeline.ejecutar_desde("limpiar")
+    assert [(e["etapa"], e["cache"]) for e in pipeline.reporte] == [("limpiar", "no"), ("reestructurar", "no")]
+    assert salida.read_text(encoding="utf-8") == primera
+
+
+def test_carga_a_mongo_por_lotes_desde_json(tmp_path):
+    mongomock = pytest.importorskip("mongomock")
+    from webScraping.storage.mongodb_loader import cargar_publicaciones_a_mongo, leer_publicaciones
+
+    publicaciones = [{"id_post": i, "texto": f"post {i}", "comentarios": [{"id_comentario": 1}]} for i in range(1, 8)]
+    ruta = tmp_path / "corpus.json"
+    ruta.write_text(json.dumps(publicaciones, indent=4), encoding="utf-8")
+    assert list(leer_publicaciones(str(ruta))) == publicaciones
+
+    coleccion = mongomock.MongoClient()["tesis"]["corpus"]
+    reporte = cargar_publicaciones_a_mongo(leer_publicaciones(str(ruta)), coleccion, tamano_lote=3, hilos=2)
+    assert (reporte["documentos"], reporte["nuevos"], reporte["actualizados"]) == (7, 7, 0)
+
+    # Volver a cargar con un cambio: no se duplica nada
+    publicaciones[0]["texto"] = "editado"
+    reporte = cargar_publicaciones_a_mongo(iter(publicaciones), coleccion, tamano_lote=3)
+    assert (reporte["nuevos"], reporte["actualizados"]) == (0, 1)
+    assert coleccion.count_documents({}) == 7
+    assert coleccion.find_one({"id_post": 1})["texto"] == "editado"
+    assert any(indice["key"] == [("id_post", 1)] for indice in coleccion.index_information().values())
@@ -0,0 +1,39 @@
+import numpy as np
+from transformers import BertTokenizerFast
+from backend.pretokenizado import (
+    cargar_tokens_corpus,
+    huella_tokenizer,
+    pretokenizar,
+    ruta_tokens,
+    textos_del_corpus
+)
+
+
+def _tokenizer(tmp_path):
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "fuera", "noboa", "luisa", "bien", "mal", "!"]
+    ruta_vocab = tmp_path / "vocab.txt"
+    ruta_vocab.write_text("\n".join(vocab), encoding="utf-8")
+    return BertTokenizerFast(vocab_file=str(ruta_vocab))
+
+
+def test_tokens_precalculados_coinciden_con_el_tokenizer(tmp_path):
+    tokenizer = _tokenizer(tmp_path)
+    corpus = [
+        {"texto": "Noboa bien", "comentarios": [{"texto_comentario": "Fuera!"}, {"texto_comentario": "Fuera!"}]},
+        {"texto": "Luisa mal", "comentarios": [{"texto_comentario": ""}]},
+    ]
+    textos = textos_del_corpus(corpus)
+    assert textos == ["Noboa bien", "Fuera!", "Luisa mal"]
+
+    carpeta = tmp_path / "tokens"
+    pretokenizar(textos, tokenizer, ruta_tokens(str(carpeta), huella_tokenizer(tokenizer)))
+    tokens = cargar_tokens_corpus(str(carpeta), tokenizer)
+
+    assert len(tokens) == 3
+    for texto in textos:
+        esperado = tokenizer(texto, truncation=True, max_length=128)["input_ids"]
+        assert np.array_equal(tokens.buscar(texto), esperado)
+    assert tokens.buscar("texto nuevo") is None
+
+    # Otro max_length es otra versión: el archivo existente no se usa
+    assert cargar_tokens_corpus(str(carpeta), tokenizer, max_length=64) is None
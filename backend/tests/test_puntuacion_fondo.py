@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+
+# backend.main agrega la carpeta backend al path (puntuacion_fondo importa metricas)
+import backend.main  # noqa: F401
+from backend.puntuacion_fondo import AlmacenPuntajes, PuntuadorFondo
+
+
+def _puntuador(corpus, puntajes, clasificados):
+    def clasificar(texto):
+        clasificados.append(texto)
+        return ("POS", 0.9) if texto != "falla" else None
+    return PuntuadorFondo(
+        firma_corpus=lambda: tuple(corpus),
+        textos_corpus=lambda: list(corpus),
+        clasificar=clasificar,
+        puntajes=puntajes,
+        tamano_lote=2,
+    )
+
+
+def test_puntua_solo_los_textos_nuevos(monkeypatch):
+    corpus = ["a", "b", "b", "c", "falla"]
+    puntajes = {"a": ("NEG", 1.0), "viejo": ("NEU", 0.5)}
+    clasificados = []
+    puntuador = _puntuador(corpus, puntajes, clasificados)
+
+    puntuador.revisar_corpus()
+    assert "viejo" not in puntajes
+    assert puntuador.progreso()["pendientes"] == 3
+
+    while puntuador.progreso()["pendientes"]:
+        puntuador.procesar_lote()
+    assert clasificados == ["b", "c", "falla"]
+    assert puntajes == {"a": ("NEG", 1.0), "b": ("POS", 0.9), "c": ("POS", 0.9)}
+    assert puntuador.progreso()["puntuados"] == 3
+
+    # Sin cambios en el corpus no se vuelve a encolar nada; con cambios, solo el delta
+    puntuador.revisar_corpus()
+    assert puntuador.progreso()["pendientes"] == 0
+    corpus.append("d")
+    puntuador.revisar_corpus()
+    assert puntuador.progreso()["pendientes"] == 2  # "falla" vuelve a intentarse junto con "d"
+
+
+def test_espera_a_que_terminen_las_peticiones():
+    puntuador = _puntuador([], {}, [])
+    turno = threading.Event()
+
+    with puntuador.peticion_activa():
+        hilo = threading.Thread(target=lambda: (puntuador._esperar_turno(), turno.set()))
+        hilo.start()
+        time.sleep(0.05)
+        assert not turno.is_set()
+        assert puntuador.progreso()["estado"] == "en_pausa"
+
+    assert turno.wait(timeout=2)
+    hilo.join()
+
+
+def test_puntajes_compartidos_y_un_solo_puntuador(tmp_path):
+    ruta = str(tmp_path / "puntajes.sqlite")
+    # Dos "workers": cada uno con su almacén y su puntuador sobre la misma ruta
+    almacen_a, almacen_b = AlmacenPuntajes(ruta), AlmacenPuntajes(ruta)
+    a = PuntuadorFondo(lambda: 1, lambda: ["x"], lambda t: ("POS", 0.9), almacen_a, coordinacion=ruta)
+    b = PuntuadorFondo(lambda: 1, lambda: ["x"], lambda t: ("POS", 0.9), almacen_b, coordinacion=ruta)
+
+    assert a.es_lider() and a.es_lider()
+    assert not b.es_lider()
+
+    a.revisar_corpus()
+    a.procesar_lote()
+    assert almacen_b["x"] == ("POS", 0.9) and "y" not in almacen_b
+    assert len(almacen_b) == 1 and list(almacen_b) == ["x"]
+    del almacen_b["x"]
+    assert almacen_b.get("x") is None
+
+    # Una petición en el otro worker pausa al puntuador hasta que termina
+    turno = threading.Event()
+    with b.peticion_activa():
+        hilo = threading.Thread(target=lambda: (a._esperar_turno(pausa=0.01), turno.set()))
+        hilo.start()
+        time.sleep(0.1)
+        assert not turno.is_set()
+        assert a.progreso()["estado"] == "en_pausa"
+    assert turno.wait(timeout=2)
+    hilo.join()
+
+
+def test_lifespan_arranca_la_puntuacion(monkeypatch):
+    import servidor
+
+    arranques = []
+    monkeypatch.setattr(servidor, "iniciar_puntuacion_fondo", lambda: arranques.append(1))
+    mensajes = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    enviados = []
+
+    async def recibir():
+        return mensajes.pop(0)
+
+    async def enviar(mensaje):
+        enviados.append(mensaje["type"])
+
+    asyncio.run(servidor.asgi_app({"type": "lifespan"}, recibir, enviar))
+    assert arranques == [1]
+    assert enviados == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_puntajes_de_otra_version_se_descartan(tmp_path):
+    ruta = str(tmp_path / "puntajes.sqlite")
+    anterior = AlmacenPuntajes(ruta, version="modelo-1")
+    anterior["x"] = ("POS", 0.9)
+    assert AlmacenPuntajes(ruta, version="modelo-1")["x"] == ("POS", 0.9)
+
+    # Otro modelo: el puntaje anterior no se sirve, y lo que escriba aún el proceso viejo queda aparte
+    nuevo = AlmacenPuntajes(ruta, version="modelo-2")
+    assert "x" not in nuevo and len(nuevo) == 0
+    anterior["y"] = ("NEG", 0.8)
+    assert "y" not in nuevo
+    nuevo["x"] = ("NEU", 0.6)
+    assert nuevo["x"] == ("NEU", 0.6) and list(nuevo) == ["x"]
+
+
+def test_progreso_no_recorre_la_cache():
+    class Puntajes(dict):
+        def __len__(self):
+            contados.append(1)
+            return super().__len__()
+
+    contados = []
+    puntuador = _puntuador(["a", "b", "c"], Puntajes(a=("NEG", 1.0)), [])
+    puntuador.revisar_corpus()
+    puntuador.procesar_lote()
+    contados.clear()
+    assert [puntuador.progreso()["en_cache"] for _ in range(3)] == [3, 3, 3]
+    assert contados == []
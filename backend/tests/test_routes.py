@@ -1,5 +1,6 @@
 # backend/tests/test_routes.py
 import json
+from backend import main
 from backend.main import app
 
 
@@ -12,6 +13,7 @@ def test_salud_devuelve_estado_y_fechas(monkeypatch):
         {"fecha": "2025-02-15T00:00:00Z", "texto": "otro post", "candidato": "B"},
     ]
     monkeypatch.setattr('backend.main.cargar_corpus', lambda: sample_corpus)
+    monkeypatch.setattr('backend.main.leer_manifiesto_corpus', lambda: None)
 
     response = client.get('/salud')
     data = response.get_json()
@@ -23,6 +25,64 @@ def test_salud_devuelve_estado_y_fechas(monkeypatch):
     assert data['maxDate'] == '2025-02-15'
 
 
+def test_salud_usa_el_manifiesto_sin_cargar_el_corpus(monkeypatch):
+    client = app.test_client()
+    manifiesto = {
+        "publicaciones": 657, "comentarios": 4459,
+        "publicaciones_por_candidato": {"Daniel_Noboa": 400, "Luisa_Gonzalez": 257},
+        "fecha_min": "2017-02-21", "fecha_max": "2026-01-03",
+        "hash": "abc", "bytes_datos": 1, "generado": "2026-01-04T00:00:00+00:00",
+    }
+    monkeypatch.setattr('backend.main.leer_manifiesto_corpus', lambda: manifiesto)
+    def no_cargar():
+        raise AssertionError("/salud no debe cargar el corpus si hay manifiesto")
+    monkeypatch.setattr('backend.main.cargar_corpus', no_cargar)
+
+    data = client.get('/salud').get_json()
+    assert data['publicaciones'] == 657
+    assert data['minDate'] == '2017-02-21'
+    assert data['maxDate'] == '2026-01-03'
+    assert data['manifiesto']['publicaciones_por_candidato']['Daniel_Noboa'] == 400
+
+
+def test_manifiesto_desactualizado_si_los_datos_cambian_con_el_mismo_tamano(monkeypatch, tmp_path):
+    from webScraping.preprocessing.manifiesto_corpus import construir_manifiesto, escribir_manifiesto
+
+    monkeypatch.setattr('backend.main.usa_mongo', lambda: False)
+    monkeypatch.setattr('backend.main.usa_sqlite', lambda: False)
+    monkeypatch.setattr('backend.main.CORPUS_COLUMNAR_DIR', str(tmp_path / "no_existe"))
+    ruta = tmp_path / "corpus.json"
+    monkeypatch.setattr('backend.main.CORPUS_JSON', str(ruta))
+
+    corpus = [{"candidato": "Daniel_Noboa", "fecha": "2025-01-10T00:00:00Z", "texto": "uno", "comentarios": []}]
+    ruta.write_text(json.dumps(corpus), encoding="utf-8")
+    escribir_manifiesto(construir_manifiesto(corpus, [str(ruta)]), str(tmp_path / "corpus.manifiesto.json"))
+    assert main.leer_manifiesto_corpus()["publicaciones"] == 1
+
+    # Mismo tamaño, otro contenido: el manifiesto ya no describe los datos
+    corpus[0]["texto"] = "dos"
+    ruta.write_text(json.dumps(corpus), encoding="utf-8")
+    assert main.leer_manifiesto_corpus() is None
+
+
+def test_manifiesto_columnar_vigente_tras_ingerir_y_compactar(monkeypatch, tmp_path, corpus_de_prueba, convertir_corpus):
+    from webScraping.preprocessing.segmentos_corpus import compactar_segmentos, ingerir_segmento
+
+    monkeypatch.setattr('backend.main.usa_mongo', lambda: False)
+    monkeypatch.setattr('backend.main.usa_sqlite', lambda: False)
+    corpus = corpus_de_prueba()
+    carpeta = convertir_corpus(tmp_path, corpus[:2])
+    monkeypatch.setattr('backend.main.CORPUS_COLUMNAR_DIR', carpeta)
+    assert main.leer_manifiesto_corpus()["publicaciones"] == 2
+
+    nuevas = tmp_path / "nuevas.json"
+    nuevas.write_text(json.dumps([corpus[2]]), encoding="utf-8")
+    ingerir_segmento(str(nuevas), carpeta)
+    assert main.leer_manifiesto_corpus()["publicaciones"] == 3
+    compactar_segmentos(carpeta)
+    assert main.leer_manifiesto_corpus()["publicaciones"] == 3
+
+
 def test_analizar_requiere_query(monkeypatch):
     client = app.test_client()
     monkeypatch.setattr('backend.main.cargar_corpus', lambda: [])
@@ -49,3 +109,22 @@ def test_conclusiones_devuelve_conclusion(monkeypatch):
     assert response.status_code == 200
     assert "conclusion" in data
     assert isinstance(data["conclusion"], str)
+
+
+def test_server_timing_y_metrics(monkeypatch):
+    client = app.test_client()
+    monkeypatch.setattr('backend.main.cargar_corpus', lambda: [
+        {"fecha": "2025-01-10T00:00:00Z", "texto": "post de prueba", "candidato": "A"},
+    ])
+
+    response = client.post('/analizar', json={"query": "sin coincidencias"})
+    assert response.status_code == 200
+    etapas = [parte.split(";")[0] for parte in response.headers["Server-Timing"].split(", ")]
+    assert etapas == ["corpus", "filtrado", "total"]
+
+    metricas = client.get('/metrics')
+    texto = metricas.get_data(as_text=True)
+    assert metricas.status_code == 200
+    assert metricas.content_type.startswith("text/plain")
+    assert 'sentivote_peticiones_total{estado="200",metodo="POST",ruta="/analizar"}' in texto
+    assert 'sentivote_etapa_duracion_segundos_count{etapa="filtrado"}' in texto
@@ -0,0 +1,321 @@
+import csv
+import functools
+import json
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from webScraping.core.pool_drivers import DriverHTTP, EscritorParcial, LimitadorTasa, PoolDrivers
+from webScraping.scraping.extraccion_viewport import SCRIPT_VIEWPORT, ExtractorViewport
+from webScraping.scraping.parseo_tweets import CLASE_COMENTARIO, parsear_texto_comentario, parsear_tweet
+from webScraping.storage.estado_scraping import EstadoScraping, id_tweet
+
+# Página de tweet guardada (estructura reducida de x.com)
+PAGINA_TWEET = """<html><body><article>
+<div data-testid="User-Name"><a><span><span>{nombre}</span></span></a><a><span>@{usuario}</span></a></div>
+<a href="/{usuario}/status/{id}"><time datetime="2025-01-0{dia}T17:57:48.000Z">{dia} ene.</time></a>
+<div data-testid="tweetText" class="{clase}"><span>Post {id} del </span><span>candidato</span></div>
+</article></body></html>"""
+
+# Resultados de búsqueda guardados: un article por tweet dentro de la lista virtualizada
+ARTICULO_BUSQUEDA = """<div data-testid="cellInnerDiv"><article data-testid="tweet">
+<div data-testid="User-Name"><a><span><span>{nombre}</span></span></a><a><span>@{usuario}</span></a></div>
+<a href="/{usuario}/status/{id}?s=20"><time datetime="2025-01-0{dia}T17:57:48.000Z">{dia} ene.</time></a>
+<div data-testid="tweetText"><span>Post {id} del </span><span>candidato</span></div>
+<a href="/{usuario}/status/{id}/analytics">Ver</a>
+</article></div>"""
+
+
+def _pagina(id, usuario="DanielNoboaOk", dia=5):
+    return PAGINA_TWEET.format(id=id, usuario=usuario, nombre="Daniel Noboa", dia=dia, clase=CLASE_COMENTARIO)
+
+
+@pytest.fixture
+def servidor_paginas(tmp_path):
+    """Servidor HTTP local que sirve las páginas guardadas en tmp_path/paginas."""
+    carpeta = tmp_path / "paginas"
+    carpeta.mkdir()
+    manejador = functools.partial(SimpleHTTPRequestHandler, directory=str(carpeta))
+    manejador.log_message = lambda *args: None
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield carpeta, f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+
+
+def test_parseo_de_paginas_guardadas():
+    assert parsear_tweet(_pagina(7)) == {
+        "usuario": "@DanielNoboaOk", "fecha": "2025-01-05T17:57:48.000Z", "texto": "Post 7 del candidato",
+    }
+    assert parsear_tweet("<html><time datetime='2025-01-01'></time></html>") == {
+        "usuario": "N/A", "fecha": "2025-01-01", "texto": "N/A",
+    }
+    assert parsear_texto_comentario(_pagina(7)) == "Post 7 del candidato"
+    assert parsear_texto_comentario("<html></html>") is None
+
+
+def test_pool_de_drivers_conserva_el_orden_y_guarda_parcial(tmp_path, servidor_paginas):
+    carpeta, base = servidor_paginas
+    for i in range(12):
+        (carpeta / f"{i}.html").write_text(_pagina(i, usuario=f"u{i}"), encoding="utf-8")
+    urls = [f"{base}/{i}.html" for i in range(12)]
+    urls.insert(5, f"{base}/no_existe.html")
+
+    salida = tmp_path / "informacion_tweets.csv"
+    escritor = EscritorParcial(str(salida), ["url", "usuario", "fecha", "texto"], fsync_cada=2)
+    parciales = []
+
+    def guardar(orden, url, datos):
+        if datos is not None:
+            escritor.agregar(orden, {"url": url, **datos})
+            parciales.append((tmp_path / "informacion_tweets.csv.parcial").exists())
+
+    def visitar(driver, url):
+        driver.get(url)
+        return parsear_tweet(driver.page_source)
+
+    pool = PoolDrivers([DriverHTTP()], lambda i: DriverHTTP(), num_drivers=3,
+                       crear_limitador=lambda: LimitadorTasa(0, 0, cada=0))
+    reporte = pool.procesar(urls, visitar, guardar)
+    pool.cerrar()
+    assert (reporte["tareas"], reporte["errores"]) == (13, 1)
+    assert len(pool.drivers) == 3 and all(parciales)
+
+    assert escritor.finalizar() == 12
+    assert not (tmp_path / "informacion_tweets.csv.parcial").exists()
+    with open(salida, encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    assert [f["usuario"] for f in filas] == [f"@u{i}" for i in range(12)]
+    assert filas[3]["texto"] == "Post 3 del candidato"
+
+
+def test_estado_scraping_deduplica_y_retoma(tmp_path):
+    assert id_tweet("https://x.com/DanielNoboaOk/status/1877?s=20") == "1877"
+    assert id_tweet("https://twitter.com/DanielNoboaOk/status/1877/analytics") == "1877"
+    assert id_tweet("https://twitter.com/DanielNoboaOk") is None
+
+    ruta = str(tmp_path / "estado.sqlite")
+    estado = EstadoScraping(ruta, max_intentos=2)
+    assert estado.registrar_enlaces(["https://twitter.com/a/status/1", "https://x.com/a/status/2/photo/1"], "Noboa empleo") == 2
+    assert estado.registrar_enlaces(["https://x.com/a/status/1?s=20", "https://x.com/b/status/3"], "Noboa seguridad") == 1
+
+    estado.guardar("tweet", "https://twitter.com/a/status/1", {"usuario": "@a", "texto": "ñandú"})
+    estado.marcar_error("tweet", "https://x.com/a/status/2", "timeout")
+    estado.guardar("busqueda", "Noboa empleo", ["https://twitter.com/a/status/1"])
+    estado.cerrar()
+
+    # Otra ejecución sobre el mismo archivo retoma lo ya hecho
+    estado = EstadoScraping(ruta, max_intentos=2)
+    assert estado.resultado("tweet", "https://x.com/a/status/1/analytics") == {"usuario": "@a", "texto": "ñandú"}
+    assert not estado.pendiente("tweet", "https://x.com/a/status/1")
+    assert estado.resultado("tweet", "https://x.com/a/status/2") is None
+    assert estado.pendiente("tweet", "https://x.com/a/status/2")
+    estado.marcar_error("tweet", "https://x.com/a/status/2", "timeout")
+    assert not estado.pendiente("tweet", "https://x.com/a/status/2")
+    assert estado.resultado("busqueda", "Noboa empleo") == ["https://twitter.com/a/status/1"]
+    assert estado.resultado("tweet", "Noboa empleo") is None
+    assert estado.resumen() == {
+        "tweet": {"ok": 1, "error": 1}, "busqueda": {"ok": 1}, "descubiertos": {"tweets": 3},
+    }
+
+
+class _DriverScript:
+    """Driver falso que devuelve una respuesta fija de SCRIPT_VIEWPORT y guarda sus argumentos."""
+
+    def __init__(self, respuestas):
+        self.respuestas = list(respuestas)
+        self.llamadas = []
+
+    def execute_script(self, script, *args):
+        assert script == SCRIPT_VIEWPORT
+        self.llamadas.append(args)
+        return json.dumps(self.respuestas.pop(0))
+
+
+def test_extractor_viewport_recuerda_el_selector():
+    articulo = {"enlaces": ["https://x.com/u/status/1?s=20", "https://x.com/u"], "usuario": "@u", "fecha": None, "texto": "t"}
+    driver = _DriverScript([
+        {"selector": "article[data-testid='tweet']", "articulos": [articulo]},
+        {"selector": None, "articulos": []},
+        {"selector": "article[data-testid='tweet']", "articulos": []},
+    ])
+    extractor = ExtractorViewport(["article[role='article']", "article[data-testid='tweet']"])
+    assert extractor.enlaces(driver) == {"https://x.com/u/status/1"}
+    assert extractor.extraer(driver) == []
+    extractor.extraer(driver)
+    # Una llamada al driver por extracción; el selector que funcionó se prueba primero
+    assert [args[1] for args in driver.llamadas] == [None, "article[data-testid='tweet']", "article[data-testid='tweet']"]
+    assert extractor.selector == "article[data-testid='tweet']"
+
+
+@pytest.fixture
+def navegador():
+    webdriver = pytest.importorskip("selenium.webdriver")
+    opciones = webdriver.ChromeOptions()
+    opciones.add_argument("--headless=new")
+    try:
+        driver = webdriver.Chrome(options=opciones)
+    except Exception as e:
+        pytest.skip(f"Chrome no disponible: {e.__class__.__name__}")
+    yield driver
+    driver.quit()
+
+
+def test_extraccion_viewport_en_pagina_guardada(servidor_paginas, navegador):
+    carpeta, base = servidor_paginas
+    articulos = "".join(
+        ARTICULO_BUSQUEDA.format(id=i, usuario=f"u{i}", nombre="Daniel Noboa", dia=i) for i in (1, 2, 3)
+    )
+    (carpeta / "busqueda.html").write_text(f"<html><body>{articulos}</body></html>", encoding="utf-8")
+    navegador.get(f"{base}/busqueda.html")
+
+    extractor = ExtractorViewport(["article[role='article']", "article[data-testid='tweet']"])
+    resultado = extractor.extraer(navegador)
+    assert extractor.selector == "article[data-testid='tweet']"
+    assert resultado[1] == {
+        "enlaces": [f"{base}/u2/status/2?s=20", f"{base}/u2/status/2/analytics"],
+        "usuario": "@u2",
+        "fecha": "2025-01-02T17:57:48.000Z",
+        "texto": "Post 2 del candidato",
+    }
+    assert extractor.enlaces(navegador) == {
+        f"{base}/u{i}/status/{i}{sufijo}" for i in (1, 2, 3) for sufijo in ("", "/analytics")
+    }
+
+
+def test_comentarios_agrega_solo_las_filas_nuevas(tmp_path, servidor_paginas):
+    pytest.importorskip("selenium")
+    from webScraping.scraping.contenido_comentarios_scraper import FIELDNAMES, minar_texto_comentarios
+
+    carpeta, base = servidor_paginas
+    for i in range(3):
+        (carpeta / f"{i}.html").write_text(_pagina(i), encoding="utf-8")
+    entrada, salida = tmp_path / "entrada", tmp_path / "salida"
+    entrada.mkdir()
+    ruta_csv = entrada / "Daniel_Noboa_enlaces_comentarios.csv"
+
+    def escribir_entrada(ids):
+        with open(ruta_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES[:-1])
+            writer.writeheader()
+            for i in ids:
+                writer.writerow({"candidato": "Daniel_Noboa", "enlace_limpio": f"{base}/post",
+                                 "enlace_comentario_limpio": f"{base}/{i}.html"})
+
+    def minar():
+        estado = EstadoScraping(str(tmp_path / "estado.sqlite"))
+        minar_texto_comentarios(DriverHTTP(), str(entrada), str(salida), espera=0, estado=estado,
+                                crear_limitador=lambda: LimitadorTasa(0, 0, cada=0))
+        estado.cerrar()
+        with open(salida / "Daniel_Noboa_datos_completos.csv", encoding="utf-8") as f:
+            return [fila["texto_comentario"] for fila in csv.DictReader(f)]
+
+    escribir_entrada([0, 1])
+    assert minar() == ["Post 0 del candidato", "Post 1 del candidato"]
+    # La misma entrada no se vuelve a agregar; un enlace nuevo sí
+    assert minar() == ["Post 0 del candidato", "Post 1 del candidato"]
+    escribir_entrada([0, 1, 2])
+    assert minar() == ["Post 0 del candidato", "Post 1 del candidato", "Post 2 del candidato"]
+
+
+def test_comentarios_fallidos_se_reintentan_sin_agregarse(tmp_path, servidor_paginas):
+    pytest.importorskip("selenium")
+    from webScraping.scraping.contenido_comentarios_scraper import FIELDNAMES, minar_texto_comentarios
+
+    carpeta, base = servidor_paginas
+    entrada, salida = tmp_path / "entrada", tmp_path / "salida"
+    entrada.mkdir()
+    with open(entrada / "Daniel_Noboa_enlaces_comentarios.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES[:-1])
+        writer.writeheader()
+        for i in range(2):
+            writer.writerow({"candidato": "Daniel_Noboa", "enlace_limpio": f"{base}/post",
+                             "enlace_comentario_limpio": f"{base}/{i}.html"})
+
+    def minar():
+        estado = EstadoScraping(str(tmp_path / "estado.sqlite"), max_intentos=2)
+        minar_texto_comentarios(DriverHTTP(), str(entrada), str(salida), espera=0, estado=estado,
+                                crear_limitador=lambda: LimitadorTasa(0, 0, cada=0))
+        estado.cerrar()
+        ruta = salida / "Daniel_Noboa_datos_completos.csv"
+        if not ruta.exists():
+            return []
+        with open(ruta, encoding="utf-8") as f:
+            return [fila["texto_comentario"] for fila in csv.DictReader(f)]
+
+    # Ninguna página existe aún: las filas quedan fuera de la salida para reintentarse
+    assert minar() == []
+    (carpeta / "0.html").write_text(_pagina(0), encoding="utf-8")
+    # La 0 se extrae en el reintento; la 1 agota sus intentos y se agrega con "N/A"
+    assert minar() == ["Post 0 del candidato", "N/A"]
+    assert minar() == ["Post 0 del candidato", "N/A"]
+
+
+class _DriverFalso:
+    """Driver cuya sesión no responde en sus primeras `caidas` visitas (siempre, si es None)."""
+
+    def __init__(self, caidas=0):
+        self.caidas = caidas
+        self.visitas = []
+        self.cerrado = False
+
+    def quit(self):
+        self.cerrado = True
+
+
+def _visitar(driver, url):
+    driver.visitas.append(url)
+    if driver.caidas is None or len(driver.visitas) <= driver.caidas:
+        raise ConnectionRefusedError("sin sesión")
+    if url.startswith("no_existe"):
+        raise RuntimeError("tweet borrado")
+    return url
+
+
+def test_pool_reemplaza_drivers_muertos():
+    urls = [f"u{i}" for i in range(6)] + ["no_existe"]
+    limitador = lambda: LimitadorTasa(0, 0, cada=0)
+
+    # Con crear_driver: las tareas del driver muerto vuelven a la cola y las visita el nuevo
+    muerto = _DriverFalso(caidas=None)
+    resultados = {}
+    pool = PoolDrivers([muerto], lambda i: _DriverFalso(), crear_limitador=limitador, max_fallos_seguidos=2)
+    reporte = pool.procesar(urls, _visitar, lambda orden, url, r: resultados.__setitem__(orden, r))
+    assert reporte["errores"] == 1
+    assert resultados == {**{i: f"u{i}" for i in range(6)}, 6: None}
+    assert pool.drivers[0] is not muerto and not muerto.cerrado  # el recibido lo cierra quien lo creó
+    pool.cerrar()
+    assert pool.drivers[0].cerrado
+
+    # Sin crear_driver: el driver muerto deja de tomar tareas y las termina el otro
+    resultados = {}
+    pool = PoolDrivers([_DriverFalso(caidas=None), _DriverFalso()], crear_limitador=limitador, max_fallos_seguidos=2)
+    reporte = pool.procesar(urls, _visitar, lambda orden, url, r: resultados.__setitem__(orden, r))
+    assert reporte["errores"] == 1
+    assert resultados == {**{i: f"u{i}" for i in range(6)}, 6: None}
+
+
+def test_pool_con_un_solo_driver_no_abandona_la_cola():
+    limitador = lambda: LimitadorTasa(0, 0, cada=0)
+
+    # Errores de URL seguidos (tweets borrados) no detienen al único driver
+    urls = [f"u{i}" for i in range(10)]
+    urls[2:5] = ["no_existe_2", "no_existe_3", "no_existe_4"]
+    driver = _DriverFalso()
+    resultados = {}
+    reporte = PoolDrivers([driver], crear_limitador=limitador).procesar(
+        urls, _visitar, lambda orden, url, r: resultados.__setitem__(orden, r))
+    assert reporte["errores"] == 3
+    assert driver.visitas == urls
+    assert [orden for orden, r in resultados.items() if r is None] == [2, 3, 4]
+
+    # Errores de sesión sin crear_driver: sus tareas vuelven a la cola y el mismo driver sigue
+    driver = _DriverFalso(caidas=2)
+    resultados = {}
+    reporte = PoolDrivers([driver], crear_limitador=limitador, max_fallos_seguidos=2).procesar(
+        urls[5:], _visitar, lambda orden, url, r: resultados.__setitem__(orden, r))
+    assert reporte["errores"] == 0
+    assert resultados == {i: url for i, url in enumerate(urls[5:])}
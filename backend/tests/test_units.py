@@ -5,6 +5,9 @@ from backend.main import (
     normalizar_palabra,
     es_insulto,
     analizar_texto_con_diccionario,
+    analisis_lexico,
+    decision_sin_modelo,
+    analizar_publicaciones,
     parse_date
 )
 
@@ -64,3 +67,71 @@ def test_parse_date_inicio_y_fin():
     assert inicio.tzinfo == timezone.utc
     assert inicio.hour == 0 and inicio.minute == 0
     assert fin.hour == 23 and fin.minute == 59
+
+# 6. La decisión del diccionario sin modelo coincide con el refuerzo para cualquier salida del modelo
+@pytest.mark.parametrize(
+    "texto, etapa_esperada",
+    [
+        ("eres un huevón", "insulto"),
+        ("qué desastre otra vez", None),          # mayoría negativa: la confianza depende del modelo
+        ("claro que sí, ¡seguro!", None),         # sarcasmo: depende de la etiqueta del modelo
+        ("malo y bueno", "diccionario"),          # empate corto con términos negativos
+        ("un texto neutro sin términos del diccionario", None),
+    ],
+)
+def test_decision_sin_modelo(texto, etapa_esperada):
+    decision = decision_sin_modelo(texto, analisis_lexico(texto))
+    assert (decision[2] if decision else None) == etapa_esperada
+    if decision:
+        for label in ("NEG", "NEU", "POS"):
+            for conf in (0.1, 0.5, 0.75, 0.95):
+                assert analizar_texto_con_diccionario(texto, label, conf) == decision[:2]
+
+# 7. Los textos repetidos se clasifican una sola vez y el resultado llega a todas sus apariciones
+def test_analizar_publicaciones_clasifica_textos_repetidos_una_vez(monkeypatch):
+    llamadas = []
+    def modelo_falso(textos):
+        llamadas.extend(textos)
+        return [{"label": "POS", "score": 0.9} for _ in textos]
+    monkeypatch.setattr("backend.main.modelo", modelo_falso)
+    monkeypatch.setattr("backend.main.puntajes_cache", {})
+
+    publicaciones = [
+        {"id_post": 1, "texto": "Vamos con todo", "comentarios": [
+            {"id_comentario": 1, "texto_comentario": "Fuera!"},
+            {"id_comentario": 2, "texto_comentario": "Fuera!"},
+        ]},
+        {"id_post": 2, "texto": "Vamos con todo", "comentarios": [
+            {"id_comentario": 1, "texto_comentario": "Fuera!"},
+        ]},
+    ]
+    procesadas, textos = analizar_publicaciones(publicaciones)
+
+    assert len(textos) == 5
+    assert sorted(llamadas) == ["Fuera!", "Vamos con todo"]
+    assert [c["sentimiento_comentario"] for p in procesadas for c in p["comentarios"]] == ["POS"] * 3
+
+# 8. Las llamadas a Gemini no ocupan el ejecutor acotado: solo el dibujo de las nubes pasa por él
+def test_wordclouds_llaman_a_gemini_fuera_del_ejecutor(monkeypatch):
+    import threading
+    hilos = {"gemini": [], "dibujo": []}
+
+    class GeminiFalso:
+        def generate_content(self, prompt):
+            hilos["gemini"].append(threading.current_thread().name)
+            return type("Respuesta", (), {"text": "esperanza trabajo"})()
+
+    def dibujo_falso(textos, colormap="viridis"):
+        hilos["dibujo"].append(threading.current_thread().name)
+        return "imagen", {"esperanza": 1}
+
+    monkeypatch.setattr("backend.main.model_gemini", GeminiFalso())
+    monkeypatch.setattr("backend.main.generar_wordcloud", dibujo_falso)
+    from backend.main import generar_wordclouds_por_sentimiento
+
+    publicaciones = [{"texto": f"post {i}", "sentiment": "POS", "comentarios": []} for i in range(6)]
+    resultado = generar_wordclouds_por_sentimiento(publicaciones)
+
+    assert resultado["POS"] == {"imagen": "imagen", "palabras": {"esperanza": 1}}
+    assert len(hilos["gemini"]) == 1 and not hilos["gemini"][0].startswith("sentivote-cpu")
+    assert len(hilos["dibujo"]) == 3 and all(h.startswith("sentivote-cpu") for h in hilos["dibujo"])
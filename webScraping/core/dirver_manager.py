@@ -1,12 +1,18 @@
 import undetected_chromedriver as uc
 
-def get_driver(headless: bool = False):
+def get_driver(headless: bool = False, perfil: str = None):
+    """
+    Args:
+        perfil (str): Carpeta de perfil de Chrome. Cada driver de un pool necesita la
+                      suya (sesión y cookies propias); la sesión iniciada en un perfil
+                      se conserva entre ejecuciones.
+    """
     options = uc.ChromeOptions()
     if headless:
         options.add_argument('--headless=new')
     
     # uc maneja la mayoría de las opciones anti-detección automáticamente
-    driver = uc.Chrome(version_main=143, options=options)
+    driver = uc.Chrome(version_main=143, options=options, user_data_dir=perfil)
     return driver
 
 def close_driver(driver):
@@ -0,0 +1,335 @@
+"""
+Módulo: pool_drivers
+--------------------
+
+Pool de N drivers para visitar muchas URLs en paralelo (tweets_scraper y
+contenido_comentarios_scraper).
+
+- Cada driver tiene su propia sesión (su propio perfil de Chrome, ver get_driver)
+  y su propio LimitadorTasa: las pausas entre páginas se respetan por driver.
+- Todos los drivers toman URLs de una misma cola; el orden de la entrada se
+  conserva en la salida gracias al EscritorParcial.
+- Un error de una URL (tweet borrado, timeout esperando la página) solo hace
+  fallar esa tarea. Varios errores de sesión seguidos en un mismo driver (ver
+  es_error_de_sesion) indican que su sesión murió: esas tareas vuelven a la cola y
+  el driver se reemplaza con crear_driver. Sin crear_driver, ese driver deja de
+  tomar tareas si hay otro trabajando; si es el único, sigue con las demás.
+- EscritorParcial agrega cada fila a un archivo .parcial en cuanto se obtiene (con
+  fsync periódico), así que una caída no pierde lo ya extraído. Al terminar escribe
+  la salida final ordenada y elimina el .parcial.
+- DriverHTTP es un driver mínimo sin navegador (urllib) con la misma interfaz que
+  usa el pool (get, page_source, quit): permite medir el pool y probar el parseo
+  sin conexión, contra páginas guardadas servidas por un servidor HTTP local.
+"""
+
+import csv
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Errores de selenium que indican que la sesión del driver murió (no que falló una URL)
+try:
+    from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, WebDriverException
+    from urllib3.exceptions import MaxRetryError
+    ERRORES_SESION = (InvalidSessionIdException, NoSuchWindowException, MaxRetryError)
+except ImportError:
+    # Sin selenium solo se usan drivers sin sesión (DriverHTTP)
+    WebDriverException = None
+    ERRORES_SESION = ()
+
+
+def es_error_de_sesion(error: Exception) -> bool:
+    """
+    True si el error indica que la sesión del driver ya no responde: sesión
+    inválida, ventana cerrada, chromedriver inalcanzable o un WebDriverException
+    genérico ("chrome not reachable", "disconnected"). Sus subclases (timeout,
+    elemento no encontrado, etc.) son errores de la página, no de la sesión.
+    """
+    if isinstance(error, ERRORES_SESION + (ConnectionError,)):
+        return True
+    return WebDriverException is not None and type(error) is WebDriverException
+
+
+class LimitadorTasa:
+    """
+    Pausa aleatoria entre peticiones de un mismo driver y una pausa larga cada
+    `cada` peticiones (los mismos valores que usaban los scrapers secuenciales).
+    """
+
+    def __init__(self, pausa_min: float = 5.0, pausa_max: float = 10.0, cada: int = 40, pausa_larga: float = 600.0):
+        self.pausa_min = pausa_min
+        self.pausa_max = pausa_max
+        self.cada = cada
+        self.pausa_larga = pausa_larga
+        self.peticiones = 0
+
+    def esperar(self):
+        """Se llama antes de cada petición; la primera no espera."""
+        if self.peticiones:
+            time.sleep(random.uniform(self.pausa_min, self.pausa_max))
+            if self.cada and self.peticiones % self.cada == 0:
+                print(f"{self.peticiones} páginas con este driver. Esperando {self.pausa_larga / 60:.0f} minutos.")
+                time.sleep(self.pausa_larga)
+        self.peticiones += 1
+
+
+class PoolDrivers:
+    """
+    Reparte tareas entre varios drivers, un hilo por driver.
+
+    Args:
+        drivers: Drivers ya creados (p. ej. el driver con sesión iniciada del notebook).
+        crear_driver: Función indice -> driver para completar num_drivers (cada uno con
+            su propio perfil y sesión). Los drivers creados aquí se cierran en cerrar().
+        num_drivers: Total de drivers del pool.
+        crear_limitador: Función sin argumentos que devuelve el limitador de cada driver.
+        max_fallos_seguidos: Errores de sesión seguidos de un driver tras los que se da por muerto.
+        es_error_de_sesion: Función error -> bool que distingue los errores de sesión
+            de los de una URL.
+    """
+
+    def __init__(
+        self,
+        drivers: List[Any],
+        crear_driver: Optional[Callable[[int], Any]] = None,
+        num_drivers: Optional[int] = None,
+        crear_limitador: Callable[[], LimitadorTasa] = LimitadorTasa,
+        max_fallos_seguidos: int = 3,
+        es_error_de_sesion: Callable[[Exception], bool] = es_error_de_sesion
+    ):
+        num_drivers = num_drivers or len(drivers)
+        if len(drivers) < num_drivers and crear_driver is None:
+            raise ValueError("Se necesita crear_driver para abrir más drivers de los recibidos")
+        self.crear_driver = crear_driver
+        self.max_fallos_seguidos = max_fallos_seguidos
+        self.es_error_de_sesion = es_error_de_sesion
+        self.drivers = list(drivers)
+        self._propios = [crear_driver(i) for i in range(len(self.drivers), num_drivers)]
+        self.drivers += self._propios
+        self.limitadores = [crear_limitador() for _ in self.drivers]
+
+    def procesar(
+        self,
+        tareas: Iterable[Any],
+        trabajo: Callable[[Any, Any], Any],
+        al_terminar: Callable[[int, Any, Any], None]
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta trabajo(driver, tarea) para cada tarea y llama a al_terminar(orden,
+        tarea, resultado) en cuanto termina (resultado es None si trabajo falló).
+
+        Un error de la URL hace fallar solo esa tarea. Un error de sesión no se da por
+        definitivo hasta que el mismo driver vuelve a responder: si antes acumula
+        max_fallos_seguidos errores de sesión, esas tareas vuelven a la cola (una vez
+        cada una) y el driver se reemplaza o, sin crear_driver, deja de trabajar si
+        queda otro driver activo.
+
+        Returns:
+            Dict con tareas, errores, segundos y paginas_por_min.
+        """
+        cola = queue.Queue()
+        for orden, tarea in enumerate(tareas):
+            cola.put((orden, tarea, 0))
+        total = cola.qsize()
+        errores = []
+        detenidos = set()
+        activos = [len(self.drivers)]
+        lock = threading.Lock()
+        inicio = time.perf_counter()
+
+        def fallida(orden, tarea):
+            errores.append(orden)
+            al_terminar(orden, tarea, None)
+
+        def detener(indice):
+            """Deja de usar un driver muerto, salvo que sea el único activo."""
+            with lock:
+                if activos[0] <= 1:
+                    return False
+                activos[0] -= 1
+                detenidos.add(indice)
+            print(f"[driver {indice}] {self.max_fallos_seguidos} errores de sesión seguidos; el driver deja de tomar tareas.")
+            return True
+
+        def trabajador(indice):
+            limitador = self.limitadores[indice]
+            # Tareas con error de sesión desde la última respuesta de este driver
+            racha = []
+            try:
+                while True:
+                    try:
+                        orden, tarea, reintentos = cola.get_nowait()
+                    except queue.Empty:
+                        return
+                    limitador.esperar()
+                    error_url = False
+                    try:
+                        resultado = trabajo(self.drivers[indice], tarea)
+                    except Exception as e:
+                        print(f"[driver {indice}] Error en {tarea}: {e.__class__.__name__}: {e}")
+                        if self.es_error_de_sesion(e):
+                            racha.append((orden, tarea, reintentos))
+                            if len(racha) < self.max_fallos_seguidos:
+                                continue
+                            # El driver parece muerto: sus tareas fallidas vuelven a la cola
+                            for orden, tarea, reintentos in racha:
+                                if reintentos:
+                                    fallida(orden, tarea)
+                                else:
+                                    cola.put((orden, tarea, 1))
+                            racha = []
+                            if self.crear_driver is None:
+                                if detener(indice):
+                                    return
+                                # Único driver activo: sigue con las demás tareas
+                            elif not self._reemplazar_driver(indice) and detener(indice):
+                                return
+                            continue
+                        error_url = True
+                    # El driver respondió: los errores de sesión anteriores eran de sus tareas
+                    for orden_fallida, tarea_fallida, _ in racha:
+                        fallida(orden_fallida, tarea_fallida)
+                    racha = []
+                    if error_url:
+                        fallida(orden, tarea)
+                    else:
+                        al_terminar(orden, tarea, resultado)
+            finally:
+                for orden, tarea, _ in racha:
+                    fallida(orden, tarea)
+                with lock:
+                    if indice not in detenidos:
+                        activos[0] -= 1
+
+        with ThreadPoolExecutor(max_workers=len(self.drivers)) as executor:
+            for futuro in [executor.submit(trabajador, i) for i in range(len(self.drivers))]:
+                futuro.result()
+
+        # Tareas devueltas a la cola cuando los demás drivers ya habían terminado (el
+        # último driver activo nunca se detiene, así que siempre queda uno)
+        vivo = next(i for i in range(len(self.drivers)) if i not in detenidos)
+        while not cola.empty():
+            activos[0] = 1
+            trabajador(vivo)
+
+        segundos = time.perf_counter() - inicio
+        return {
+            "tareas": total,
+            "errores": len(errores),
+            "segundos": round(segundos, 3),
+            "paginas_por_min": round(total / segundos * 60, 1) if segundos else None,
+        }
+
+    def _reemplazar_driver(self, indice: int) -> bool:
+        """Reemplaza un driver muerto con crear_driver; False si no se pudo abrir el nuevo."""
+        anterior = self.drivers[indice]
+        if anterior in self._propios:
+            self._propios.remove(anterior)
+            try:
+                anterior.quit()
+            except Exception as e:
+                print(f"[driver {indice}] Error al cerrar el driver: {e}")
+        print(f"[driver {indice}] {self.max_fallos_seguidos} errores de sesión seguidos; abriendo un driver nuevo.")
+        try:
+            nuevo = self.crear_driver(indice)
+        except Exception as e:
+            print(f"[driver {indice}] No se pudo abrir un driver nuevo: {e}")
+            return False
+        self.drivers[indice] = nuevo
+        self._propios.append(nuevo)
+        return True
+
+    def cerrar(self):
+        """Cierra los drivers que abrió el pool (los recibidos los cierra quien los creó)."""
+        for driver in self._propios:
+            driver.quit()
+
+
+class EscritorParcial:
+    """
+    Guarda las filas de un pool a medida que llegan (en cualquier orden) y al final
+    escribe el CSV en el orden de la entrada.
+
+    Args:
+        ruta: CSV de salida.
+        campos: Columnas del CSV.
+        modo: "w" reemplaza la salida (atómicamente); "a" agrega al final.
+        fsync_cada: Filas entre cada fsync del archivo parcial.
+    """
+
+    def __init__(self, ruta: str, campos: List[str], modo: str = "w", fsync_cada: int = 40):
+        self.ruta = ruta
+        self.ruta_parcial = ruta + ".parcial"
+        self.campos = campos
+        self.modo = modo
+        self.fsync_cada = fsync_cada
+        self.filas: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._archivo = None
+
+        # Un .parcial previo es de una ejecución interrumpida: se conserva aparte
+        if os.path.exists(self.ruta_parcial):
+            anterior = f"{self.ruta_parcial}.{int(time.time())}"
+            os.replace(self.ruta_parcial, anterior)
+            print(f"⚠️ ADVERTENCIA: Guardado parcial de una ejecución interrumpida conservado en {anterior}")
+
+    def agregar(self, orden: int, fila: Dict[str, Any]):
+        with self._lock:
+            if self._archivo is None:
+                self._archivo = open(self.ruta_parcial, mode="w", newline="", encoding="utf-8")
+                self._writer = csv.DictWriter(self._archivo, fieldnames=self.campos)
+                self._writer.writeheader()
+            self._writer.writerow(fila)
+            self._archivo.flush()
+            self.filas[orden] = fila
+            if len(self.filas) % self.fsync_cada == 0:
+                os.fsync(self._archivo.fileno())
+
+    def finalizar(self) -> int:
+        """Escribe la salida ordenada, elimina el .parcial y devuelve el número de filas."""
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+            filas = [self.filas[orden] for orden in sorted(self.filas)]
+
+            if self.modo == "a":
+                escribir_encabezado = not os.path.exists(self.ruta)
+                with open(self.ruta, mode="a", newline="", encoding="utf-8") as archivo_out:
+                    writer = csv.DictWriter(archivo_out, fieldnames=self.campos)
+                    if escribir_encabezado:
+                        writer.writeheader()
+                    writer.writerows(filas)
+            else:
+                with open(self.ruta + ".tmp", mode="w", newline="", encoding="utf-8") as archivo_out:
+                    writer = csv.DictWriter(archivo_out, fieldnames=self.campos)
+                    writer.writeheader()
+                    writer.writerows(filas)
+                os.replace(self.ruta + ".tmp", self.ruta)
+
+            if os.path.exists(self.ruta_parcial):
+                os.remove(self.ruta_parcial)
+            self.filas = {}
+            return len(filas)
+
+
+class DriverHTTP:
+    """Driver sin navegador: descarga la página con urllib (no ejecuta JavaScript)."""
+
+    def __init__(self, tiempo_espera: float = 10.0):
+        self.tiempo_espera = tiempo_espera
+        self.page_source = ""
+        self.current_url = None
+
+    def get(self, url: str):
+        with urllib.request.urlopen(url, timeout=self.tiempo_espera) as respuesta:
+            self.page_source = respuesta.read().decode("utf-8")
+        self.current_url = url
+
+    def quit(self):
+        pass
@@ -0,0 +1,229 @@
+"""
+Detección de comentarios casi duplicados con MinHash y LSH.
+
+La eliminación de duplicados exactos no detecta el spam copiado y pegado con un
+emoji o una mención distinta. Aquí cada texto se representa por sus shingles de
+caracteres (subcadenas de k caracteres) y se compara por similitud de Jaccard:
+
+1. MinHash: una firma de num_permutaciones enteros por texto; la fracción de
+   posiciones iguales entre dos firmas estima la similitud de Jaccard.
+2. LSH por bandas: la firma se divide en bandas; los textos que coinciden en una
+   banda completa son candidatos. Cada candidato se verifica con la firma y los
+   que superan el umbral se unen en un mismo grupo.
+
+Todo el costo es lineal en el tamaño de los textos (más un ordenamiento por banda),
+con operaciones de numpy sobre todos los textos a la vez, así que escala a
+millones de comentarios.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Multiplicador para el hash polinomial de los shingles (impar, 64 bits)
+_BASE_SHINGLE = np.uint64(0x9E3779B97F4A7C15)
+# Shingles que se procesan a la vez al calcular las firmas (acota la memoria)
+_SHINGLES_POR_BLOQUE = 1 << 14
+# Pares candidatos que se verifican a la vez
+_PARES_POR_BLOQUE = 1 << 16
+
+
+# ------------------------------------------------------------------------------------------
+# Shingles y firmas MinHash
+# ------------------------------------------------------------------------------------------
+def _hashes_shingles(textos: Sequence[str], tamano_shingle: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash de 64 bits de cada shingle de caracteres de cada texto.
+
+    Devuelve (hashes, cantidades): los hashes de todos los textos concatenados y la
+    cantidad de shingles de cada texto. Los textos más cortos que tamano_shingle
+    cuentan como un solo shingle; los vacíos no tienen ninguno.
+    """
+    codigos = []
+    for texto in textos:
+        puntos = np.frombuffer(texto.encode("utf-32-le"), dtype=np.uint32)
+        if 0 < len(puntos) < tamano_shingle:
+            puntos = np.pad(puntos, (0, tamano_shingle - len(puntos)))
+        codigos.append(puntos)
+    longitudes = np.array([len(c) for c in codigos], dtype=np.int64)
+    cantidades = np.where(longitudes > 0, longitudes - tamano_shingle + 1, 0)
+    if not cantidades.sum():
+        return np.zeros(0, dtype=np.uint64), cantidades
+
+    todo = np.concatenate(codigos).astype(np.uint64)
+    # Hash polinomial de cada ventana de tamano_shingle caracteres (aritmética módulo 2^64)
+    ventanas = len(todo) - tamano_shingle + 1
+    hashes = np.zeros(ventanas, dtype=np.uint64)
+    for j in range(tamano_shingle):
+        hashes = hashes * _BASE_SHINGLE + todo[j:j + ventanas]
+
+    # Solo las ventanas que empiezan y terminan dentro de un mismo texto
+    desplazamientos = np.concatenate(([0], np.cumsum(longitudes)[:-1]))
+    inicio_texto = np.repeat(desplazamientos, cantidades)
+    posicion = np.arange(cantidades.sum()) - np.repeat(np.cumsum(cantidades) - cantidades, cantidades)
+    return hashes[inicio_texto + posicion], cantidades
+
+
+def firmas_minhash(
+    textos: Sequence[str],
+    num_permutaciones: int = 128,
+    tamano_shingle: int = 5,
+    semilla: int = 42
+) -> np.ndarray:
+    """
+    Firmas MinHash (una fila de num_permutaciones enteros de 32 bits por texto).
+
+    Cada permutación es un hash multiply-shift h(x) = ((a·x + b) mod 2^64) >> 32 con
+    a impar. Los textos vacíos quedan con todas las posiciones en el valor máximo.
+    """
+    generador = np.random.default_rng(semilla)
+    a = generador.integers(0, 2**63, size=num_permutaciones, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = generador.integers(0, 2**63, size=num_permutaciones, dtype=np.uint64)
+
+    hashes, cantidades = _hashes_shingles(textos, tamano_shingle)
+    firmas = np.full((len(textos), num_permutaciones), np.iinfo(np.uint32).max, dtype=np.uint32)
+    con_shingles = np.flatnonzero(cantidades)
+    fin_shingles = np.cumsum(cantidades[con_shingles])
+
+    buffer = np.empty((num_permutaciones, _SHINGLES_POR_BLOQUE), dtype=np.uint64)
+    inicio = 0
+    while inicio < len(con_shingles):
+        # Bloque de textos con a lo sumo _SHINGLES_POR_BLOQUE shingles (al menos un texto)
+        base = fin_shingles[inicio - 1] if inicio else 0
+        fin = max(inicio + 1, int(np.searchsorted(fin_shingles, base + _SHINGLES_POR_BLOQUE, side="right")))
+        bloque = hashes[base:fin_shingles[fin - 1]]
+        # Operaciones en el mismo búfer para no crear temporales de num_permutaciones x shingles
+        permutados = buffer[:, :len(bloque)] if len(bloque) <= _SHINGLES_POR_BLOQUE else np.empty((num_permutaciones, len(bloque)), dtype=np.uint64)
+        np.multiply(a[:, None], bloque[None, :], out=permutados)
+        permutados += b[:, None]
+        permutados >>= np.uint64(32)
+        cortes = np.concatenate(([0], fin_shingles[inicio:fin - 1] - base))
+        firmas[con_shingles[inicio:fin]] = np.minimum.reduceat(permutados, cortes, axis=1).T
+        inicio = fin
+    return firmas
+
+
+# ------------------------------------------------------------------------------------------
+# LSH por bandas
+# ------------------------------------------------------------------------------------------
+def parametros_lsh(umbral: float, num_permutaciones: int) -> Tuple[int, int]:
+    """
+    Número de bandas y filas por banda para el umbral dado: minimiza la suma de falsos
+    positivos y falsos negativos esperados (área bajo la curva S a cada lado del umbral).
+    """
+    mejor, mejor_error = (1, num_permutaciones), float("inf")
+    similitudes = np.linspace(0, 1, 201)
+    for bandas in range(1, num_permutaciones + 1):
+        filas = num_permutaciones // bandas
+        probabilidad = 1 - (1 - similitudes ** filas) ** bandas
+        falsos_positivos = np.mean(np.where(similitudes < umbral, probabilidad, 0))
+        falsos_negativos = np.mean(np.where(similitudes >= umbral, 1 - probabilidad, 0))
+        if falsos_positivos + falsos_negativos < mejor_error:
+            mejor, mejor_error = (bandas, filas), falsos_positivos + falsos_negativos
+    return mejor
+
+
+def _raiz(padres: np.ndarray, i: int) -> int:
+    while padres[i] != i:
+        padres[i] = padres[padres[i]]
+        i = padres[i]
+    return i
+
+
+def agrupar_casi_duplicados(
+    textos: Sequence[str],
+    umbral: float = 0.8,
+    num_permutaciones: int = 128,
+    tamano_shingle: int = 5,
+    semilla: int = 42
+) -> List[List[int]]:
+    """
+    Grupos de textos casi duplicados (similitud de Jaccard estimada >= umbral).
+
+    Returns:
+        Lista de grupos con dos o más índices, cada uno ordenado de menor a mayor.
+    """
+    firmas = firmas_minhash(textos, num_permutaciones, tamano_shingle, semilla)
+    bandas, filas = parametros_lsh(umbral, num_permutaciones)
+    validos = np.flatnonzero([bool(t) for t in textos])
+    pesos = np.random.default_rng(semilla).integers(0, 2**63, size=filas, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    pares = []
+    for banda in range(bandas):
+        # Clave de 64 bits de la banda de cada texto; los textos con la misma clave son candidatos
+        claves = (firmas[validos, banda * filas:(banda + 1) * filas].astype(np.uint64) * pesos).sum(axis=1)
+        indices = np.argsort(claves, kind="stable")
+        orden, claves_ordenadas = validos[indices], claves[indices]
+        nuevo_cubo = np.concatenate(([True], claves_ordenadas[1:] != claves_ordenadas[:-1]))
+        # Cada texto se compara con el primero de su cubo (costo lineal aunque el cubo sea grande)
+        primero = orden[np.maximum.accumulate(np.where(nuevo_cubo, np.arange(len(orden)), 0))]
+        miembros = orden[~nuevo_cubo]
+        primeros = primero[~nuevo_cubo]
+        for i in range(0, len(miembros), _PARES_POR_BLOQUE):
+            m, p = miembros[i:i + _PARES_POR_BLOQUE], primeros[i:i + _PARES_POR_BLOQUE]
+            similares = (firmas[m] == firmas[p]).mean(axis=1) >= umbral
+            pares.append(np.minimum(m, p)[similares] * len(textos) + np.maximum(m, p)[similares])
+
+    # El mismo par suele aparecer en varias bandas: se une una sola vez
+    padres = np.arange(len(textos))
+    for par in np.unique(np.concatenate(pares)).tolist() if pares else []:
+        rx, ry = _raiz(padres, par // len(textos)), _raiz(padres, par % len(textos))
+        if rx != ry:
+            padres[max(rx, ry)] = min(rx, ry)
+
+    grupos: Dict[int, List[int]] = {}
+    for i in validos.tolist():
+        grupos.setdefault(_raiz(padres, i), []).append(i)
+    return [g for g in grupos.values() if len(g) > 1]
+
+
+# ------------------------------------------------------------------------------------------
+# Etapa del pipeline de limpieza
+# ------------------------------------------------------------------------------------------
+def eliminar_casi_duplicados(
+    df: pd.DataFrame,
+    columna: str = "texto_comentario_limpio",
+    umbral: float = 0.8,
+    ruta_reporte: Optional[str] = None,
+    **opciones: Any
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Deja una sola fila (la primera) de cada grupo de textos casi duplicados.
+
+    Args:
+        df (pd.DataFrame): Corpus con la columna de texto ya limpia.
+        columna (str): Columna que se compara.
+        umbral (float): Similitud de Jaccard mínima para considerar dos textos duplicados.
+        ruta_reporte (str): Si se indica, guarda ahí el reporte de grupos en JSON.
+        **opciones: num_permutaciones, tamano_shingle o semilla para agrupar_casi_duplicados.
+
+    Returns:
+        (DataFrame sin los casi duplicados, reporte de grupos ordenado por tamaño)
+    """
+    textos = df[columna].fillna("").astype(str).tolist()
+    grupos = agrupar_casi_duplicados(textos, umbral, **opciones)
+
+    descartar = np.zeros(len(df), dtype=bool)
+    reporte = []
+    for grupo in grupos:
+        descartar[grupo[1:]] = True
+        reporte.append({
+            "tamano": len(grupo),
+            "texto_conservado": textos[grupo[0]],
+            "ejemplos_descartados": [textos[i] for i in grupo[1:4]],
+        })
+    reporte.sort(key=lambda g: g["tamano"], reverse=True)
+
+    print(f"Grupos de casi duplicados (Jaccard >= {umbral}): {len(grupos)}, filas descartadas: {int(descartar.sum())}")
+    for grupo in reporte[:5]:
+        print(f"  {grupo['tamano']} x '{grupo['texto_conservado'][:80]}'")
+    if ruta_reporte:
+        os.makedirs(os.path.dirname(ruta_reporte) or ".", exist_ok=True)
+        with open(ruta_reporte, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"Reporte de casi duplicados guardado en '{ruta_reporte}'")
+
+    return df[~descartar].reset_index(drop=True), reporte
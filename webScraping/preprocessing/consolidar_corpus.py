@@ -1,26 +1,32 @@
 import pandas as pd
 import os
+import queue
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
 
-def consolidar_corpus_csvs(carpeta_entrada: str, archivo_salida: str) -> None:
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+# Tamaño de cada bloque leído por el lector de CSV de pyarrow
+BYTES_POR_BLOQUE_ARROW = 8 << 20
+
+def cargar_corpus_csvs(carpeta_entrada: str, archivo_excluir: Optional[str] = None) -> Optional[pd.DataFrame]:
     """
-    Carga todos los archivos CSV de una carpeta, los concatena y guarda
-    el resultado en un único archivo CSV consolidado.
+    Carga todos los archivos CSV de una carpeta y los concatena en un DataFrame.
 
     Args:
-        carpeta_entrada (str): Ruta a la carpeta que contiene los archivos CSV
-                               a consolidar (e.g., "../datosLimpios").
-        archivo_salida (str): Ruta completa del archivo donde se guardará el
-                              corpus final (e.g., "../datosLimpios/corpus_completo.csv").
+        carpeta_entrada (str): Ruta a la carpeta que contiene los archivos CSV.
+        archivo_excluir (str): Archivo que se omite aunque esté en la carpeta (e.g., la salida).
+
+    Returns:
+        El corpus concatenado, o None si no se encontró ningún CSV.
     """
-    
-    # Extraer la ruta del directorio del archivo de salida
-    carpeta_salida = os.path.dirname(archivo_salida)
-    
-    # Si la carpeta de salida no es vacía (es decir, no es solo el nombre del archivo)
-    if carpeta_salida and not os.path.exists(carpeta_salida):
-        os.makedirs(carpeta_salida)
-        print(f"Creada carpeta de salida: {carpeta_salida}")
-    
     # 1. Inicializar la lista de DataFrames
     dataframes = []
     archivos_procesados = 0
@@ -31,14 +37,14 @@ def consolidar_corpus_csvs(carpeta_entrada: str, archivo_salida: str) -> None:
     # Manejar el caso donde la carpeta de entrada no existe
     if not os.path.exists(carpeta_entrada):
         print(f"Error: La carpeta de entrada no existe: {carpeta_entrada}")
-        return
+        return None
         
     for filename in os.listdir(carpeta_entrada):
         if filename.endswith(".csv"):
             filepath = os.path.join(carpeta_entrada, filename)
             
             # Omitir el archivo de salida si ya existe y está en la misma carpeta
-            if filepath == archivo_salida:
+            if filepath == archivo_excluir:
                 print(f"Omitiendo el archivo de salida: {filename}")
                 continue
             
@@ -53,14 +59,192 @@ def consolidar_corpus_csvs(carpeta_entrada: str, archivo_salida: str) -> None:
     # 3. Verificar si se cargaron archivos
     if not dataframes:
         print("No se encontraron archivos CSV para consolidar.")
-        return
+        return None
 
     # 4. Unir todos los DataFrames
     print(f"\nCargados {archivos_procesados} archivos. Concatenando...")
-    corpus_df = pd.concat(dataframes, ignore_index=True)
+    return pd.concat(dataframes, ignore_index=True)
+
+def consolidar_corpus_csvs(carpeta_entrada: str, archivo_salida: str) -> None:
+    """
+    Carga todos los archivos CSV de una carpeta, los concatena y guarda
+    el resultado en un único archivo CSV consolidado.
+
+    Args:
+        carpeta_entrada (str): Ruta a la carpeta que contiene los archivos CSV
+                               a consolidar (e.g., "../datosLimpios").
+        archivo_salida (str): Ruta completa del archivo donde se guardará el
+                              corpus final (e.g., "../datosLimpios/corpus_completo.csv").
+    """
+    
+    # Extraer la ruta del directorio del archivo de salida
+    carpeta_salida = os.path.dirname(archivo_salida)
+    
+    # Si la carpeta de salida no es vacía (es decir, no es solo el nombre del archivo)
+    if carpeta_salida and not os.path.exists(carpeta_salida):
+        os.makedirs(carpeta_salida)
+        print(f"Creada carpeta de salida: {carpeta_salida}")
+    
+    corpus_df = cargar_corpus_csvs(carpeta_entrada, archivo_salida)
+    if corpus_df is None:
+        return
 
     # 5. Guardar corpus consolidado
     corpus_df.to_csv(archivo_salida, index=False)
     
     print(f"Total de filas en el corpus: {len(corpus_df)}")
-    print(f"Corpus guardado en: {archivo_salida}")
\ No newline at end of file
+    print(f"Corpus guardado en: {archivo_salida}")
+
+
+# ------------------------------------------------------------------------------------------
+# Consolidación por bloques (memoria acotada)
+# ------------------------------------------------------------------------------------------
+def _archivos_csv(carpeta_entrada: str, archivo_salida: str) -> List[str]:
+    rutas = []
+    for filename in sorted(os.listdir(carpeta_entrada)):
+        filepath = os.path.join(carpeta_entrada, filename)
+        if filename.endswith(".csv") and os.path.abspath(filepath) != os.path.abspath(archivo_salida):
+            rutas.append(filepath)
+    return rutas
+
+def _leer_encabezado(ruta: str) -> List[str]:
+    return list(pd.read_csv(ruta, nrows=0).columns)
+
+def _bloques_csv(ruta: str, columnas: List[str], filas_por_bloque: int, motor: str) -> Iterator[pd.DataFrame]:
+    """Lee un CSV por bloques; todas las columnas como texto para no alterar los valores."""
+    if motor == "pyarrow":
+        lector = pa_csv.open_csv(
+            ruta,
+            read_options=pa_csv.ReadOptions(block_size=BYTES_POR_BLOQUE_ARROW),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={columna: pa.string() for columna in columnas}, strings_can_be_null=True
+            ),
+        )
+        for lote in lector:
+            yield lote.to_pandas()
+    else:
+        yield from pd.read_csv(ruta, dtype=str, chunksize=filas_por_bloque)
+
+def consolidar_corpus_csvs_streaming(
+    carpeta_entrada: str,
+    archivo_salida: str,
+    hilos: int = 4,
+    filas_por_bloque: int = 20000,
+    motor: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Igual que consolidar_corpus_csvs, pero sin cargar todo el corpus en memoria: los
+    archivos se leen por bloques en varios hilos y cada bloque se escribe en cuanto le
+    toca, en el orden de los archivos (alfabético). Las columnas de salida son la unión
+    de las de todos los archivos, en el orden en que aparecen; las que falten en un
+    archivo quedan vacías. La salida se escribe en un temporal y se reemplaza al final;
+    si la escritura falla (p. ej. disco lleno) o se interrumpe, los lectores se detienen
+    y el temporal se borra.
+
+    Args:
+        hilos (int): Archivos que se leen a la vez.
+        filas_por_bloque (int): Filas por bloque con el motor de pandas.
+        motor (str): "pyarrow" (por defecto si está instalado) o "pandas".
+
+    Returns:
+        Dict con archivos, filas, segundos, filas_por_seg y memoria_pico_mb, o None si no había nada que consolidar.
+    """
+    motor = motor or ("pyarrow" if pa_csv is not None else "pandas")
+    if motor == "pyarrow" and pa_csv is None:
+        print("⚠️ ADVERTENCIA: pyarrow no está instalado; se usará pandas.")
+        motor = "pandas"
+
+    if not os.path.exists(carpeta_entrada):
+        print(f"Error: La carpeta de entrada no existe: {carpeta_entrada}")
+        return None
+    carpeta_salida = os.path.dirname(archivo_salida)
+    if carpeta_salida and not os.path.exists(carpeta_salida):
+        os.makedirs(carpeta_salida)
+        print(f"Creada carpeta de salida: {carpeta_salida}")
+
+    rutas = _archivos_csv(carpeta_entrada, archivo_salida)
+    if not rutas:
+        print("No se encontraron archivos CSV para consolidar.")
+        return None
+
+    print(f"Iniciando consolidación por bloques de {len(rutas)} CSVs en: {carpeta_entrada} (motor: {motor})")
+    # Memoria pico: objetos de Python (tracemalloc) + búferes de Arrow, medidos tras cada bloque
+    tracemalloc.start()
+    pico_arrow = 0
+    inicio = time.perf_counter()
+
+    # Unión de columnas en orden de aparición (solo se leen los encabezados)
+    encabezados = {ruta: _leer_encabezado(ruta) for ruta in rutas}
+    columnas = list(dict.fromkeys(c for ruta in rutas for c in encabezados[ruta]))
+
+    # Cada archivo tiene su cola acotada: un lector adelantado no puede acumular más de
+    # dos bloques mientras el escritor termina los archivos anteriores
+    colas = {ruta: queue.Queue(maxsize=2) for ruta in rutas}
+    fin = object()
+    cancelado = threading.Event()
+
+    def encolar(ruta, elemento):
+        """Espera lugar en la cola, salvo que el escritor haya fallado (devuelve False)."""
+        while not cancelado.is_set():
+            try:
+                colas[ruta].put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def leer(ruta):
+        try:
+            for bloque in _bloques_csv(ruta, encabezados[ruta], filas_por_bloque, motor):
+                if not encolar(ruta, bloque):
+                    return
+        except Exception as e:
+            encolar(ruta, e)
+        encolar(ruta, fin)
+
+    filas = 0
+    temporal = archivo_salida + ".tmp"
+    executor = ThreadPoolExecutor(max_workers=max(1, hilos))
+    try:
+        with open(temporal, "w", encoding="utf-8", newline="") as salida:
+            for ruta in rutas:
+                executor.submit(leer, ruta)
+            pd.DataFrame(columns=columnas).to_csv(salida, index=False)
+            for ruta in rutas:
+                filas_archivo = 0
+                while (bloque := colas[ruta].get()) is not fin:
+                    if isinstance(bloque, Exception):
+                        print(f"Error al leer {os.path.basename(ruta)}. Ignorando el resto del archivo. Error: {bloque}")
+                        continue
+                    bloque.reindex(columns=columnas).to_csv(salida, header=False, index=False)
+                    filas_archivo += len(bloque)
+                    if pa is not None:
+                        pico_arrow = max(pico_arrow, pa.total_allocated_bytes())
+                print(f"Consolidado: {os.path.basename(ruta)} ({filas_archivo} filas)")
+                filas += filas_archivo
+        os.replace(temporal, archivo_salida)
+    except BaseException:
+        # Error al escribir o Ctrl-C: los lectores dejan de esperar lugar en sus colas
+        cancelado.set()
+        tracemalloc.stop()
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    segundos = time.perf_counter() - inicio
+    _, pico_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    reporte = {
+        "archivos": len(rutas),
+        "filas": filas,
+        "segundos": round(segundos, 3),
+        "filas_por_seg": round(filas / segundos, 1) if segundos else None,
+        "memoria_pico_mb": round((pico_python + pico_arrow) / 2**20, 1),
+    }
+    print(f"Total de filas en el corpus: {filas}")
+    print(f"Corpus guardado en: {archivo_salida}")
+    print(f"{reporte['filas_por_seg']} filas/seg, memoria pico {reporte['memoria_pico_mb']} MiB")
+    return reporte
@@ -0,0 +1,179 @@
+"""
+Convierte el corpus JSON jerárquico (salida de reestructurar_csv_a_json_simple)
+a un formato columnar Arrow IPC.
+
+Se generan dos tablas independientes dentro de la carpeta de salida:
+- publicaciones.arrow: una fila por publicación.
+- comentarios.arrow: una fila por comentario, unida a su publicación por `id_post`.
+
+Los archivos se escriben sin compresión para que el backend pueda mapearlos en
+memoria (memory-map) y compartirlos entre procesos sin copiarlos. Además de los
+textos, la tabla de publicaciones guarda:
+- fecha_ts: la fecha ya parseada como timestamp UTC (filtrado sin parsear texto).
+- inicio_comentarios / num_comentarios: desplazamientos del bloque contiguo de
+  comentarios de cada publicación dentro de comentarios.arrow.
+"""
+
+import json
+import os
+import shutil
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from .manifiesto_corpus import ARCHIVO_MANIFIESTO, construir_manifiesto, escribir_manifiesto
+
+ARCHIVO_PUBLICACIONES = "publicaciones.arrow"
+ARCHIVO_COMENTARIOS = "comentarios.arrow"
+# Lista de segmentos del corpus (ver segmentos_corpus.py)
+ARCHIVO_SEGMENTOS = "segmentos.json"
+CARPETA_SEGMENTOS = "segmentos"
+
+# Columnas opcionales: solo se escriben si aparecen en el corpus de entrada
+COLUMNAS_TEXTO_PUBLICACION = ["usuario", "fecha", "texto", "texto_limpio"]
+COLUMNAS_TEXTO_COMENTARIO = ["texto_comentario", "texto_comentario_limpio"]
+
+
+def _columna_texto(valores: List[Any]) -> pa.Array:
+    """Convierte una lista de valores a un arreglo de texto (None se conserva como nulo)."""
+    return pa.array([None if v is None else str(v) for v in valores], type=pa.string())
+
+
+def _parsear_fecha(fecha: Any) -> Optional[datetime]:
+    """Parsea una fecha ISO del corpus (e.g., 2025-01-05T17:57:48.000Z) a datetime UTC."""
+    if not fecha:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(fecha).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _escribir_tabla(tabla: pa.Table, ruta: str) -> None:
+    """
+    Escribe una tabla en formato Arrow IPC (archivo) sin compresión.
+
+    Se escribe a un temporal en la misma carpeta y se reemplaza con os.replace: los
+    procesos del backend que tienen mapeada la tabla anterior la siguen leyendo (el
+    archivo viejo no se trunca) en lugar de recibir SIGBUS.
+    """
+    ruta_tmp = ruta + ".tmp"
+    with pa.OSFile(ruta_tmp, "wb") as sink:
+        with ipc.new_file(sink, tabla.schema) as writer:
+            writer.write_table(tabla)
+    os.replace(ruta_tmp, ruta)
+
+
+def construir_tablas(corpus: List[Dict[str, Any]]) -> Tuple[pa.Table, pa.Table]:
+    """
+    Aplana la lista de publicaciones (con sus comentarios) en las tablas de
+    publicaciones y comentarios.
+    """
+    # 1. Aplanar publicaciones y comentarios en columnas
+    publicaciones: Dict[str, List[Any]] = {
+        "id_post": [], "candidato": [], "fecha_ts": [],
+        "inicio_comentarios": [], "num_comentarios": [],
+    }
+    publicaciones.update({col: [] for col in COLUMNAS_TEXTO_PUBLICACION})
+    comentarios: Dict[str, List[Any]] = {"id_post": [], "id_comentario": []}
+    comentarios.update({col: [] for col in COLUMNAS_TEXTO_COMENTARIO})
+
+    for post in corpus:
+        id_post = int(post["id_post"])
+        publicaciones["id_post"].append(id_post)
+        publicaciones["candidato"].append(post.get("candidato"))
+        publicaciones["fecha_ts"].append(_parsear_fecha(post.get("fecha")))
+        for col in COLUMNAS_TEXTO_PUBLICACION:
+            publicaciones[col].append(post.get(col))
+
+        # Los comentarios de cada publicación quedan contiguos: basta guardar inicio y cantidad
+        lista_comentarios = post.get("comentarios", [])
+        publicaciones["inicio_comentarios"].append(len(comentarios["id_post"]))
+        publicaciones["num_comentarios"].append(len(lista_comentarios))
+
+        for com in lista_comentarios:
+            comentarios["id_post"].append(id_post)
+            comentarios["id_comentario"].append(com.get("id_comentario"))
+            for col in COLUMNAS_TEXTO_COMENTARIO:
+                comentarios[col].append(com.get(col))
+
+    # 2. Construir tablas (el candidato se codifica como diccionario: pocos valores repetidos)
+    tabla_publicaciones = pa.table({
+        "id_post": pa.array(publicaciones["id_post"], type=pa.int64()),
+        "candidato": _columna_texto(publicaciones["candidato"]).dictionary_encode(),
+        "fecha_ts": pa.array(publicaciones["fecha_ts"], type=pa.timestamp("us", tz="UTC")),
+        "inicio_comentarios": pa.array(publicaciones["inicio_comentarios"], type=pa.int64()),
+        "num_comentarios": pa.array(publicaciones["num_comentarios"], type=pa.int32()),
+        **{
+            col: _columna_texto(publicaciones[col])
+            for col in COLUMNAS_TEXTO_PUBLICACION
+            if any(v is not None for v in publicaciones[col])
+        },
+    })
+    tabla_comentarios = pa.table({
+        "id_post": pa.array(comentarios["id_post"], type=pa.int64()),
+        "id_comentario": pa.array(comentarios["id_comentario"], type=pa.int64()),
+        **{
+            col: _columna_texto(comentarios[col])
+            for col in COLUMNAS_TEXTO_COMENTARIO
+            if any(v is not None for v in comentarios[col])
+        },
+    })
+    return tabla_publicaciones, tabla_comentarios
+
+
+def escribir_tablas(tabla_publicaciones: pa.Table, tabla_comentarios: pa.Table, carpeta: str) -> Tuple[str, str]:
+    """Guarda ambas tablas en la carpeta y devuelve sus rutas."""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta_publicaciones = os.path.join(carpeta, ARCHIVO_PUBLICACIONES)
+    ruta_comentarios = os.path.join(carpeta, ARCHIVO_COMENTARIOS)
+    _escribir_tabla(tabla_comentarios, ruta_comentarios)
+    _escribir_tabla(tabla_publicaciones, ruta_publicaciones)
+    return ruta_publicaciones, ruta_comentarios
+
+
+def convertir_json_a_columnar(ruta_json_entrada: str, carpeta_salida: str) -> None:
+    """
+    Lee el corpus JSON y lo guarda como dos tablas Arrow IPC (publicaciones
+    y comentarios) unidas por `id_post`.
+
+    Args:
+        ruta_json_entrada (str): Ruta del corpus JSON (e.g., "datasets/processed/corpus_completo.json").
+        carpeta_salida (str): Carpeta donde se guardarán publicaciones.arrow y comentarios.arrow.
+    """
+    if not os.path.exists(ruta_json_entrada):
+        print(f"Error: El archivo de entrada no existe: {ruta_json_entrada}")
+        return
+
+    with open(ruta_json_entrada, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    print(f"Corpus cargado: {len(corpus)} publicaciones.")
+
+    tabla_publicaciones, tabla_comentarios = construir_tablas(corpus)
+    ruta_publicaciones, ruta_comentarios = escribir_tablas(tabla_publicaciones, tabla_comentarios, carpeta_salida)
+
+    # Un corpus completo reemplaza a los segmentos agregados antes con segmentos_corpus.py
+    if os.path.exists(os.path.join(carpeta_salida, ARCHIVO_SEGMENTOS)):
+        os.remove(os.path.join(carpeta_salida, ARCHIVO_SEGMENTOS))
+        shutil.rmtree(os.path.join(carpeta_salida, CARPETA_SEGMENTOS), ignore_errors=True)
+        print("Segmentos anteriores descartados.")
+
+    print(f"Publicaciones guardadas en '{ruta_publicaciones}' ({tabla_publicaciones.num_rows} filas)")
+    print(f"Comentarios guardados en '{ruta_comentarios}' ({tabla_comentarios.num_rows} filas)")
+
+    manifiesto = construir_manifiesto(corpus, [ruta_publicaciones, ruta_comentarios])
+    escribir_manifiesto(manifiesto, os.path.join(carpeta_salida, ARCHIVO_MANIFIESTO))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte corpus_completo.json a formato columnar Arrow IPC.")
+    parser.add_argument("--entrada", default="datasets/processed/corpus_completo.json")
+    parser.add_argument("--salida", default="../backend/data/corpus_columnar")
+    args = parser.parse_args()
+    convertir_json_a_columnar(args.entrada, args.salida)
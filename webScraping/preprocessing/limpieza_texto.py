@@ -1,20 +1,26 @@
 import pandas as pd
+import re
 import string
 import nltk
 import os
+from concurrent.futures import ProcessPoolExecutor
 from nltk.corpus import stopwords
 from nltk.stem import SnowballStemmer
 from nltk.tokenize import word_tokenize
-from typing import Dict, Any
+from nltk.tokenize.destructive import NLTKWordTokenizer
+from typing import Dict, Any, Optional
+
+from .casi_duplicados import eliminar_casi_duplicados
 
 # Descargar recursos necesarios de NLTK solo si aún no están descargados
+# (nltk.data.find lanza LookupError si el recurso no existe)
 try:
-    nltk.data.find('tokenizers/punkt')
-except nltk.downloader.DownloadError:
-    nltk.download('punkt')
+    nltk.data.find('tokenizers/punkt_tab')
+except LookupError:
+    nltk.download('punkt_tab')
 try:
     nltk.data.find('corpora/stopwords')
-except nltk.downloader.DownloadError:
+except LookupError:
     nltk.download('stopwords')
 
 
@@ -27,13 +33,16 @@ NORMALIZATION_DICT = {
     'toy': 'estoy', 'salu2': 'saludos' # Añadido un ejemplo
 }
 
+# Tabla para eliminar la puntuación (se construye una sola vez)
+TABLA_PUNTUACION = str.maketrans('', '', string.punctuation)
+
 def clean_text(text: Any) -> str:
     """Realiza la limpieza básica: minúsculas y eliminación de puntuación."""
     if pd.isnull(text):
         return ""
     text = str(text).lower()
     # Eliminar puntuación
-    text = text.translate(str.maketrans('', '', string.punctuation))
+    text = text.translate(TABLA_PUNTUACION)
     return text.strip()
 
 def normalize_text(text: str, normalization_dict: Dict[str, str]) -> str:
@@ -54,11 +63,173 @@ def preprocess_text(text: Any, normalization_dict: Dict[str, str]) -> str:
         return " ".join(tokens)
     return ""
 
+# ------------------------------------------------------------------------------------------
+# Versión vectorizada: procesa columnas completas con métodos .str y regex precompiladas
+# ------------------------------------------------------------------------------------------
+# Sin la puntuación ASCII, word_tokenize ya no divide oraciones (Punkt solo corta en . ? !)
+# y de sus reglas solo quedan activas tres: separar comillas tipográficas y guiones largos,
+# y partir algunas contracciones del inglés ("cannot" -> "can not", "gonna" -> "gon na").
+# Se reproducen aquí para obtener exactamente el mismo resultado sin tokenizar fila por fila.
+_SEPARABLES_TOKENIZER = re.compile(r"([«“‘„»”’\u2012-\u2015])")
+# Las contracciones de NLTK en una sola alternancia: son palabras completas y disjuntas,
+# así que una pasada da lo mismo que aplicarlas una por una
+_CONTRACCIONES_TOKENIZER = re.compile(
+    "|".join(f"(?:{p.pattern.replace('(?i)', '')})" for p in NLTKWordTokenizer.CONTRACTIONS2),
+    re.IGNORECASE,
+)
+_ESPACIOS = re.compile(r"\s+")
+
+# Versión de las reglas de limpieza. Increméntela al cambiar la lógica de preprocesar_serie
+# o clean_text de forma que cambie el resultado: los textos limpios guardados (manifiesto
+# de filas de unificar_corpus y caché del pipeline) dejan de reutilizarse.
+VERSION_LIMPIEZA = 2
+
+def reglas_limpieza() -> list:
+    """Versión, tabla de puntuación y patrones del tokenizer que determinan el texto limpio."""
+    return [
+        VERSION_LIMPIEZA,
+        sorted(TABLA_PUNTUACION),
+        _SEPARABLES_TOKENIZER.pattern,
+        _CONTRACCIONES_TOKENIZER.pattern,
+        _ESPACIOS.pattern,
+    ]
+
+def _separar_contraccion(coincidencia: "re.Match") -> str:
+    return " " + " ".join(g for g in coincidencia.groups() if g is not None) + " "
+
+def compilar_normalizacion(normalization_dict: Dict[str, str]) -> "re.Pattern":
+    """Una sola alternancia con todas las palabras del diccionario (solo palabras completas)."""
+    claves = sorted(normalization_dict, key=len, reverse=True)
+    return re.compile(r"(?<!\S)(?:" + "|".join(map(re.escape, claves)) + r")(?!\S)")
+
+PATRON_NORMALIZACION = compilar_normalizacion(NORMALIZATION_DICT)
+
+def preprocesar_serie(serie: pd.Series, normalization_dict: Dict[str, str] = NORMALIZATION_DICT) -> pd.Series:
+    """Equivalente a aplicar preprocess_text a cada elemento de la serie."""
+    # clean_text: nulos -> "", minúsculas, sin puntuación
+    textos = serie.where(serie.notna(), "").astype(str)
+    textos = textos.str.lower().str.translate(TABLA_PUNTUACION)
+
+    # normalize_text: reemplazar la jerga (palabras completas entre espacios)
+    if normalization_dict:
+        patron = PATRON_NORMALIZACION if normalization_dict is NORMALIZATION_DICT else compilar_normalizacion(normalization_dict)
+        textos = textos.str.replace(patron, lambda m: normalization_dict[m.group(0)], regex=True)
+
+    # word_tokenize: las reglas que siguen activas sobre texto sin puntuación ASCII
+    textos = textos.str.replace(_SEPARABLES_TOKENIZER, r" \1 ", regex=True)
+    textos = (" " + textos + " ").str.replace(_CONTRACCIONES_TOKENIZER, _separar_contraccion, regex=True)
+
+    # Separar por espacios y unir con uno solo (split/join de normalize_text y word_tokenize)
+    return textos.str.replace(_ESPACIOS, " ", regex=True).str.strip()
+
+def limpiar_dataframe(df: pd.DataFrame, normalization_dict: Dict[str, str] = NORMALIZATION_DICT) -> pd.DataFrame:
+    """Agrega las columnas texto_limpio y texto_comentario_limpio a una copia del DataFrame."""
+    df = df.copy()
+    # Aplicar limpieza a la publicación original
+    df['texto_limpio'] = preprocesar_serie(df['texto'], normalization_dict)
+    # Aplicar limpieza al comentario
+    df['texto_comentario_limpio'] = preprocesar_serie(df['texto_comentario'], normalization_dict)
+    return df
+
+def _limpiar_bloque(argumentos):
+    # Función de nivel superior para que el pool de procesos pueda serializarla
+    bloque, normalization_dict = argumentos
+    return limpiar_dataframe(bloque, normalization_dict)
+
+def limpiar_dataframe_en_paralelo(
+    df: pd.DataFrame,
+    normalization_dict: Dict[str, str] = NORMALIZATION_DICT,
+    procesos: int = 0,
+    tamano_bloque: int = 500
+) -> pd.DataFrame:
+    """
+    Igual que limpiar_dataframe, pero reparte el DataFrame en bloques de filas entre
+    varios procesos. Los bloques se vuelven a unir en el orden original, así que el
+    resultado es idéntico al de la ejecución en un solo proceso.
+
+    Args:
+        procesos (int): Número de procesos (0 = todos los núcleos disponibles).
+        tamano_bloque (int): Filas por bloque enviado a cada proceso.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if procesos <= 1 or len(df) <= tamano_bloque:
+        return limpiar_dataframe(df, normalization_dict)
+
+    bloques = [df.iloc[i:i + tamano_bloque] for i in range(0, len(df), tamano_bloque)]
+    with ProcessPoolExecutor(max_workers=min(procesos, len(bloques))) as executor:
+        # map devuelve los resultados en el orden de los bloques
+        resultados = list(executor.map(_limpiar_bloque, [(bloque, normalization_dict) for bloque in bloques]))
+    return pd.concat(resultados)
+
+def deduplicar_corpus(
+    df: pd.DataFrame,
+    umbral_casi_duplicados: Optional[float] = None,
+    ruta_reporte_casi_duplicados: Optional[str] = None
+) -> pd.DataFrame:
+    """Elimina duplicados de un corpus ya limpio y deja solo las columnas finales."""
+    print("\nEliminando duplicados...")
+    
+    # Primera pasada: eliminar comentarios con texto limpio idéntico
+    filas_antes_dup_texto = len(df)
+    df = df.drop_duplicates(subset=['texto_comentario_limpio'], keep='first').reset_index(drop=True)
+    print(f"Duplicados por texto_comentario_limpio eliminados. Filas restantes: {len(df)} (Eliminados: {filas_antes_dup_texto - len(df)})")
+    
+    # Segunda pasada: eliminar filas completamente idénticas (por si acaso)
+    filas_antes_dup_completo = len(df)
+    df = df.drop_duplicates().reset_index(drop=True)
+    print(f"Duplicados completos eliminados. Filas restantes: {len(df)} (Eliminados: {filas_antes_dup_completo - len(df)})")
+
+    # Tercera pasada (opcional): comentarios casi idénticos (spam con un emoji o mención distinta)
+    if umbral_casi_duplicados:
+        filas_antes_casi_dup = len(df)
+        df, _ = eliminar_casi_duplicados(
+            df, 'texto_comentario_limpio', umbral_casi_duplicados, ruta_reporte=ruta_reporte_casi_duplicados
+        )
+        print(f"Casi duplicados eliminados. Filas restantes: {len(df)} (Eliminados: {filas_antes_casi_dup - len(df)})")
+    
+    # Seleccionar columnas requeridas (añadimos todas las columnas limpias)
+    columnas_finales = [
+        'candidato', 'usuario', 'fecha', 
+        'texto', 'texto_limpio', 
+        'texto_comentario', 'texto_comentario_limpio',
+    ]
+    
+    # Filtra solo las columnas que existen en el DataFrame
+    return df[[col for col in columnas_finales if col in df.columns]]
+
+def limpiar_y_normalizar_dataframe(
+    df: pd.DataFrame,
+    normalization_dict: Dict[str, str] = NORMALIZATION_DICT,
+    procesos: int = 1,
+    tamano_bloque: int = 500,
+    umbral_casi_duplicados: Optional[float] = None,
+    ruta_reporte_casi_duplicados: Optional[str] = None
+) -> pd.DataFrame:
+    """Lo mismo que limpiar_y_normalizar_corpus, pero en memoria: recibe y devuelve el DataFrame."""
+    # Eliminación de filas con texto nulo en columnas clave (ANTES de limpiar)
+    filas_iniciales = len(df)
+    df = df.dropna(subset=['texto', 'texto_comentario']).reset_index(drop=True)
+    print(f"Filas nulas eliminadas. Filas restantes: {len(df)} (Eliminados: {filas_iniciales - len(df)})")
+
+    # 2. Aplicar Preprocesamiento
+    print("\nAplicando limpieza y normalización...")
+    if procesos == 1:
+        df = limpiar_dataframe(df, normalization_dict)
+    else:
+        df = limpiar_dataframe_en_paralelo(df, normalization_dict, procesos, tamano_bloque)
+    
+    # 3. Eliminación de Duplicados (DESPUÉS de la limpieza, sobre el resultado ya unido)
+    return deduplicar_corpus(df, umbral_casi_duplicados, ruta_reporte_casi_duplicados)
+
 def limpiar_y_normalizar_corpus(
     ruta_archivo_entrada: str, 
     carpeta_salida: str,
     nombre_archivo_salida: str = "corpus_preprocesado.csv",
-    normalization_dict: Dict[str, str] = NORMALIZATION_DICT
+    normalization_dict: Dict[str, str] = NORMALIZATION_DICT,
+    procesos: int = 1,
+    tamano_bloque: int = 500,
+    umbral_casi_duplicados: Optional[float] = None,
+    ruta_reporte_casi_duplicados: Optional[str] = None
 ) -> None:
     """
     Lee el corpus consolidado, aplica la limpieza, normalización y guarda el resultado.
@@ -68,6 +239,11 @@ def limpiar_y_normalizar_corpus(
         carpeta_salida (str): Carpeta donde se guardará el CSV limpio.
         nombre_archivo_salida (str): Nombre del archivo CSV de salida.
         normalization_dict (Dict[str, str]): Diccionario de jerga para normalizar.
+        procesos (int): Procesos para el preprocesamiento (1 = serial, 0 = todos los núcleos).
+        tamano_bloque (int): Filas por bloque en el modo paralelo.
+        umbral_casi_duplicados (float): Si se indica (e.g., 0.8), elimina además los comentarios
+            casi duplicados con similitud de Jaccard mayor o igual (MinHash + LSH).
+        ruta_reporte_casi_duplicados (str): JSON opcional con los grupos de casi duplicados.
     """
     
     # 0. Verificación de Carpeta de Salida
@@ -83,45 +259,12 @@ def limpiar_y_normalizar_corpus(
         print(f"Error al leer el archivo: {ruta_archivo_entrada}. Error: {e}")
         return
 
-    # Eliminación de filas con texto nulo en columnas clave (ANTES de limpiar)
-    filas_iniciales = len(df)
-    df = df.dropna(subset=['texto', 'texto_comentario']).reset_index(drop=True)
-    print(f"Filas nulas eliminadas. Filas restantes: {len(df)} (Eliminados: {filas_iniciales - len(df)})")
+    # 2-3. Limpieza, normalización y eliminación de duplicados
+    df_final = limpiar_y_normalizar_dataframe(
+        df, normalization_dict, procesos, tamano_bloque, umbral_casi_duplicados, ruta_reporte_casi_duplicados
+    )
 
-    # 2. Aplicar Preprocesamiento
-    print("\nAplicando limpieza y normalización...")
-    
-    # Aplicar limpieza a la publicación original
-    df['texto_limpio'] = df['texto'].apply(lambda x: preprocess_text(x, normalization_dict))
-    
-    # Aplicar limpieza al comentario
-    df['texto_comentario_limpio'] = df['texto_comentario'].apply(lambda x: preprocess_text(x, normalization_dict))
-    
-    # 3. Eliminación de Duplicados (DESPUÉS de la limpieza)
-    print("\nEliminando duplicados...")
-    
-    # Primera pasada: eliminar comentarios con texto limpio idéntico
-    filas_antes_dup_texto = len(df)
-    df = df.drop_duplicates(subset=['texto_comentario_limpio'], keep='first').reset_index(drop=True)
-    print(f"Duplicados por texto_comentario_limpio eliminados. Filas restantes: {len(df)} (Eliminados: {filas_antes_dup_texto - len(df)})")
-    
-    # Segunda pasada: eliminar filas completamente idénticas (por si acaso)
-    filas_antes_dup_completo = len(df)
-    df = df.drop_duplicates().reset_index(drop=True)
-    print(f"Duplicados completos eliminados. Filas restantes: {len(df)} (Eliminados: {filas_antes_dup_completo - len(df)})")
-    
     # 4. Guardado Final
-    
-    # Seleccionar columnas requeridas (añadimos todas las columnas limpias)
-    columnas_finales = [
-        'candidato', 'usuario', 'fecha', 
-        'texto', 'texto_limpio', 
-        'texto_comentario', 'texto_comentario_limpio',
-    ]
-    
-    # Filtra solo las columnas que existen en el DataFrame
-    df_final = df[[col for col in columnas_finales if col in df.columns]]
-
     ruta_salida_final = os.path.join(carpeta_salida, nombre_archivo_salida)
     
     df_final.to_csv(ruta_salida_final, index=False)
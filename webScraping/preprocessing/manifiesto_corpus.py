@@ -0,0 +1,159 @@
+"""
+Manifiesto del corpus: resumen pequeño que se guarda junto a los datos.
+
+Contiene el número de publicaciones y comentarios, las publicaciones por
+candidato, las fechas mínima y máxima (YYYY-MM-DD), un hash del contenido, el
+tamaño total en bytes de los archivos de datos y la huella de cada archivo
+(tamaño y hash de su primer y último bloque, ver huella_archivos). El backend lo
+sirve en /salud sin cargar ni recorrer el corpus; si el tamaño o la huella de los
+datos ya no coinciden, el manifiesto se considera desactualizado.
+
+- Corpus JSON: corpus_completo.json -> corpus_completo.manifiesto.json
+- Corpus columnar: <carpeta>/manifiesto.json
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+ARCHIVO_MANIFIESTO = "manifiesto.json"
+
+
+def ruta_manifiesto_json(ruta_json: str) -> str:
+    """Ruta del manifiesto de un corpus JSON (mismo nombre con extensión .manifiesto.json)."""
+    base, _ = os.path.splitext(ruta_json)
+    return base + ".manifiesto.json"
+
+
+def hash_archivos(rutas: Iterable[str]) -> str:
+    """SHA-256 del contenido de los archivos, en el orden dado (leídos por bloques)."""
+    sha = hashlib.sha256()
+    for ruta in rutas:
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                sha.update(bloque)
+    return sha.hexdigest()
+
+
+# Bytes del inicio y del final de cada archivo que entran en su huella
+BLOQUE_HUELLA = 1 << 16
+
+
+def huella_archivos(rutas: Iterable[str]) -> List[List[Any]]:
+    """
+    [tamaño, sha256 del primer y último bloque] de cada archivo. Es barata de
+    calcular y cambia si el archivo se reescribe con el mismo tamaño (en Arrow IPC
+    el pie guarda el esquema y la posición de cada bloque; en JSON el final tiene
+    la última publicación).
+    """
+    huellas = []
+    for ruta in rutas:
+        tamano = os.path.getsize(ruta)
+        sha = hashlib.sha256()
+        with open(ruta, "rb") as f:
+            sha.update(f.read(BLOQUE_HUELLA))
+            if tamano > BLOQUE_HUELLA:
+                f.seek(max(BLOQUE_HUELLA, tamano - BLOQUE_HUELLA))
+                sha.update(f.read())
+        huellas.append([tamano, sha.hexdigest()])
+    return huellas
+
+
+def _fecha_utc(fecha: Any) -> Optional[datetime]:
+    if not fecha:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(fecha).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class ResumenCorpus:
+    """Acumula los datos del manifiesto publicación por publicación (sin tener el corpus en memoria)."""
+
+    def __init__(self) -> None:
+        self.publicaciones = 0
+        self.comentarios = 0
+        self.por_candidato: Dict[str, int] = {}
+        self.fecha_min: Optional[datetime] = None
+        self.fecha_max: Optional[datetime] = None
+
+    def agregar(self, post: Dict[str, Any]) -> None:
+        self.publicaciones += 1
+        candidato = post.get("candidato")
+        if candidato is not None:
+            self.por_candidato[candidato] = self.por_candidato.get(candidato, 0) + 1
+        self.comentarios += len(post.get("comentarios", []))
+        fecha = _fecha_utc(post.get("fecha"))
+        if fecha:
+            self.fecha_min = fecha if self.fecha_min is None else min(self.fecha_min, fecha)
+            self.fecha_max = fecha if self.fecha_max is None else max(self.fecha_max, fecha)
+
+    def manifiesto(self, rutas_datos: List[str]) -> Dict[str, Any]:
+        """Manifiesto de los datos acumulados, guardados en rutas_datos."""
+        return {
+            "publicaciones": self.publicaciones,
+            "comentarios": self.comentarios,
+            "publicaciones_por_candidato": dict(sorted(self.por_candidato.items())),
+            "fecha_min": self.fecha_min.strftime("%Y-%m-%d") if self.fecha_min else None,
+            "fecha_max": self.fecha_max.strftime("%Y-%m-%d") if self.fecha_max else None,
+            "hash": hash_archivos(rutas_datos),
+            "bytes_datos": sum(os.path.getsize(ruta) for ruta in rutas_datos),
+            "huella_datos": huella_archivos(rutas_datos),
+            "generado": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+def construir_manifiesto(corpus: Iterable[Dict[str, Any]], rutas_datos: List[str]) -> Dict[str, Any]:
+    """Resume una lista de publicaciones (formato de corpus_completo.json) guardada en rutas_datos."""
+    resumen = ResumenCorpus()
+    for post in corpus:
+        resumen.agregar(post)
+    return resumen.manifiesto(rutas_datos)
+
+
+def combinar_manifiestos(anterior: Dict[str, Any], nuevo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Manifiesto de un corpus al que se agregaron datos (segmento nuevo) sin volver a
+    recorrerlo: suma conteos, amplía el rango de fechas y encadena los hashes.
+    """
+    por_candidato = dict(anterior["publicaciones_por_candidato"])
+    for candidato, cantidad in nuevo["publicaciones_por_candidato"].items():
+        por_candidato[candidato] = por_candidato.get(candidato, 0) + cantidad
+    fechas_min = [f for f in (anterior["fecha_min"], nuevo["fecha_min"]) if f]
+    fechas_max = [f for f in (anterior["fecha_max"], nuevo["fecha_max"]) if f]
+
+    return {
+        "publicaciones": anterior["publicaciones"] + nuevo["publicaciones"],
+        "comentarios": anterior["comentarios"] + nuevo["comentarios"],
+        "publicaciones_por_candidato": dict(sorted(por_candidato.items())),
+        "fecha_min": min(fechas_min) if fechas_min else None,
+        "fecha_max": max(fechas_max) if fechas_max else None,
+        "hash": hashlib.sha256((anterior["hash"] + nuevo["hash"]).encode("utf-8")).hexdigest(),
+        "bytes_datos": anterior["bytes_datos"] + nuevo["bytes_datos"],
+        # Un manifiesto anterior sin huella deja la lista incompleta (se considera desactualizado)
+        "huella_datos": anterior.get("huella_datos", []) + nuevo["huella_datos"],
+        "generado": nuevo["generado"],
+    }
+
+
+def leer_manifiesto(ruta: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def escribir_manifiesto(manifiesto: Dict[str, Any], ruta: str) -> None:
+    """Guarda el manifiesto de forma atómica (archivo temporal + os.replace)."""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    print(f"Manifiesto guardado en '{ruta}' ({manifiesto['publicaciones']} publicaciones, "
+          f"{manifiesto['comentarios']} comentarios)")
@@ -0,0 +1,277 @@
+"""
+Pipeline de preprocesamiento en memoria.
+
+Encadena las etapas del preprocesamiento (consolidar -> unificar -> limpiar ->
+reestructurar) pasando DataFrames de una a otra, sin CSV intermedios en disco. Da
+el mismo resultado que ejecutar los módulos uno por uno como en main.ipynb.
+
+Cada etapa puede guardar su resultado en caché (en memoria y, opcionalmente, en una
+carpeta). La clave depende del nombre y la versión de la etapa y de la clave de su
+entrada:
+- La clave de la entrada inicial es un hash de su contenido (los CSV de la carpeta).
+- La clave de la salida de una etapa es un hash de su contenido; si la salida viene
+  de la caché, su clave se guardó junto a ella y no se vuelve a calcular.
+Así, volver a ejecutar el pipeline solo repite las etapas cuya entrada cambió, y
+ejecutar_desde("limpiar") vuelve a correr una etapa sin repetir las anteriores.
+
+Por cada etapa se informa el tiempo, la memoria pico (tracemalloc), las filas de
+salida y si el resultado vino de la caché.
+
+Uso (desde la raíz del repositorio):
+
+    python -m webScraping.preprocessing.pipeline \
+        --entrada webScraping/datasets/raw/datos_completos_publicacion \
+        --historico webScraping/datasets/processed/corpus_preprocesado.csv \
+        --salida webScraping/datasets/processed/corpus_completo.json \
+        --cache webScraping/datasets/cache_pipeline
+
+Con --mongo se agrega al final una etapa que carga el JSON en MongoDB por lotes
+(storage/mongodb_loader.py). Desde código, cualquier destino se agrega igual:
+
+    pipeline.etapas.append(Etapa("mongo", lambda ruta: cargar_publicaciones_a_mongo(
+        leer_publicaciones(ruta), coleccion), cacheable=False))
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+import tracemalloc
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from .consolidar_corpus import cargar_corpus_csvs
+from .limpieza_texto import NORMALIZATION_DICT, limpiar_y_normalizar_dataframe
+from .manifiesto_corpus import escribir_manifiesto, hash_archivos, ruta_manifiesto_json
+from .reestructurar_csv_a_json import escribir_publicaciones, publicaciones_desde_dataframe
+from .unificar_corpus import huella_limpieza
+
+
+def hash_contenido(objeto: Any) -> str:
+    """Hash del contenido de una entrada o salida de etapa (DataFrame, carpeta o archivo, u objeto)."""
+    sha = hashlib.sha256()
+    if isinstance(objeto, pd.DataFrame):
+        sha.update(json.dumps([list(map(str, objeto.columns)), list(map(str, objeto.dtypes))]).encode("utf-8"))
+        sha.update(pd.util.hash_pandas_object(objeto, index=False).to_numpy().tobytes())
+    elif isinstance(objeto, str) and os.path.isdir(objeto):
+        rutas = sorted(glob.glob(os.path.join(objeto, "*.csv")))
+        sha.update(json.dumps([os.path.basename(r) for r in rutas]).encode("utf-8"))
+        sha.update(hash_archivos(rutas).encode("utf-8"))
+    elif isinstance(objeto, str) and os.path.isfile(objeto):
+        sha.update(hash_archivos([objeto]).encode("utf-8"))
+    else:
+        sha.update(pickle.dumps(objeto))
+    return sha.hexdigest()[:32]
+
+
+class Etapa:
+    """
+    Una etapa del pipeline.
+
+    Args:
+        nombre: identificador de la etapa (único dentro del pipeline).
+        funcion: función entrada -> salida.
+        version: cambia la clave de caché (p. ej. parámetros o versión del código de la etapa).
+        cacheable: False para etapas con efectos (escribir archivos, cargar a MongoDB).
+    """
+
+    def __init__(self, nombre: str, funcion: Callable[[Any], Any], version: str = "", cacheable: bool = True):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.version = version
+        self.cacheable = cacheable
+
+
+class Pipeline:
+    """Ejecuta una lista de etapas en orden, con caché por etapa y reporte de tiempo y memoria."""
+
+    def __init__(self, etapas: List[Etapa], carpeta_cache: Optional[str] = None, medir_memoria: bool = True):
+        self.etapas = etapas
+        self.carpeta_cache = carpeta_cache
+        self.medir_memoria = medir_memoria
+        self.reporte: List[Dict[str, Any]] = []
+
+        # Entrada (y su clave) de cada etapa en la última ejecución, para ejecutar_desde
+        self._entradas: Dict[str, Tuple[Any, str]] = {}
+        # Último resultado de cada etapa: nombre -> (clave de la etapa, salida, clave de la salida)
+        self._cache: Dict[str, Tuple[str, Any, str]] = {}
+
+    # ----------------------------------------------------------------------------------
+    # Ejecución
+    # ----------------------------------------------------------------------------------
+    def ejecutar(self, entrada: Any) -> Any:
+        """Ejecuta todas las etapas sobre la entrada y devuelve la salida de la última."""
+        return self._ejecutar_etapas(0, entrada, hash_contenido(entrada), forzar=None)
+
+    def ejecutar_desde(self, nombre: str, forzar: bool = True) -> Any:
+        """
+        Vuelve a ejecutar desde la etapa indicada, con la misma entrada que recibió en la
+        última ejecución (las etapas anteriores no se repiten). Con forzar=True esa etapa
+        ignora la caché; las siguientes la usan si su entrada no cambió.
+        """
+        if nombre not in self._entradas:
+            raise ValueError(f"La etapa '{nombre}' aún no se ha ejecutado")
+        inicio = [etapa.nombre for etapa in self.etapas].index(nombre)
+        entrada, clave = self._entradas[nombre]
+        return self._ejecutar_etapas(inicio, entrada, clave, forzar=nombre if forzar else None)
+
+    def _ejecutar_etapas(self, inicio: int, entrada: Any, clave: str, forzar: Optional[str]) -> Any:
+        self.reporte = []
+        for etapa in self.etapas[inicio:]:
+            self._entradas[etapa.nombre] = (entrada, clave)
+            entrada, clave = self._ejecutar_etapa(etapa, entrada, clave, forzar == etapa.nombre)
+        self.imprimir_reporte()
+        return entrada
+
+    def _ejecutar_etapa(self, etapa: Etapa, entrada: Any, clave: str, forzar: bool) -> Tuple[Any, str]:
+        clave_etapa = hashlib.sha256(f"{etapa.nombre}|{etapa.version}|{clave}".encode("utf-8")).hexdigest()[:32]
+        print(f"\n=== Etapa '{etapa.nombre}' ===")
+
+        iniciar_medicion = self.medir_memoria and not tracemalloc.is_tracing()
+        if iniciar_medicion:
+            tracemalloc.start()
+        if self.medir_memoria:
+            tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+
+        en_cache = self._leer_cache(etapa.nombre, clave_etapa) if etapa.cacheable and not forzar else None
+        if en_cache is not None:
+            origen, salida, clave_salida = en_cache
+            print(f"Resultado tomado de la caché ({origen}).")
+        else:
+            origen = "no"
+            salida = etapa.funcion(entrada)
+            if etapa.cacheable:
+                clave_salida = hash_contenido(salida)
+                self._guardar_cache(etapa.nombre, clave_etapa, salida, clave_salida)
+            else:
+                clave_salida = clave_etapa
+
+        segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1] if self.medir_memoria else None
+        if iniciar_medicion:
+            tracemalloc.stop()
+
+        self.reporte.append({
+            "etapa": etapa.nombre,
+            "segundos": round(segundos, 3),
+            "memoria_pico_mb": round(pico / 2**20, 1) if pico is not None else None,
+            "filas": len(salida) if isinstance(salida, (pd.DataFrame, list)) else None,
+            "cache": origen,
+        })
+        return salida, clave_salida
+
+    # ----------------------------------------------------------------------------------
+    # Caché (memoria + carpeta opcional)
+    # ----------------------------------------------------------------------------------
+    def _ruta_cache(self, nombre: str, clave_etapa: str) -> str:
+        return os.path.join(self.carpeta_cache, f"{nombre}-{clave_etapa}.pkl")
+
+    def _leer_cache(self, nombre: str, clave_etapa: str) -> Optional[Tuple[str, Any, str]]:
+        if nombre in self._cache and self._cache[nombre][0] == clave_etapa:
+            _, salida, clave_salida = self._cache[nombre]
+            return "memoria", salida, clave_salida
+        if self.carpeta_cache and os.path.exists(self._ruta_cache(nombre, clave_etapa)):
+            with open(self._ruta_cache(nombre, clave_etapa), "rb") as f:
+                salida, clave_salida = pickle.load(f)
+            self._cache[nombre] = (clave_etapa, salida, clave_salida)
+            return "disco", salida, clave_salida
+        return None
+
+    def _guardar_cache(self, nombre: str, clave_etapa: str, salida: Any, clave_salida: str) -> None:
+        self._cache[nombre] = (clave_etapa, salida, clave_salida)
+        if not self.carpeta_cache:
+            return
+        os.makedirs(self.carpeta_cache, exist_ok=True)
+        # Solo se conserva el último resultado de cada etapa
+        for anterior in glob.glob(os.path.join(self.carpeta_cache, f"{nombre}-*.pkl")):
+            os.remove(anterior)
+        ruta = self._ruta_cache(nombre, clave_etapa)
+        with open(ruta + ".tmp", "wb") as f:
+            pickle.dump((salida, clave_salida), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(ruta + ".tmp", ruta)
+
+    def imprimir_reporte(self) -> None:
+        print("\nEtapa            Segundos  Memoria pico (MiB)  Filas     Caché")
+        for fila in self.reporte:
+            memoria = "-" if fila["memoria_pico_mb"] is None else fila["memoria_pico_mb"]
+            filas = "-" if fila["filas"] is None else fila["filas"]
+            print(f"{fila['etapa']:<16} {fila['segundos']:>8}  {memoria:>18}  {filas:<8}  {fila['cache']}")
+
+
+# --------------------------------------------------------------------------------------
+# Pipeline del corpus (mismo flujo que main.ipynb)
+# --------------------------------------------------------------------------------------
+def _consolidar(carpeta_entrada: str) -> pd.DataFrame:
+    df = cargar_corpus_csvs(carpeta_entrada)
+    if df is None:
+        raise ValueError(f"No hay CSVs para consolidar en: {carpeta_entrada}")
+    return df
+
+
+def _unificar(df: pd.DataFrame, ruta_historico: str) -> pd.DataFrame:
+    # El histórico va primero: al eliminar duplicados se conservan sus filas
+    historico = pd.read_csv(ruta_historico)
+    print(f"- Archivo histórico cargado: {len(historico)} filas. Nuevas: {len(df)} filas.")
+    return pd.concat([historico, df], ignore_index=True)
+
+
+def _escribir_json(df: pd.DataFrame, ruta_json_salida: str, formato: str) -> str:
+    os.makedirs(os.path.dirname(ruta_json_salida) or ".", exist_ok=True)
+    resumen = escribir_publicaciones(publicaciones_desde_dataframe(df), ruta_json_salida, formato)
+    print(f"Archivo reestructurado guardado como '{ruta_json_salida}' ({resumen.publicaciones} publicaciones)")
+    escribir_manifiesto(resumen.manifiesto([ruta_json_salida]), ruta_manifiesto_json(ruta_json_salida))
+    return ruta_json_salida
+
+
+def pipeline_corpus(
+    ruta_json_salida: str,
+    ruta_historico: Optional[str] = None,
+    normalization_dict: Dict[str, str] = NORMALIZATION_DICT,
+    umbral_casi_duplicados: Optional[float] = None,
+    formato: str = "json",
+    carpeta_cache: Optional[str] = None
+) -> Pipeline:
+    """
+    Pipeline de los CSV crudos al corpus JSON: consolidar -> unificar (si hay histórico)
+    -> limpiar -> reestructurar. La entrada de ejecutar() es la carpeta de CSVs.
+    """
+    etapas = [Etapa("consolidar", _consolidar)]
+    if ruta_historico:
+        etapas.append(Etapa(
+            "unificar", partial(_unificar, ruta_historico=ruta_historico), version=hash_archivos([ruta_historico])
+        ))
+    etapas.append(Etapa(
+        "limpiar",
+        partial(limpiar_y_normalizar_dataframe, normalization_dict=normalization_dict,
+                umbral_casi_duplicados=umbral_casi_duplicados),
+        version=f"{huella_limpieza(normalization_dict)}|{umbral_casi_duplicados}",
+    ))
+    etapas.append(Etapa(
+        "reestructurar", partial(_escribir_json, ruta_json_salida=ruta_json_salida, formato=formato), cacheable=False
+    ))
+    return Pipeline(etapas, carpeta_cache)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocesa el corpus en memoria: de los CSV crudos al JSON.")
+    parser.add_argument("--entrada", default="webScraping/datasets/raw/datos_completos_publicacion")
+    parser.add_argument("--historico", default=None, help="CSV ya procesado que se unifica con los datos nuevos.")
+    parser.add_argument("--salida", default="webScraping/datasets/processed/corpus_completo.json")
+    parser.add_argument("--formato", choices=["json", "ndjson"], default="json")
+    parser.add_argument("--umbral-casi-duplicados", type=float, default=None)
+    parser.add_argument("--cache", default=None, help="Carpeta para guardar en disco el resultado de cada etapa.")
+    parser.add_argument("--mongo", action="store_true", help="Carga el JSON resultante en MongoDB (variables MONGO_*).")
+    args = parser.parse_args()
+
+    pipeline = pipeline_corpus(args.salida, args.historico, umbral_casi_duplicados=args.umbral_casi_duplicados,
+                               formato=args.formato, carpeta_cache=args.cache)
+    if args.mongo:
+        from ..storage.mongodb_loader import cargar_json_a_mongo
+        pipeline.etapas.append(Etapa("mongo", cargar_json_a_mongo, cacheable=False))
+    pipeline.ejecutar(args.entrada)
@@ -1,17 +1,88 @@
 import pandas as pd
 import json
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator
 
-def reestructurar_csv_a_json_simple(ruta_csv_entrada: str, ruta_json_salida: str) -> None:
+from .manifiesto_corpus import ResumenCorpus, escribir_manifiesto, ruta_manifiesto_json
+
+def publicaciones_desde_dataframe(df: pd.DataFrame) -> Iterator[Dict[str, Any]]:
+    """
+    Agrupa las filas (una por comentario) en publicaciones, identificadas por
+    candidato y fecha, y las genera una a una en orden de primera aparición.
+    Los datos de la publicación se toman de su primera fila.
+    """
+    # Número de publicación de cada fila (sort=False: en orden de primera aparición)
+    grupos = df.groupby(["candidato", "fecha"], sort=False, dropna=False).ngroup().to_numpy()
+    # Filas ordenadas por publicación; dentro de cada una se conserva el orden original
+    orden = grupos.argsort(kind="stable")
+    limites = (grupos[orden][1:] != grupos[orden][:-1]).nonzero()[0] + 1
+
+    # Columnas como listas de Python: evita crear una Serie por fila
+    candidatos = df["candidato"].tolist()
+    usuarios = df["usuario"].tolist()
+    fechas = df["fecha"].tolist()
+    textos = df["texto"].tolist()
+    comentarios = df["texto_comentario"].tolist()
+    tiene_comentario = df["texto_comentario"].notna().tolist()
+
+    inicio = 0
+    for id_post, fin in enumerate(list(limites) + [len(orden)], start=1):
+        if fin == inicio:
+            continue
+        filas = orden[inicio:fin].tolist()
+        primera = filas[0]
+        yield {
+            "id_post": id_post,
+            "candidato": candidatos[primera],
+            "usuario": usuarios[primera],
+            "fecha": fechas[primera],
+            "texto": textos[primera],
+            "comentarios": [
+                {"id_comentario": id_comentario, "texto_comentario": comentarios[fila]}
+                for id_comentario, fila in enumerate((f for f in filas if tiene_comentario[f]), start=1)
+            ],
+        }
+        inicio = fin
+
+def escribir_publicaciones(publicaciones: Iterable[Dict[str, Any]], ruta_json_salida: str, formato: str = "json") -> ResumenCorpus:
+    """
+    Escribe las publicaciones una a una (JSON compacto, una por línea) y devuelve el
+    resumen para el manifiesto.
+
+    Args:
+        formato (str): "json" (una lista, el formato que lee el backend) o "ndjson"
+                       (un objeto por línea, sin corchetes).
+    """
+    resumen = ResumenCorpus()
+    with open(ruta_json_salida, 'w', encoding='utf-8') as new_file:
+        if formato == "json":
+            new_file.write("[")
+        for post in publicaciones:
+            if formato == "json":
+                new_file.write("\n" if resumen.publicaciones == 0 else ",\n")
+            new_file.write(json.dumps(post, ensure_ascii=False))
+            if formato != "json":
+                new_file.write("\n")
+            resumen.agregar(post)
+        if formato == "json":
+            new_file.write("\n]\n")
+
+    return resumen
+
+def reestructurar_csv_a_json_simple(ruta_csv_entrada: str, ruta_json_salida: str, formato: str = "json") -> None:
     """
     Carga un archivo CSV y lo reestructura en un formato JSON jerárquico,
     agrupando los comentarios por la publicación original (identificada por
     candidato y fecha).
 
+    Las publicaciones se escriben una a una a medida que se generan
+    (escribir_publicaciones), sin armar antes la lista completa en memoria.
+
     Args:
         ruta_csv_entrada (str): Ruta completa del archivo CSV a leer.
         ruta_json_salida (str): Ruta completa del archivo JSON a guardar.
+        formato (str): "json" (una lista, el formato que lee el backend) o "ndjson"
+                       (un objeto por línea, sin corchetes).
     """
     
     # 0. Crear carpeta de salida si no existe
@@ -28,47 +99,14 @@ def reestructurar_csv_a_json_simple(ruta_csv_entrada: str, ruta_json_salida: str
         print(f"Error al cargar el CSV '{ruta_csv_entrada}': {e}")
         return
 
-    # 2. Estructuras de datos para la reestructuración
-    posts_seen: Dict[str, Dict[str, Any]] = {}
-    
-    # 3. Iterar y reestructurar los datos
+    # 2. Reestructurar y escribir publicación por publicación
+    # NOTA: se usa 'texto_comentario', que puede contener texto sucio/bruto.
+    # Si tienes la columna limpia, es mejor usarla aquí (e.g., "texto_comentario_limpio").
     print("Reestructurando datos...")
-    
-    for _, row in df.iterrows():
-        # Un identificador único para cada publicación
-        post_id = f"{row['candidato']}_{row['fecha']}" 
-        
-        # 3.1. Si la publicación no ha sido agregada, crear su estructura (el POST)
-        if post_id not in posts_seen:
-            post_data = {
-                "id_post": len(posts_seen) + 1, 
-                "candidato": row["candidato"],
-                "usuario": row["usuario"],
-                "fecha": row["fecha"],
-                "texto": row["texto"],
-                "comentarios": []
-            }
-            posts_seen[post_id] = post_data
-        
-        # 3.2. Obtener la referencia a la publicación actual
-        post_data = posts_seen[post_id]
-        
-        # 3.3. Si hay un comentario, agregarlo al campo de comentarios
-        # NOTA: Tu código original usaba 'texto_comentario', que puede contener texto sucio/bruto.
-        # Si tienes la columna limpia, es mejor usarla aquí (e.g., row["texto_comentario_limpio"]).
-        if pd.notna(row["texto_comentario"]):
-            comment_id = len(post_data["comentarios"]) + 1
-            post_data["comentarios"].append({
-                "id_comentario": comment_id,
-                "texto_comentario": row["texto_comentario"]
-            })
-            
-    # 4. Agregar todas las publicaciones al nuevo archivo
-    new_data: List[Dict[str, Any]] = list(posts_seen.values())
-
-    # 5. Guardar el nuevo archivo JSON con la estructura modificada
-    with open(ruta_json_salida, 'w', encoding='utf-8') as new_file:
-        json.dump(new_data, new_file, indent=4, ensure_ascii=False)
+    resumen = escribir_publicaciones(publicaciones_desde_dataframe(df), ruta_json_salida, formato)
 
     print(f"\nArchivo reestructurado guardado como '{ruta_json_salida}'")
-    print(f"Total de publicaciones (posts) únicas reestructuradas: {len(new_data)}")
\ No newline at end of file
+    print(f"Total de publicaciones (posts) únicas reestructuradas: {resumen.publicaciones}")
+
+    # 3. Manifiesto junto al JSON (conteos, fechas y hash) para que el backend no tenga que recorrerlo
+    escribir_manifiesto(resumen.manifiesto([ruta_json_salida]), ruta_manifiesto_json(ruta_json_salida))
@@ -0,0 +1,339 @@
+"""
+Corpus columnar por segmentos de solo anexado (append-only).
+
+En lugar de regenerar todo el corpus para agregar datos nuevos, cada lote de
+publicaciones nuevas se guarda como un segmento independiente (un par
+publicaciones.arrow / comentarios.arrow dentro de segmentos/<número>/). El
+archivo segmentos.json lista los segmentos vigentes, en orden; el backend los
+lee todos como un solo corpus. El corpus base (publicaciones.arrow y
+comentarios.arrow en la raíz de la carpeta, generado por convertir_corpus_columnar)
+es el segmento ".".
+
+- ingerir: agrega como segmento nuevo las publicaciones de un JSON (mismo formato
+  que corpus_completo.json) que no estén ya en el corpus, y los comentarios nuevos
+  de las publicaciones que ya están. El costo depende solo del tamaño de los datos
+  nuevos.
+- compactar: une todos los segmentos en uno solo, para que el número de archivos
+  no crezca sin límite. Se puede hacer de forma periódica con --max-segmentos.
+
+La tabla de comentarios de un segmento tiene primero los bloques contiguos de sus
+publicaciones (inicio_comentarios / num_comentarios) y, a continuación, los
+comentarios nuevos de publicaciones de segmentos anteriores, agrupados por su
+id_post. Los lectores agregan esas filas al final de los comentarios de cada
+publicación; la compactación las vuelve a dejar contiguas.
+
+segmentos.json se reemplaza de forma atómica (os.replace): un lector ve la lista
+anterior o la nueva, nunca una mezcla.
+
+Uso (desde la carpeta webScraping):
+
+    python -m preprocessing.segmentos_corpus ingerir --entrada datasets/processed/corpus_nuevo.json
+    python -m preprocessing.segmentos_corpus compactar
+"""
+
+import argparse
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+from .convertir_corpus_columnar import (
+    ARCHIVO_COMENTARIOS,
+    ARCHIVO_PUBLICACIONES,
+    ARCHIVO_SEGMENTOS,
+    CARPETA_SEGMENTOS,
+    _parsear_fecha,
+    construir_tablas,
+    escribir_tablas,
+)
+from .manifiesto_corpus import (
+    ARCHIVO_MANIFIESTO,
+    combinar_manifiestos,
+    construir_manifiesto,
+    escribir_manifiesto,
+    huella_archivos,
+    leer_manifiesto,
+)
+
+
+def listar_segmentos(carpeta: str) -> List[str]:
+    """Segmentos vigentes (rutas relativas a la carpeta del corpus)."""
+    ruta = os.path.join(carpeta, ARCHIVO_SEGMENTOS)
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)["segmentos"]
+    if os.path.exists(os.path.join(carpeta, ARCHIVO_PUBLICACIONES)):
+        return ["."]
+    return []
+
+
+def _guardar_segmentos(carpeta: str, segmentos: List[str]) -> None:
+    ruta = os.path.join(carpeta, ARCHIVO_SEGMENTOS)
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"segmentos": segmentos}, f, indent=2)
+    os.replace(temporal, ruta)
+
+
+def _siguiente_segmento(carpeta: str) -> str:
+    carpeta_segmentos = os.path.join(carpeta, CARPETA_SEGMENTOS)
+    existentes = [int(n) for n in os.listdir(carpeta_segmentos) if n.isdigit()] if os.path.isdir(carpeta_segmentos) else []
+    return f"{CARPETA_SEGMENTOS}/{max(existentes, default=0) + 1:06d}"
+
+
+def _leer_tabla(ruta: str) -> pa.Table:
+    with pa.memory_map(ruta, "r") as fuente:
+        return ipc.open_file(fuente).read_all()
+
+
+def _claves_existentes(carpeta: str, segmentos: List[str]) -> Tuple[Dict[Tuple[Any, Any], int], int]:
+    """
+    id_post de cada clave (candidato, fecha) ya guardada y el mayor id_post.
+    Solo se leen esas tres columnas de cada segmento.
+    """
+    claves: Dict[Tuple[Any, Any], int] = {}
+    max_id = 0
+    for segmento in segmentos:
+        tabla = _leer_tabla(os.path.join(carpeta, segmento, ARCHIVO_PUBLICACIONES))
+        candidatos = tabla.column("candidato").cast(pa.string()).to_pylist()
+        fechas = tabla.column("fecha_ts").to_pylist()
+        claves.update(zip(zip(candidatos, fechas), tabla.column("id_post").to_pylist()))
+        if tabla.num_rows:
+            max_id = max(max_id, pc.max(tabla.column("id_post")).as_py())
+    return claves, max_id
+
+
+def _comentarios_nuevos(
+    carpeta: str, segmentos: List[str], recibidos: Dict[int, List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Comentarios recibidos para publicaciones ya guardadas que aún no tienen (mismo
+    texto_comentario), numerados a continuación del mayor id_comentario de cada
+    publicación. Devuelve una entrada {"id_post", "comentarios"} por publicación, en
+    orden de id_post. Solo se leen los comentarios de esas publicaciones.
+    """
+    if not recibidos:
+        return []
+    ids = pa.array(list(recibidos), type=pa.int64())
+    textos: Dict[int, Set[Any]] = {id_post: set() for id_post in recibidos}
+    max_comentario: Dict[int, int] = {id_post: 0 for id_post in recibidos}
+    for segmento in segmentos:
+        tabla = _leer_tabla(os.path.join(carpeta, segmento, ARCHIVO_COMENTARIOS))
+        tabla = tabla.filter(pc.is_in(tabla.column("id_post"), value_set=ids))
+        columnas = [c for c in ("id_post", "id_comentario", "texto_comentario") if c in tabla.column_names]
+        for com in tabla.select(columnas).to_pylist():
+            textos[com["id_post"]].add(com.get("texto_comentario"))
+            max_comentario[com["id_post"]] = max(max_comentario[com["id_post"]], com["id_comentario"] or 0)
+
+    resultado = []
+    for id_post in sorted(recibidos):
+        nuevos = []
+        for com in recibidos[id_post]:
+            if com.get("texto_comentario") in textos[id_post]:
+                continue
+            textos[id_post].add(com.get("texto_comentario"))
+            max_comentario[id_post] += 1
+            nuevos.append({**com, "id_comentario": max_comentario[id_post]})
+        if nuevos:
+            resultado.append({"id_post": id_post, "comentarios": nuevos})
+    return resultado
+
+
+def _unir_comentarios(publicacion: Dict[str, Any], comentarios: List[Dict[str, Any]]) -> None:
+    """
+    Agrega a una publicación nueva los comentarios de otra copia suya en el mismo JSON
+    cuyo texto aún no tiene, numerados a continuación de su mayor id_comentario.
+    """
+    textos = {com.get("texto_comentario") for com in publicacion["comentarios"]}
+    max_comentario = max((com.get("id_comentario") or 0 for com in publicacion["comentarios"]), default=0)
+    for com in comentarios:
+        if com.get("texto_comentario") in textos:
+            continue
+        textos.add(com.get("texto_comentario"))
+        max_comentario += 1
+        publicacion["comentarios"].append({**com, "id_comentario": max_comentario})
+
+
+def ingerir_segmento(ruta_json_nuevo: str, carpeta_corpus: str, max_segmentos: int = 0) -> None:
+    """
+    Agrega las publicaciones nuevas de un JSON como un segmento más del corpus.
+
+    Las publicaciones cuyo (candidato, fecha) ya existe no se vuelven a guardar: igual
+    que en reestructurar_csv_a_json_simple, esa pareja identifica a la publicación.
+    De ellas solo se agregan los comentarios cuyo texto aún no tiene la publicación.
+    Los id_post nuevos continúan a partir del mayor existente.
+
+    Args:
+        ruta_json_nuevo (str): JSON con las publicaciones nuevas (formato de corpus_completo.json).
+        carpeta_corpus (str): Carpeta del corpus columnar (e.g., "../backend/data/corpus_columnar").
+        max_segmentos (int): Si es mayor que 0 y se supera ese número de segmentos, se compacta.
+    """
+    if not os.path.exists(ruta_json_nuevo):
+        print(f"Error: El archivo de entrada no existe: {ruta_json_nuevo}")
+        return
+
+    with open(ruta_json_nuevo, "r", encoding="utf-8") as f:
+        nuevas = json.load(f)
+
+    segmentos = listar_segmentos(carpeta_corpus)
+    claves, max_id = _claves_existentes(carpeta_corpus, segmentos)
+    max_id_guardado = max_id
+
+    publicaciones: List[Dict[str, Any]] = []
+    # id_post -> publicación nueva de este JSON (para unir sus copias repetidas)
+    nuevas_por_id: Dict[int, Dict[str, Any]] = {}
+    recibidos: Dict[int, List[Dict[str, Any]]] = {}
+    omitidas = 0
+    for post in nuevas:
+        clave = (post.get("candidato"), _parsear_fecha(post.get("fecha")))
+        id_post = claves.get(clave)
+        if id_post is not None:
+            omitidas += 1
+            if id_post <= max_id_guardado:
+                recibidos.setdefault(id_post, []).extend(post.get("comentarios", []))
+            else:
+                _unir_comentarios(nuevas_por_id[id_post], post.get("comentarios", []))
+            continue
+        max_id += 1
+        claves[clave] = max_id
+        nuevas_por_id[max_id] = {**post, "id_post": max_id, "comentarios": list(post.get("comentarios", []))}
+        publicaciones.append(nuevas_por_id[max_id])
+
+    comentarios_nuevos = _comentarios_nuevos(carpeta_corpus, segmentos, recibidos)
+    total_comentarios_nuevos = sum(len(p["comentarios"]) for p in comentarios_nuevos)
+    print(f"Publicaciones nuevas: {len(publicaciones)} (ya existentes: {omitidas}, "
+          f"con {total_comentarios_nuevos} comentarios nuevos)")
+    if not publicaciones and not comentarios_nuevos:
+        return
+
+    segmento = _siguiente_segmento(carpeta_corpus)
+    tabla_publicaciones, tabla_comentarios = construir_tablas(publicaciones)
+    if comentarios_nuevos:
+        # Después de los bloques de las publicaciones nuevas, agrupados por id_post
+        _, tabla_delta = construir_tablas(comentarios_nuevos)
+        tabla_comentarios = pa.concat_tables([tabla_comentarios, tabla_delta], promote_options="default")
+    rutas = escribir_tablas(tabla_publicaciones, tabla_comentarios, os.path.join(carpeta_corpus, segmento))
+    _guardar_segmentos(carpeta_corpus, segmentos + [segmento])
+
+    # El manifiesto se actualiza solo con los datos nuevos
+    ruta_manifiesto = os.path.join(carpeta_corpus, ARCHIVO_MANIFIESTO)
+    anterior = leer_manifiesto(ruta_manifiesto)
+    if anterior is not None:
+        nuevo = construir_manifiesto(publicaciones, list(rutas))
+        nuevo["comentarios"] += total_comentarios_nuevos
+        escribir_manifiesto(combinar_manifiestos(anterior, nuevo), ruta_manifiesto)
+    else:
+        print("Advertencia: el corpus no tiene manifiesto; vuelva a convertirlo para generarlo.")
+    print(f"Segmento '{segmento}' agregado: {tabla_publicaciones.num_rows} publicaciones, "
+          f"{tabla_comentarios.num_rows} comentarios ({len(segmentos) + 1} segmentos en total)")
+
+    if max_segmentos and len(segmentos) + 1 > max_segmentos:
+        compactar_segmentos(carpeta_corpus)
+
+
+def _reagrupar_comentarios(
+    tabla_publicaciones: pa.Table, tabla_comentarios: pa.Table, filas_extra: Dict[int, List[int]]
+) -> Tuple[pa.Table, pa.Table]:
+    """Deja los comentarios de cada publicación (su bloque y los agregados después) en un solo bloque."""
+    orden: List[int] = []
+    inicios, cantidades = [], []
+    for id_post, inicio, cantidad in zip(
+        tabla_publicaciones.column("id_post").to_pylist(),
+        tabla_publicaciones.column("inicio_comentarios").to_pylist(),
+        tabla_publicaciones.column("num_comentarios").to_pylist(),
+    ):
+        inicios.append(len(orden))
+        orden.extend(range(inicio, inicio + cantidad))
+        orden.extend(filas_extra.get(id_post, []))
+        cantidades.append(len(orden) - inicios[-1])
+
+    for columna, valores, tipo in (("inicio_comentarios", inicios, pa.int64()), ("num_comentarios", cantidades, pa.int32())):
+        indice = tabla_publicaciones.schema.get_field_index(columna)
+        tabla_publicaciones = tabla_publicaciones.set_column(indice, columna, pa.array(valores, type=tipo))
+    return tabla_publicaciones, tabla_comentarios.take(pa.array(orden, type=pa.int64()))
+
+
+def compactar_segmentos(carpeta_corpus: str) -> None:
+    """
+    Une todos los segmentos en uno solo. El contenido no cambia: del manifiesto solo
+    se actualizan el tamaño y la huella de los datos. Los archivos anteriores se borran después
+    de publicar la nueva lista; un proceso que aún los tenga mapeados sigue leyéndolos
+    sin problema (en Windows pueden quedar hasta la siguiente compactación).
+    """
+    segmentos = listar_segmentos(carpeta_corpus)
+    if len(segmentos) <= 1:
+        print("Nada que compactar.")
+        return
+
+    tablas_pub, tablas_com = [], []
+    desplazamiento = 0
+    # Filas (en la tabla unida) de comentarios agregados a publicaciones de segmentos anteriores
+    filas_extra: Dict[int, List[int]] = {}
+    for segmento in segmentos:
+        tabla_pub = _leer_tabla(os.path.join(carpeta_corpus, segmento, ARCHIVO_PUBLICACIONES))
+        tabla_com = _leer_tabla(os.path.join(carpeta_corpus, segmento, ARCHIVO_COMENTARIOS))
+        cubiertos = pc.sum(tabla_pub.column("num_comentarios")).as_py() or 0
+        ids_extra = tabla_com.column("id_post").slice(cubiertos).to_pylist()
+        for fila, id_post in enumerate(ids_extra, start=desplazamiento + cubiertos):
+            filas_extra.setdefault(id_post, []).append(fila)
+        # Los inicios de comentarios pasan a ser relativos a la tabla unida
+        indice = tabla_pub.schema.get_field_index("inicio_comentarios")
+        tabla_pub = tabla_pub.set_column(
+            indice, "inicio_comentarios", pc.add(tabla_pub.column("inicio_comentarios"), desplazamiento)
+        )
+        desplazamiento += tabla_com.num_rows
+        tablas_pub.append(tabla_pub)
+        tablas_com.append(tabla_com)
+
+    tabla_publicaciones = pa.concat_tables(tablas_pub, promote_options="default").unify_dictionaries().combine_chunks()
+    tabla_comentarios = pa.concat_tables(tablas_com, promote_options="default").combine_chunks()
+    if filas_extra:
+        tabla_publicaciones, tabla_comentarios = _reagrupar_comentarios(tabla_publicaciones, tabla_comentarios, filas_extra)
+
+    segmento = _siguiente_segmento(carpeta_corpus)
+    rutas = escribir_tablas(tabla_publicaciones, tabla_comentarios, os.path.join(carpeta_corpus, segmento))
+    _guardar_segmentos(carpeta_corpus, [segmento])
+
+    ruta_manifiesto = os.path.join(carpeta_corpus, ARCHIVO_MANIFIESTO)
+    manifiesto = leer_manifiesto(ruta_manifiesto)
+    if manifiesto is not None:
+        manifiesto["bytes_datos"] = sum(os.path.getsize(ruta) for ruta in rutas)
+        manifiesto["huella_datos"] = huella_archivos(list(rutas))
+        escribir_manifiesto(manifiesto, ruta_manifiesto)
+
+    for anterior in segmentos:
+        try:
+            if anterior == ".":
+                os.remove(os.path.join(carpeta_corpus, ARCHIVO_PUBLICACIONES))
+                os.remove(os.path.join(carpeta_corpus, ARCHIVO_COMENTARIOS))
+            else:
+                shutil.rmtree(os.path.join(carpeta_corpus, anterior))
+        except OSError as e:
+            print(f"No se pudo borrar el segmento '{anterior}': {e}")
+
+    print(f"{len(segmentos)} segmentos compactados en '{segmento}': "
+          f"{tabla_publicaciones.num_rows} publicaciones, {tabla_comentarios.num_rows} comentarios")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corpus columnar por segmentos: ingesta y compactación.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_ingerir = subparsers.add_parser("ingerir", help="Agrega publicaciones nuevas como un segmento.")
+    parser_ingerir.add_argument("--entrada", required=True, help="JSON con las publicaciones nuevas.")
+    parser_ingerir.add_argument("--corpus", default="../backend/data/corpus_columnar")
+    parser_ingerir.add_argument("--max-segmentos", type=int, default=0,
+                                help="Compactar si se supera este número de segmentos (0 = nunca).")
+
+    parser_compactar = subparsers.add_parser("compactar", help="Une todos los segmentos en uno.")
+    parser_compactar.add_argument("--corpus", default="../backend/data/corpus_columnar")
+
+    args = parser.parse_args()
+    if args.comando == "ingerir":
+        ingerir_segmento(args.entrada, args.corpus, args.max_segmentos)
+    else:
+        compactar_segmentos(args.corpus)
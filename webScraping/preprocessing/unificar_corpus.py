@@ -4,20 +4,98 @@ Este script:
 1. Lee el corpus original.
 2. Lee el corpus nuevo.
 3. Los fusiona en uno solo.
-4. Aplica la función limpiar_y_normalizar_corpus (que elimina duplicados).
-5. Guarda el resultado en la carpeta datasets/raw/corpus_completo.
+4. Limpia solo las filas nuevas o modificadas y elimina duplicados (limpieza_texto).
+5. Guarda el resultado en la ruta de salida.
+
+Junto a la salida se guarda un manifiesto de filas (<salida>.filas.json): el hash
+del contenido de cada fila ya limpiada y su texto limpio. En la siguiente
+ejecución solo se limpian las filas cuyo hash no está en el manifiesto, así que una
+actualización diaria cuesta en proporción a los datos nuevos. Si cambia el
+diccionario de normalización o las reglas de limpieza (VERSION_LIMPIEZA, tabla de
+puntuación y patrones del tokenizer), el manifiesto se descarta y se limpia todo.
+
+Uso (desde la raíz del repositorio):
+
+    python -m webScraping.preprocessing.unificar_corpus
 """
 
+import hashlib
+import json
 import pandas as pd
 import os
-import sys
 from pathlib import Path
+from typing import Dict, List
+
+from .limpieza_texto import NORMALIZATION_DICT, deduplicar_corpus, limpiar_dataframe, reglas_limpieza
+
+# Columnas que identifican el contenido de una fila
+COLUMNAS_HASH = ['candidato', 'usuario', 'fecha', 'texto', 'texto_comentario']
+
+
+def ruta_manifiesto_filas(ruta_salida: str) -> str:
+    """Ruta del manifiesto de filas de un CSV procesado (mismo nombre con extensión .filas.json)."""
+    base, _ = os.path.splitext(str(ruta_salida))
+    return base + ".filas.json"
+
+
+def huella_limpieza(normalization_dict: Dict[str, str]) -> str:
+    """Cambia si cambia el diccionario de normalización o las reglas de limpieza (el manifiesto deja de ser válido)."""
+    serializado = json.dumps([normalization_dict, reglas_limpieza()], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()[:16]
+
+
+def hash_filas(df: pd.DataFrame) -> List[str]:
+    """Hash de 64 bits (en hexadecimal) del contenido de cada fila."""
+    columnas = [c for c in COLUMNAS_HASH if c in df.columns]
+    return [f"{h:016x}" for h in pd.util.hash_pandas_object(df[columnas], index=False).tolist()]
+
+
+def leer_manifiesto_filas(ruta: str, huella: str) -> Dict[str, List[str]]:
+    """Filas ya limpiadas: hash -> [texto_limpio, texto_comentario_limpio]."""
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, "r", encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    if manifiesto.get("huella_limpieza") != huella:
+        print("- El diccionario de normalización o las reglas de limpieza cambiaron: se limpiarán todas las filas.")
+        return {}
+    return manifiesto["filas"]
+
 
-# Añadir el directorio actual al path para importar módulos locales
-current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.append(current_dir)
+def escribir_manifiesto_filas(ruta: str, huella: str, filas: Dict[str, List[str]]) -> None:
+    """Guarda el manifiesto de forma atómica (archivo temporal + os.replace)."""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"huella_limpieza": huella, "filas": filas}, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
 
-from preprocessing.limpieza_texto import limpiar_y_normalizar_corpus
+
+def limpiar_incremental(
+    df: pd.DataFrame,
+    manifiesto: Dict[str, List[str]],
+    normalization_dict: Dict[str, str] = NORMALIZATION_DICT
+) -> pd.DataFrame:
+    """
+    Agrega texto_limpio y texto_comentario_limpio: las filas que están en el manifiesto
+    toman los textos guardados y solo el resto se limpia. El manifiesto se actualiza
+    con las filas actuales (las que ya no existen se descartan).
+    """
+    df = df.reset_index(drop=True)
+    hashes = hash_filas(df)
+    conocidas = pd.Series([h in manifiesto for h in hashes], dtype=bool)
+    print(f"- Filas ya limpiadas (manifiesto): {int(conocidas.sum())}. Nuevas o modificadas: {int((~conocidas).sum())}.")
+
+    limpias = limpiar_dataframe(df[~conocidas], normalization_dict)
+    guardadas = [manifiesto[h] for h, conocida in zip(hashes, conocidas) if conocida]
+    df['texto_limpio'] = ""
+    df['texto_comentario_limpio'] = ""
+    df.loc[~conocidas, ['texto_limpio', 'texto_comentario_limpio']] = limpias[['texto_limpio', 'texto_comentario_limpio']]
+    if guardadas:
+        df.loc[conocidas, ['texto_limpio', 'texto_comentario_limpio']] = guardadas
+
+    manifiesto.clear()
+    manifiesto.update(zip(hashes, df[['texto_limpio', 'texto_comentario_limpio']].values.tolist()))
+    return df
 
 def unificar_y_limpiar(
     ruta_original_str="webScraping/datasets/processed/corpus_preprocesado.csv", 
@@ -50,28 +128,29 @@ def unificar_y_limpiar(
     df_new = pd.read_csv(ruta_nuevo)
     print(f"- Archivo Nuevo cargado:    {len(df_new)} filas.")
 
-    # 3. Concatenar (Fusión Cruda)
+    # 3. Concatenar (Fusión Cruda, en memoria)
     df_concat = pd.concat([df_orig, df_new], ignore_index=True)
-    
-    # Guardar temporalmente para que limpiar_y_normalizar lo procese
-    temp_path = base_path / "webScraping" / "datasets" / "temp_unificado_raw.csv"
-    os.makedirs(temp_path.parent, exist_ok=True)
-    df_concat.to_csv(temp_path, index=False)
-    
     print(f"Fusionados en memoria: {len(df_concat)} filas.")
 
-    # 4. Aplicar Limpieza y Deduplicación (Usando la lógica existente en limpieza_texto)
+    # 4. Limpieza incremental y deduplicación (misma lógica que limpiar_y_normalizar_corpus)
     print("\n- Ejecutando limpieza y desduplicación...")
-    
-    # Nota: limpiar_y_normalizar_corpus toma (entrada, carpeta_salida, nombre_archivo)
-    carpeta_salida = Path(ruta_salida_final).parent
-    nombre_archivo = Path(ruta_salida_final).name
-    
-    limpiar_y_normalizar_corpus(str(temp_path), str(carpeta_salida), nombre_archivo_salida=nombre_archivo)
-    
-    # Limpieza archivo temporal
-    if temp_path.exists():
-        os.remove(temp_path)
+    filas_iniciales = len(df_concat)
+    df_concat = df_concat.dropna(subset=['texto', 'texto_comentario']).reset_index(drop=True)
+    print(f"Filas nulas eliminadas. Filas restantes: {len(df_concat)} (Eliminados: {filas_iniciales - len(df_concat)})")
+
+    huella = huella_limpieza(NORMALIZATION_DICT)
+    ruta_manifiesto = ruta_manifiesto_filas(ruta_salida_final)
+    manifiesto = leer_manifiesto_filas(ruta_manifiesto, huella)
+    df_limpio = limpiar_incremental(df_concat, manifiesto)
+    df_final = deduplicar_corpus(df_limpio)
+
+    os.makedirs(Path(ruta_salida_final).parent, exist_ok=True)
+    df_final.to_csv(ruta_salida_final, index=False)
+    print(f"\nDatos limpiados y guardados en '{ruta_salida_final}'")
+
+    # 5. El manifiesto se guarda después de la salida: si algo falla antes, la próxima
+    #    ejecución vuelve a limpiar esas filas
+    escribir_manifiesto_filas(ruta_manifiesto, huella, manifiesto)
 
 if __name__ == "__main__":
     unificar_y_limpiar()
@@ -6,9 +6,18 @@ import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from scraping.extraccion_viewport import ExtractorViewport
+from storage.estado_scraping import id_tweet
+
+# Articles de la conversación (el que funcionó se recuerda entre publicaciones)
+EXTRACTOR_COMENTARIOS = ExtractorViewport([
+    'article[data-testid="tweet"]',
+    'article[role="article"]',
+    'div[data-testid="cellInnerDiv"] article',
+])
 
 # -------- FUNCIÓN EXTRAER COMENTARIOS ----------
-def extraer_enlaces_comentarios_csvs(driver, carpeta_entrada: str, carpeta_salida: str, max_scrolls=100):
+def extraer_enlaces_comentarios_csvs(driver, carpeta_entrada: str, carpeta_salida: str, max_scrolls=100, estado=None):
     """
     Extrae enlaces de comentarios de publicaciones usando la versión mejorada
     
@@ -17,6 +26,8 @@ def extraer_enlaces_comentarios_csvs(driver, carpeta_entrada: str, carpeta_salid
         carpeta_entrada: Carpeta con CSVs de publicaciones
         carpeta_salida: Carpeta donde guardar los enlaces de comentarios
         max_scrolls: Número máximo de scrolls para cargar comentarios
+        estado: EstadoScraping opcional con los enlaces de comentarios ya extraídos de
+                cada publicación (no se vuelve a scrollear una publicación ya procesada)
     """
     if not os.path.exists(carpeta_salida):
         os.makedirs(carpeta_salida)
@@ -29,6 +40,8 @@ def extraer_enlaces_comentarios_csvs(driver, carpeta_entrada: str, carpeta_salid
         df = pd.read_csv(ruta_csv)
             
         comentarios_info = []
+        # Una publicación repetida en el CSV se scrollea una sola vez
+        enlaces_por_publicacion = {}
             
         for _, fila in df.iterrows():
             try:
@@ -37,8 +50,22 @@ def extraer_enlaces_comentarios_csvs(driver, carpeta_entrada: str, carpeta_salid
                     print(f"Ignorando: {url}")
                     continue
                     
+                clave = id_tweet(url) or url
+                enlaces_comentarios = enlaces_por_publicacion.get(clave)
+                if enlaces_comentarios is None and estado:
+                    enlaces_comentarios = estado.resultado("enlaces_comentarios", url)
+                    if enlaces_comentarios is None and not estado.pendiente("enlaces_comentarios", url):
+                        enlaces_comentarios = []  # sin enlaces en todos sus intentos
+                if enlaces_comentarios is None:
                     # Usar función mejorada
-                enlaces_comentarios = extraer_enlaces_comentarios_mejorado(driver, url, max_scrolls=max_scrolls)
+                    enlaces_comentarios = extraer_enlaces_comentarios_mejorado(driver, url, max_scrolls=max_scrolls)
+                    if estado and enlaces_comentarios:
+                        estado.guardar("enlaces_comentarios", url, enlaces_comentarios)
+                        estado.registrar_enlaces(enlaces_comentarios, origen=url)
+                    elif estado:
+                        # Una lista vacía puede ser un error de carga: se reintenta
+                        estado.marcar_error("enlaces_comentarios", url, "sin enlaces")
+                enlaces_por_publicacion[clave] = enlaces_comentarios
                     
                 if not enlaces_comentarios:
                     comentarios_info.append({
@@ -90,7 +117,8 @@ def scroll_comentarios_mejorado(driver, max_scrolls=100, pausa_min=7, pausa_max=
     MEJORAS vs versión actual:
     - Scroll hasta el final (no límite de 15)
     - Pausas más largas (7-10s vs 5s)
-    - Extrae enlaces mientras scrollea (no pierde datos)
+    - Extrae enlaces mientras scrollea (no pierde datos), con un solo
+      execute_script por scroll
     - Detecta fin de contenido automáticamente
     
     Args:
@@ -110,42 +138,11 @@ def scroll_comentarios_mejorado(driver, max_scrolls=100, pausa_min=7, pausa_max=
     
     for i in range(max_scrolls):
         # 1. EXTRAER comentarios del contenido actual ANTES de scrollear
+        #    (una sola llamada al driver, ver extraccion_viewport.py)
         try:
-            # Múltiples selectores para mayor robustez
-            selectores = [
-                '//article[@data-testid="tweet"]',
-                '//article[@role="article"]',
-                '//div[@data-testid="cellInnerDiv"]//article'
-            ]
-            
-            tweets = []
-            for selector in selectores:
-                try:
-                    elementos = driver.find_elements(By.XPATH, selector)
-                    if elementos:
-                        tweets = elementos
-                        break
-                except:
-                    continue
-            
-            # Extraer enlaces de cada tweet/comentario
-            for tweet in tweets:
-                try:
-                    # Buscar todos los enlaces dentro del tweet
-                    links = tweet.find_elements(By.XPATH, ".//a[contains(@href, '/status/')]")
-                    for link in links:
-                        href = link.get_attribute("href")
-                        if href and "/status/" in href:
-                            # Limpiar URL
-                            if href.startswith("/"):
-                                href = "https://twitter.com" + href
-                            href = href.split('?')[0]  # Quitar parámetros
-                            enlaces_comentarios.add(href)
-                except:
-                    continue
-                    
+            enlaces_comentarios.update(EXTRACTOR_COMENTARIOS.enlaces(driver))
         except Exception as e:
-            pass
+            print(f"   Scroll {i+1}: no se pudo leer la página ({e.__class__.__name__})")
         
         # 2. Hacer scroll
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
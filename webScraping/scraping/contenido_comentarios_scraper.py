@@ -1,127 +1,160 @@
 import os
-import time
-import csv
-import random
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from core.pool_drivers import EscritorParcial, LimitadorTasa, PoolDrivers
+from scraping.parseo_tweets import SELECTOR_COMENTARIO, parsear_texto_comentario
+from storage.estado_scraping import id_tweet
 
-def minar_texto_comentarios(driver, carpeta_entrada: str, carpeta_salida: str, limite=None):
+FIELDNAMES = [
+    "candidato", "enlace_limpio", "usuario", "fecha", "texto",
+    "enlace_comentario_limpio", "texto_comentario"
+]
+
+def clave_fila(fila) -> str:
+    """Identifica una fila de entrada (publicación + comentario) para no agregarla dos veces a la salida."""
+    return "|".join(
+        "" if pd.isna(fila.get(campo, "")) else str(fila.get(campo, ""))
+        for campo in ("candidato", "enlace_limpio", "enlace_comentario_limpio")
+    )
+
+def visitar_comentario(driver, enlace: str, espera: float = 10):
+    """
+    Abre el comentario, espera a que cargue su texto y lo extrae del HTML de la página.
+    Lanza TimeoutException si el texto no aparece.
+    """
+    driver.get(enlace)
+    if espera:
+        WebDriverWait(driver, espera).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, SELECTOR_COMENTARIO))
+        )
+    return parsear_texto_comentario(driver.page_source)
+
+def minar_texto_comentarios(
+    driver,
+    carpeta_entrada: str,
+    carpeta_salida: str,
+    limite=None,
+    crear_driver=None,
+    num_drivers: int = 1,
+    crear_limitador=lambda: LimitadorTasa(pausa_min=1, pausa_max=3),
+    espera: float = 10,
+    estado=None
+):
     """
     Extrae el texto de los comentarios desde sus enlaces
-    
+
+    Con num_drivers > 1 los enlaces se reparten entre varios drivers (ver
+    core/pool_drivers.py); cada driver respeta sus propias pausas. Cada comentario
+    se guarda en un .parcial en cuanto se extrae y, al terminar cada archivo, las
+    filas se agregan a la salida en el orden de la entrada.
+
+    Args:
+        crear_driver: Función indice -> driver con sesión iniciada (con su propio perfil)
+                      para los drivers adicionales.
+        num_drivers (int): Drivers que visitan enlaces a la vez.
+        crear_limitador: Función que devuelve el LimitadorTasa de cada driver.
+        espera (float): Segundos máximos de espera a que cargue cada comentario.
+        estado: EstadoScraping opcional. Los comentarios ya extraídos no se vuelven a
+                visitar y se recuerda qué filas de la entrada ya se agregaron a cada
+                salida: al volver a ejecutar (tras una interrupción o con enlaces nuevos
+                en la entrada) solo se agregan las filas que faltan, sin duplicar. Un
+                comentario que falla no se agrega mientras le queden intentos; al
+                agotarlos se agrega con "N/A".
     """
     
-    # Versión original
     if not os.path.exists(carpeta_salida):
         os.makedirs(carpeta_salida)
 
     archivos = [f for f in os.listdir(carpeta_entrada) if f.endswith(".csv")]
-    clase_objetivo = "css-146c3p1 r-bcqeeo r-1ttztb7 r-qvutc0 r-37j5jr r-1inkyih r-16dba41 r-bnwqim r-135wba7"
-    
+    pool = PoolDrivers([driver], crear_driver, num_drivers, crear_limitador)
     contador_global = 0
-    
-    FIELDNAMES = [
-        "candidato", "enlace_limpio", "usuario", "fecha", "texto",
-        "enlace_comentario_limpio", "texto_comentario"
-    ]
-
-    for archivo in archivos:
-        ruta_csv = os.path.join(carpeta_entrada, archivo)
-        nombre_candidato = archivo.replace("_enlaces_comentarios.csv", "")
-        ruta_salida = os.path.join(carpeta_salida, f"{nombre_candidato}_datos_completos.csv")
-        
-        try:
-            df = pd.read_csv(ruta_csv)
-        except Exception as e:
-            print(f"Error al leer {ruta_csv}: {e}")
-            continue
-
-        # Lista temporal para guardar los comentarios entre cada pausa/guardado
-        comentarios_buffer = [] 
-        
-        total_filas = len(df)
-        print(f"\n--- Procesando archivo: {archivo} ({total_filas} comentarios/filas) ---")
-
-        for i, fila in df.iterrows():
-            if limite and i >= limite:
-                break
-            
-            contador_global += 1
-
-            enlace = fila.get("enlace_comentario_limpio", None)
-            
-            if pd.isna(enlace) or not isinstance(enlace, str) or not enlace.startswith("http"):
-                texto = None
-            else:
-                try:
-                    driver.get(enlace)
-                    
-                    # Pausa corta aleatoria antes de buscar, simula la lectura humana
-                    time.sleep(random.uniform(1, 3)) 
-                    
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, f'div.{".".join(clase_objetivo.split())}'))
-                    )
-                    
-                    div = driver.find_element(By.CSS_SELECTOR, f'div.{".".join(clase_objetivo.split())}')
-                    partes = div.find_elements(By.XPATH, ".//*")
-                    texto = " ".join([p.text.strip() for p in partes if p.text.strip()]) or div.text.strip()
-                    print(f"[{contador_global}/{total_filas}] Extraído: {enlace[:40]}...")
-                    
-                except (NoSuchElementException, TimeoutException) as e:
-                    texto = "N/A"
-                    print(f"[{contador_global}/{total_filas}] No se pudo extraer texto de: {enlace[:40]}... Error: {e.__class__.__name__}")
-                except Exception as e:
-                    texto = "N/A"
-                    print(f"[{contador_global}/{total_filas}] Error desconocido en {enlace[:40]}... Error: {e.__class__.__name__}")
-            
-            # --- ALMACENAR EN EL BUFFER ---
-            comentarios_buffer.append({
-                "candidato": fila.get("candidato", ""),
-                "enlace_limpio": fila.get("enlace_limpio", ""),
-                "usuario": fila.get("usuario", ""),
-                "fecha": fila.get("fecha", ""),
-                "texto": fila.get("texto", ""),
-                "enlace_comentario_limpio": fila.get("enlace_comentario_limpio", ""),
-                "texto_comentario": texto
-            })
-            
-            # --- PAUSA Y GUARDADO ITERATIVO ---
-            if contador_global % 40 == 0:
-                
-                # 1. Guardar el buffer en el archivo
-                # Determinar si el archivo ya existe para saber si escribir encabezado
-                escribir_encabezado = not os.path.exists(ruta_salida)
-                
-                # 'a' = append (añadir al final)
-                with open(ruta_salida, mode='a', newline='', encoding='utf-8') as archivo_out:
-                    writer = csv.DictWriter(archivo_out, fieldnames=FIELDNAMES)
-                    
-                    if escribir_encabezado:
-                        writer.writeheader()
-                        
-                    writer.writerows(comentarios_buffer)
-                
-                print(f"Guardado parcial de {len(comentarios_buffer)} filas en {ruta_salida}.")
-                
-                # 2. Limpiar el buffer
-                comentarios_buffer = [] 
-                
-                print(f"Se han minado {contador_global} comentarios en total. Esperando 10 minutos.")
-                time.sleep(600) 
-
-        # Si quedan elementos en el buffer al final del archivo, guárdalos
-        if comentarios_buffer:
-            escribir_encabezado = not os.path.exists(ruta_salida)
-            with open(ruta_salida, mode='a', newline='', encoding='utf-8') as archivo_out:
-                writer = csv.DictWriter(archivo_out, fieldnames=FIELDNAMES)
-                if escribir_encabezado:
-                    writer.writeheader()
-                writer.writerows(comentarios_buffer)
-                
-            print(f"\nGuardado final de {len(comentarios_buffer)} filas restantes en {ruta_salida}.")
-        
-        print(f"\n--- Archivo {archivo} completado. Total global minado: {contador_global} ---")
\ No newline at end of file
+
+    try:
+        for archivo in archivos:
+            ruta_csv = os.path.join(carpeta_entrada, archivo)
+            nombre_candidato = archivo.replace("_enlaces_comentarios.csv", "")
+            ruta_salida = os.path.join(carpeta_salida, f"{nombre_candidato}_datos_completos.csv")
+
+            try:
+                df = pd.read_csv(ruta_csv)
+            except Exception as e:
+                print(f"Error al leer {ruta_csv}: {e}")
+                continue
+
+            filas = [fila for i, fila in df.iterrows() if not (limite and i >= limite)]
+            total_filas = len(df)
+            # Filas ya agregadas a la salida en ejecuciones anteriores
+            agregadas = set(estado.resultado("archivo_comentarios", ruta_salida) or []) if estado else set()
+            if agregadas:
+                filas = [fila for fila in filas if clave_fila(fila) not in agregadas]
+                print(f"Ya agregadas a {ruta_salida}: {total_filas - len(filas)} filas de {archivo}")
+                if not filas:
+                    continue
+            print(f"\n--- Procesando archivo: {archivo} ({len(filas)} de {total_filas} comentarios/filas) ---")
+
+            escritor = EscritorParcial(ruta_salida, FIELDNAMES, modo="a")
+            escritas = set()
+
+            def guardar(orden, fila, texto):
+                escritas.add(clave_fila(fila))
+                escritor.agregar(orden, {
+                    "candidato": fila.get("candidato", ""),
+                    "enlace_limpio": fila.get("enlace_limpio", ""),
+                    "usuario": fila.get("usuario", ""),
+                    "fecha": fila.get("fecha", ""),
+                    "texto": fila.get("texto", ""),
+                    "enlace_comentario_limpio": fila.get("enlace_comentario_limpio", ""),
+                    "texto_comentario": texto
+                })
+
+            # Las filas sin enlace válido se guardan sin visitar (texto vacío). Un mismo
+            # comentario se visita una sola vez y su texto se usa en todas sus filas.
+            filas_por_comentario = {}
+            visitas = []
+            for orden, fila in enumerate(filas):
+                enlace = fila.get("enlace_comentario_limpio", None)
+                if pd.isna(enlace) or not isinstance(enlace, str) or not enlace.startswith("http"):
+                    guardar(orden, fila, None)
+                    continue
+                texto = estado.resultado("texto_comentario", enlace) if estado else None
+                if texto is not None:
+                    guardar(orden, fila, texto)
+                    continue
+                if estado and not estado.pendiente("texto_comentario", enlace):
+                    guardar(orden, fila, "N/A")  # agotó sus intentos en ejecuciones anteriores
+                    continue
+                clave = id_tweet(enlace) or enlace
+                if clave not in filas_por_comentario:
+                    filas_por_comentario[clave] = []
+                    visitas.append(enlace)
+                filas_por_comentario[clave].append((orden, fila))
+
+            def trabajo(d, enlace):
+                return visitar_comentario(d, enlace, espera)
+
+            def al_terminar(_, enlace, texto):
+                if texto is None:
+                    print(f"No se pudo extraer texto de: {enlace[:40]}...")
+                    if estado:
+                        estado.marcar_error("texto_comentario", enlace, "sin texto")
+                        if estado.pendiente("texto_comentario", enlace):
+                            return  # sus filas se agregan cuando se extraiga o agote sus intentos
+                else:
+                    print(f"Extraído: {enlace[:40]}...")
+                    if estado:
+                        estado.guardar("texto_comentario", enlace, texto)
+                for orden, fila in filas_por_comentario[id_tweet(enlace) or enlace]:
+                    guardar(orden, fila, texto if texto is not None else "N/A")
+
+            reporte = pool.procesar(visitas, trabajo, al_terminar)
+            total = escritor.finalizar()
+            if estado:
+                agregadas.update(escritas)
+                estado.guardar("archivo_comentarios", ruta_salida, sorted(agregadas))
+            contador_global += total
+            print(f"\nGuardadas {total} filas en {ruta_salida} ({reporte['paginas_por_min']} páginas/min).")
+            print(f"\n--- Archivo {archivo} completado. Total global minado: {contador_global} ---")
+    finally:
+        pool.cerrar()
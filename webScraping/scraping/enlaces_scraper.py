@@ -47,7 +47,7 @@ Extrae enlaces de publicaciones de X (Twitter) para un conjunto de candidatos y
 Guarda los resultados en archivos CSV dentro de datasets/raw/enlaces_candidatos.
 """
 
-def guardar_enlaces_candidatos(driver, candidatos_presidenciales_2025, palabras_clave):
+def guardar_enlaces_candidatos(driver, candidatos_presidenciales_2025, palabras_clave, estado=None):
     """
     Ejecuta el scraping de enlaces de publicaciones de Twitter (X) para varios candidatos y palabras clave.
     Guarda los resultados en la carpeta datasets/raw/enlaces_candidatos.
@@ -58,6 +58,8 @@ def guardar_enlaces_candidatos(driver, candidatos_presidenciales_2025, palabras_
         correo (str): Correo de recuperación/verificación.
         candidatos_presidenciales_2025 (list): Lista de nombres de candidatos.
         palabras_clave (list): Lista de palabras clave.
+        estado (EstadoScraping): Opcional. Las búsquedas ya hechas se toman de ahí sin
+            volver a scrollear, y se registra qué tweets encuentra cada búsqueda.
     """
 
     # Crear carpeta dentro de datasets/raw/enlaces_publicaciones
@@ -73,6 +75,8 @@ def guardar_enlaces_candidatos(driver, candidatos_presidenciales_2025, palabras_
         nombre_archivo = f"{limpiar_nombre_archivo(candidato)}_enlaces_tweets.csv"
         ruta_archivo = os.path.join(carpeta_salida, nombre_archivo)
 
+        buscados = False
+
         # Crear y escribir encabezado del CSV
         with open(ruta_archivo, mode="w", newline="", encoding="utf-8") as archivo_csv:
             writer = csv.writer(archivo_csv)
@@ -81,7 +85,14 @@ def guardar_enlaces_candidatos(driver, candidatos_presidenciales_2025, palabras_
             # Recorrer las palabras clave
             for palabra in palabras_clave:
                 query = f'{candidato} {palabra}'
-                enlaces = scrapear_enlaces_tweets_scroll_incremental(driver, query, scrolls=25)
+                enlaces = estado.resultado("busqueda", query) if estado else None
+                if enlaces is None:
+                    enlaces = scrapear_enlaces_tweets_scroll_incremental(driver, query, scrolls=25)
+                    buscados = True
+                    if estado:
+                        estado.guardar("busqueda", query, enlaces)
+                        nuevos = estado.registrar_enlaces(enlaces, origen=query)
+                        print(f"  {nuevos} tweets no encontrados por búsquedas anteriores")
 
                 # Escribir los enlaces obtenidos
                 for enlace in enlaces:
@@ -90,6 +101,8 @@ def guardar_enlaces_candidatos(driver, candidatos_presidenciales_2025, palabras_
                     writer.writerow([candidato, palabra, enlace_original, enlace_limpio])
 
         print(f"Guardado: {ruta_archivo}")
+        if not buscados:
+            continue  # todas las búsquedas venían del estado: no hace falta pausar
         pausa = 420 + random.uniform(-30, 30)
         print(f" - Pausa de {pausa/60:.1f} minutos antes del siguiente candidato...")
         time.sleep(pausa)
@@ -11,17 +11,23 @@ Incluye:
 - Métricas de rendimiento
 """
 
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from core.utils import limpiar_nombre_archivo
+from scraping.extraccion_viewport import ExtractorViewport
 import time
 import csv
 import os
 import random
 from datetime import datetime
 
+# Articles de los resultados de búsqueda (el que funcionó se recuerda entre queries)
+EXTRACTOR_BUSQUEDA = ExtractorViewport([
+    "article[role='article']",
+    "article[data-testid='tweet']",
+])
+
 
 def scrapear_enlaces_tweets_mejorado(
     driver, 
@@ -37,7 +43,8 @@ def scrapear_enlaces_tweets_mejorado(
     Mejoras vs versión original:
     - Pausas aleatorias (más humano)
     - Detección automática de fin de contenido
-    - Múltiples selectores CSS/XPath
+    - Múltiples selectores CSS (recuerda el que funcionó), evaluados en un
+      solo execute_script por scroll
     - Métricas de rendimiento
     
     Args:
@@ -72,48 +79,15 @@ def scrapear_enlaces_tweets_mejorado(
     scrolls_realizados = 0
     fin_detectado = False
     
-    # Selectores múltiples para robustez
-    selectores_tweets = [
-        (By.CSS_SELECTOR, "article[role='article']"),
-        (By.CSS_SELECTOR, "article[data-testid='tweet']"),
-        (By.XPATH, "//article[@data-testid='tweet']"),
-    ]
-    
     for i in range(max_scrolls):
         scrolls_realizados = i + 1
         cantidad_antes = len(enlaces)
         
-        # Extraer enlaces de tweets visibles
-        tweets = []
-        for selector_type, selector in selectores_tweets:
-            try:
-                tweets = driver.find_elements(selector_type, selector)
-                if tweets:
-                    break
-            except:
-                continue
-        
-        # Procesar cada tweet
-        for tweet in tweets:
-            try:
-                # Buscar enlaces a status
-                link_elems = tweet.find_elements(By.XPATH, ".//a[contains(@href, '/status/')]")
-                for link in link_elems:
-                    try:
-                        href = link.get_attribute("href")
-                        if href and '/status/' in href:
-                            # Normalizar URL
-                            if href.startswith("/"):
-                                href = "https://twitter.com" + href
-                            # Limpiar parámetros
-                            href = href.split('?')[0]
-                            enlaces.add(href)
-                    except StaleElementReferenceException:
-                        continue
-            except StaleElementReferenceException:
-                continue
-            except Exception:
-                continue
+        # Extraer enlaces de tweets visibles (una sola llamada al driver)
+        try:
+            enlaces.update(EXTRACTOR_BUSQUEDA.enlaces(driver))
+        except Exception as e:
+            print(f"  Scroll #{i+1}: no se pudo leer la página ({e.__class__.__name__})")
         
         # Verificar progreso
         nuevos = len(enlaces) - cantidad_antes
@@ -161,7 +135,8 @@ def guardar_enlaces_candidatos_mejorado(
     pausa_entre_queries_min: float = 10.0,
     pausa_entre_queries_max: float = 20.0,
     pausa_entre_candidatos_min: float = 300.0,
-    pausa_entre_candidatos_max: float = 480.0
+    pausa_entre_candidatos_max: float = 480.0,
+    estado=None
 ) -> dict:
     """
     Guarda enlaces de publicaciones para múltiples candidatos y palabras clave.
@@ -180,6 +155,9 @@ def guardar_enlaces_candidatos_mejorado(
         max_scrolls: Máximo de scrolls por query
         pausa_entre_queries_min/max: Rango de pausa entre queries (segundos)
         pausa_entre_candidatos_min/max: Rango de pausa entre candidatos (segundos)
+        estado: EstadoScraping opcional. Las queries ya hechas se toman de ahí sin volver
+            a scrollear (retoma una ejecución interrumpida) y se registra qué tweets
+            encuentra cada query para contar los repetidos entre queries.
         
     Returns:
         dict: Métricas de rendimiento del scraping completo
@@ -195,6 +173,7 @@ def guardar_enlaces_candidatos_mejorado(
         'candidatos_procesados': 0,
         'total_enlaces': 0,
         'total_queries': 0,
+        'enlaces_nuevos': 0,
         'tiempo_total_segundos': 0,
         'detalles_candidatos': []
     }
@@ -226,6 +205,7 @@ def guardar_enlaces_candidatos_mejorado(
         }
         
         tiempo_inicio_candidato = time.time()
+        queries_scrapeadas = 0
         
         # Abrir archivo y escribir encabezado
         with open(ruta_archivo, mode="w", newline="", encoding="utf-8") as archivo_csv:
@@ -237,12 +217,24 @@ def guardar_enlaces_candidatos_mejorado(
                 
                 print(f"\n  Query {idx_palabra + 1}/{len(palabras_clave)}: '{query}'")
                 
-                # Ejecutar scraping mejorado
-                resultado = scrapear_enlaces_tweets_mejorado(
-                    driver, 
-                    query, 
-                    max_scrolls=max_scrolls
-                )
+                # Query ya hecha en una ejecución anterior
+                enlaces_guardados = estado.resultado("busqueda", query) if estado else None
+                if enlaces_guardados is not None:
+                    resultado = {'enlaces': enlaces_guardados, 'total': len(enlaces_guardados)}
+                    print(f"    Tomada del estado: {resultado['total']} enlaces")
+                else:
+                    # Ejecutar scraping mejorado
+                    resultado = scrapear_enlaces_tweets_mejorado(
+                        driver, 
+                        query, 
+                        max_scrolls=max_scrolls
+                    )
+                    queries_scrapeadas += 1
+                    if estado:
+                        estado.guardar("busqueda", query, resultado['enlaces'])
+                        nuevos = estado.registrar_enlaces(resultado['enlaces'], origen=query)
+                        metricas_globales['enlaces_nuevos'] += nuevos
+                        print(f"    {nuevos} tweets no encontrados por queries anteriores")
                 
                 # Guardar enlaces inmediatamente (incremental)
                 for enlace in resultado['enlaces']:
@@ -257,8 +249,8 @@ def guardar_enlaces_candidatos_mejorado(
                 metricas_candidato['queries_procesadas'] += 1
                 metricas_globales['total_queries'] += 1
                 
-                # Pausa entre queries (excepto la última)
-                if idx_palabra < len(palabras_clave) - 1:
+                # Pausa entre queries (excepto la última y las tomadas del estado)
+                if idx_palabra < len(palabras_clave) - 1 and enlaces_guardados is None:
                     pausa = random.uniform(pausa_entre_queries_min, pausa_entre_queries_max)
                     print(f"    Pausa de {pausa:.1f}s antes de siguiente query...")
                     time.sleep(pausa)
@@ -275,8 +267,8 @@ def guardar_enlaces_candidatos_mejorado(
         print(f"  >> Total enlaces: {metricas_candidato['enlaces_totales']}")
         print(f"  >> Tiempo: {metricas_candidato['tiempo_segundos']}s")
         
-        # Pausa entre candidatos (excepto el último)
-        if idx_candidato < len(candidatos) - 1:
+        # Pausa entre candidatos (excepto el último o si no se scrapeó ninguna query)
+        if idx_candidato < len(candidatos) - 1 and queries_scrapeadas:
             pausa = random.uniform(pausa_entre_candidatos_min, pausa_entre_candidatos_max)
             print(f"\n  Pausa de {pausa/60:.1f} minutos antes del siguiente candidato...")
             time.sleep(pausa)
@@ -0,0 +1,110 @@
+"""
+Módulo: extraccion_viewport
+---------------------------
+
+Extracción de los tweets cargados en pantalla con una sola llamada a execute_script.
+
+Los scrapers con scroll recorrían cada article y cada enlace con find_elements y
+get_attribute: una llamada al driver por elemento, varios selectores probados en
+cada scroll y errores StaleElementReference cuando X re-renderizaba la lista. El
+script de este módulo lee todo en el navegador y devuelve un único JSON con, por
+cada article, sus enlaces a /status/, el texto, el handle (@...) y la fecha.
+
+X virtualiza el timeline (solo mantiene en el DOM los tweets cercanos a la
+pantalla), así que los articles del DOM son los del viewport.
+
+ExtractorViewport recuerda el selector de articles que funcionó la última vez y
+lo prueba primero en las siguientes llamadas.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+SCRIPT_VIEWPORT = """
+const selectores = arguments[0];
+const preferido = arguments[1];
+const orden = preferido ? [preferido].concat(selectores.filter(s => s !== preferido)) : selectores;
+
+let selector = null;
+let articulos = [];
+for (const s of orden) {
+    const encontrados = document.querySelectorAll(s);
+    if (encontrados.length) {
+        selector = s;
+        articulos = Array.from(encontrados);
+        break;
+    }
+}
+
+const datos = articulos.map(articulo => {
+    const enlaces = Array.from(articulo.querySelectorAll('a[href*="/status/"]'))
+        .map(a => a.href)
+        .filter(href => href);
+
+    let usuario = null;
+    const contenedor = articulo.querySelector('div[data-testid="User-Name"]');
+    if (contenedor) {
+        for (const span of contenedor.querySelectorAll('span')) {
+            const propio = Array.from(span.childNodes)
+                .filter(n => n.nodeType === 3)
+                .map(n => n.textContent)
+                .join('');
+            if (propio.startsWith('@')) {
+                usuario = span.textContent;
+                break;
+            }
+        }
+    }
+
+    const tiempo = articulo.querySelector('time');
+    const texto = articulo.querySelector('div[data-testid="tweetText"]');
+    return {
+        enlaces: enlaces,
+        usuario: usuario,
+        fecha: tiempo ? tiempo.getAttribute('datetime') : null,
+        texto: texto ? texto.textContent : null
+    };
+});
+
+return JSON.stringify({selector: selector, articulos: datos});
+"""
+
+
+def normalizar_enlace(href: str) -> str:
+    """URL absoluta de twitter.com sin parámetros (como la guardaban los scrapers)."""
+    if href.startswith("/"):
+        href = "https://twitter.com" + href
+    return href.split("?")[0]
+
+
+class ExtractorViewport:
+    """
+    Extrae los tweets en pantalla con SCRIPT_VIEWPORT.
+
+    Args:
+        selectores: Selectores CSS de los articles, en orden de preferencia.
+    """
+
+    def __init__(self, selectores: List[str]):
+        self.selectores = list(selectores)
+        # Selector que encontró articles en la última llamada (se prueba primero)
+        self.selector: Optional[str] = None
+
+    def extraer(self, driver) -> List[Dict[str, Any]]:
+        """
+        Una llamada al driver: lista de dicts con enlaces, usuario, fecha y texto de
+        cada article en pantalla (vacía si ningún selector encuentra articles).
+        """
+        resultado = json.loads(driver.execute_script(SCRIPT_VIEWPORT, self.selectores, self.selector))
+        if resultado["selector"]:
+            self.selector = resultado["selector"]
+        return resultado["articulos"]
+
+    def enlaces(self, driver) -> set:
+        """Enlaces a /status/ normalizados de todos los articles en pantalla."""
+        return {
+            normalizar_enlace(href)
+            for articulo in self.extraer(driver)
+            for href in articulo["enlaces"]
+            if "/status/" in href
+        }
@@ -0,0 +1,60 @@
+"""
+Módulo: parseo_tweets
+---------------------
+
+Extracción de datos de una página de tweet a partir de su HTML (driver.page_source).
+
+Los selectores son los mismos que usaban tweets_scraper y contenido_comentarios_scraper
+con find_element, pero se evalúan sobre el HTML ya descargado: una sola llamada al
+driver por página en lugar de una por elemento, y el parseo se puede probar sin
+navegador con páginas guardadas.
+"""
+
+from typing import Dict, Optional
+
+from bs4 import BeautifulSoup
+
+# Contenedor del nombre y el handle (@...) del autor
+SELECTOR_USUARIO = 'div[data-testid="User-Name"]'
+SELECTOR_FECHA = "time"
+SELECTOR_TEXTO = 'div[data-testid="tweetText"]'
+# Clases del div con el texto del comentario en la página del comentario
+CLASE_COMENTARIO = "css-146c3p1 r-bcqeeo r-1ttztb7 r-qvutc0 r-37j5jr r-1inkyih r-16dba41 r-bnwqim r-135wba7"
+SELECTOR_COMENTARIO = "div." + ".".join(CLASE_COMENTARIO.split())
+
+
+def parsear_tweet(html: str) -> Dict[str, str]:
+    """
+    Usuario, fecha y texto del tweet principal de la página ("N/A" si no se encuentra).
+    """
+    pagina = BeautifulSoup(html, "html.parser")
+
+    usuario = "N/A"
+    contenedor = pagina.select_one(SELECTOR_USUARIO)
+    if contenedor is not None:
+        # Primer span cuyo texto propio empieza con "@" (XPath: .//span[starts-with(text(), "@")])
+        for span in contenedor.find_all("span"):
+            texto_propio = span.find(string=True, recursive=False)
+            if texto_propio and texto_propio.startswith("@"):
+                usuario = span.get_text()
+                break
+
+    fecha_elem = pagina.select_one(SELECTOR_FECHA)
+    fecha = fecha_elem.get("datetime", "N/A") if fecha_elem is not None else "N/A"
+
+    texto_elem = pagina.select_one(SELECTOR_TEXTO)
+    texto = texto_elem.get_text() if texto_elem is not None else "N/A"
+
+    return {"usuario": usuario, "fecha": fecha, "texto": texto}
+
+
+def parsear_texto_comentario(html: str) -> Optional[str]:
+    """
+    Texto del comentario: el de cada elemento dentro del div del comentario unidos con
+    espacios (o el texto del div si no tiene elementos). None si el div no está.
+    """
+    div = BeautifulSoup(html, "html.parser").select_one(SELECTOR_COMENTARIO)
+    if div is None:
+        return None
+    partes = [p.get_text().strip() for p in div.find_all(True)]
+    return " ".join(p for p in partes if p) or div.get_text().strip()
@@ -4,96 +4,114 @@ Módulo: tweets_scraper
 
 Lee los enlaces recolectados por el scraper de enlaces y extrae la información
 de cada tweet (usuario, fecha, texto).
+
+Cada tweet se visita una sola vez aunque lo hayan encontrado varias búsquedas; con un
+EstadoScraping (storage/estado_scraping.py) tampoco se vuelve a visitar en ejecuciones
+posteriores.
 """
 
 import os
-import time
-import csv
-import random
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from core.utils import crear_carpeta_si_no_existe
+from core.pool_drivers import EscritorParcial, LimitadorTasa, PoolDrivers
+from scraping.parseo_tweets import parsear_tweet
+from storage.estado_scraping import id_tweet
+
+CAMPOS = ["candidato", "url", "usuario", "fecha", "texto"]
 
-def extraer_informacion_tweets(driver, carpeta_entrada: str, carpeta_salida: str):
+def visitar_tweet(driver, url: str, espera: float = 10):
+    """
+    Abre el tweet, espera a que cargue (etiqueta <time>) y extrae usuario, fecha y
+    texto del HTML de la página. Lanza TimeoutException si el tweet no carga.
+    """
+    driver.get(url)
+    if espera:
+        WebDriverWait(driver, espera).until(EC.presence_of_element_located((By.TAG_NAME, "time")))
+    return parsear_tweet(driver.page_source)
+
+def extraer_informacion_tweets(
+    driver,
+    carpeta_entrada: str,
+    carpeta_salida: str,
+    crear_driver=None,
+    num_drivers: int = 1,
+    crear_limitador=LimitadorTasa,
+    espera: float = 10,
+    estado=None
+):
     """
     Procesa los archivos de enlaces y extrae información de cada tweet.
 
+    Con num_drivers > 1 los enlaces se reparten entre varios drivers (ver
+    core/pool_drivers.py); cada driver respeta sus propias pausas.
+
     Args:
         driver: Instancia del WebDriver.
         carpeta_entrada (str): Carpeta donde están los CSV de enlaces.
         carpeta_salida (str): Carpeta donde se guardarán los CSV con información.
+        crear_driver: Función indice -> driver con sesión iniciada (con su propio perfil)
+                      para los drivers adicionales.
+        num_drivers (int): Drivers que visitan enlaces a la vez.
+        crear_limitador: Función que devuelve el LimitadorTasa de cada driver.
+        espera (float): Segundos máximos de espera a que cargue cada tweet.
+        estado: EstadoScraping opcional. Los tweets ya extraídos (en esta ejecución o en
+                una anterior interrumpida) se toman de ahí sin volver a visitarlos.
     """
     crear_carpeta_si_no_existe(carpeta_salida)
+    pool = PoolDrivers([driver], crear_driver, num_drivers, crear_limitador)
 
-    for archivo_csv in os.listdir(carpeta_entrada):
-        if not archivo_csv.endswith(".csv"):
-            continue
-
-        nombre_candidato = archivo_csv.replace("_enlaces_tweets.csv", "")
-        path_archivo = os.path.join(carpeta_entrada, archivo_csv)
-        df = pd.read_csv(path_archivo)
-        enlaces = df['enlace_limpio'].dropna().tolist()
-
-        datos_tweets = []
-        contador = 0
-
-        for url in enlaces:
-            try:
-                if "/status/" not in url or "/analytics" in url:
-                    continue
-
-                driver.get(url)
-                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "time")))
-
-                usuario = "N/A"
-                try:
-                    # 1. Buscar el contenedor del nombre de usuario (más estable)
-                    # El 'data-testid="User-Name"' es el contenedor general.
-                    user_container = driver.find_element(By.XPATH, '//div[@data-testid="User-Name"]')
-                    
-                    # 2. Buscar el <span> que contiene el handle (@...) dentro de ese contenedor.
-                    # Usamos un selector XPath que busca cualquier span dentro del contenedor que empiece con '@'.
-                    usuario_elem = user_container.find_element(By.XPATH, './/span[starts-with(text(), "@")]')
-                    
-                    usuario = usuario_elem.text
-                    
-                except NoSuchElementException:
-                    # Si falla, simplemente el usuario es N/A
-                    usuario = "N/A"
-                
-                fecha_elem = driver.find_element(By.TAG_NAME, "time")
-                fecha = fecha_elem.get_attribute("datetime") if fecha_elem else "N/A"
-
-                try:
-                    texto_elem = driver.find_element(By.CSS_SELECTOR, 'div[data-testid="tweetText"]')
-                    texto = texto_elem.text
-                except:
-                    texto = "N/A"
-
-                datos_tweets.append({
-                    "candidato": nombre_candidato,
-                    "url": url,
-                    "usuario": usuario,
-                    "fecha": fecha,
-                    "texto": texto
-                })
-
-                contador += 1
-                time.sleep(random.uniform(5, 10))
-                if contador % 40 == 0:
-                    time.sleep(600)
-
-            except Exception as e:
-                print(f"Error en {url}: {e}")
+    try:
+        for archivo_csv in os.listdir(carpeta_entrada):
+            if not archivo_csv.endswith(".csv"):
                 continue
 
-        ruta_salida = os.path.join(carpeta_salida, f"{nombre_candidato}_informacion_tweets.csv")
-        with open(ruta_salida, mode='w', newline='', encoding='utf-8') as archivo_out:
-            writer = csv.DictWriter(archivo_out, fieldnames=["candidato", "url", "usuario", "fecha", "texto"])
-            writer.writeheader()
-            writer.writerows(datos_tweets)
-
-        print(f"Guardado: {ruta_salida}")
+            nombre_candidato = archivo_csv.replace("_enlaces_tweets.csv", "")
+            path_archivo = os.path.join(carpeta_entrada, archivo_csv)
+            df = pd.read_csv(path_archivo)
+            enlaces = df['enlace_limpio'].dropna().tolist()
+            urls = [url for url in enlaces if "/status/" in url and "/analytics" not in url]
+
+            # Cada tweet se guarda en un .parcial en cuanto se extrae; al final se escribe
+            # la salida en el orden de los enlaces
+            ruta_salida = os.path.join(carpeta_salida, f"{nombre_candidato}_informacion_tweets.csv")
+            escritor = EscritorParcial(ruta_salida, CAMPOS)
+
+            def escribir(orden, url, datos):
+                escritor.agregar(orden, {"candidato": nombre_candidato, "url": url, **datos})
+
+            # Un tweet repetido (misma ID en varias búsquedas) se visita una vez y
+            # todas sus filas reciben el mismo resultado
+            filas_por_tweet = {}
+            visitas = []
+            for orden, url in enumerate(urls):
+                guardado = estado.resultado("tweet", url) if estado else None
+                if guardado is not None:
+                    escribir(orden, url, guardado)
+                    continue
+                if estado and not estado.pendiente("tweet", url):
+                    continue  # agotó sus intentos en ejecuciones anteriores
+                clave = id_tweet(url) or url
+                if clave not in filas_por_tweet:
+                    filas_por_tweet[clave] = []
+                    visitas.append(url)
+                filas_por_tweet[clave].append((orden, url))
+            print(f"{nombre_candidato}: {len(urls)} enlaces, {len(visitas)} tweets por visitar")
+
+            def guardar(_, url, datos):
+                if estado:
+                    if datos is None:
+                        estado.marcar_error("tweet", url, "no cargó")
+                    else:
+                        estado.guardar("tweet", url, datos)
+                if datos is not None:
+                    for orden, url_fila in filas_por_tweet[id_tweet(url) or url]:
+                        escribir(orden, url_fila, datos)
+
+            reporte = pool.procesar(visitas, lambda d, url: visitar_tweet(d, url, espera), guardar)
+            total = escritor.finalizar()
+            print(f"Guardado: {ruta_salida} ({total} tweets, {reporte['paginas_por_min']} páginas/min)")
+    finally:
+        pool.cerrar()
@@ -0,0 +1,170 @@
+"""
+Estado del scraping en SQLite: qué se visitó ya, con qué resultado, y desde qué
+búsqueda o publicación se encontró cada tweet.
+
+Cada visita se guarda por (clave, etapa):
+- La clave de un tweet es su ID canónico (el número de /status/<id>), así que
+  twitter.com/x.com, /analytics, /photo/1 o ?s=20 apuntan al mismo tweet y un
+  tweet encontrado por varias búsquedas se visita una sola vez.
+- Las búsquedas usan la propia query como clave.
+- Etapas que usan los scrapers: "busqueda" (enlaces de una query), "tweet"
+  (usuario, fecha y texto), "enlaces_comentarios" (enlaces de las respuestas de una
+  publicación) y "texto_comentario" (texto de una respuesta).
+
+Si un scraper se interrumpe, al volver a ejecutarlo con el mismo estado reutiliza
+los resultados guardados y solo visita lo que falta (los errores se reintentan
+hasta max_intentos veces).
+
+Uso:
+
+    estado = EstadoScraping("datasets/estado_scraping.sqlite")
+    extraer_informacion_tweets(driver, entrada, salida, estado=estado)
+"""
+
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+_ID_TWEET = re.compile(r"/status(?:es)?/(\d+)")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS visitas (
+    clave TEXT NOT NULL,
+    etapa TEXT NOT NULL,
+    url TEXT,
+    estado TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    resultado TEXT,
+    error TEXT,
+    actualizado TEXT,
+    PRIMARY KEY (clave, etapa)
+);
+CREATE TABLE IF NOT EXISTS descubrimientos (
+    id_tweet TEXT NOT NULL,
+    origen TEXT NOT NULL,
+    url TEXT,
+    PRIMARY KEY (id_tweet, origen)
+);
+"""
+
+
+def id_tweet(url: Any) -> Optional[str]:
+    """ID canónico del tweet de una URL de /status/, o None si no es una URL de tweet."""
+    if not isinstance(url, str):
+        return None
+    coincidencia = _ID_TWEET.search(url)
+    return coincidencia.group(1) if coincidencia else None
+
+
+class EstadoScraping:
+    """
+    Estado del scraping guardado en un archivo SQLite. Es seguro entre hilos (los
+    drivers de un PoolDrivers escriben a la vez) y cada escritura se confirma de
+    inmediato, así que una caída no pierde lo ya visitado.
+    """
+
+    def __init__(self, ruta: str, max_intentos: int = 3):
+        self.ruta = ruta
+        self.max_intentos = max_intentos
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(ESQUEMA)
+
+    @staticmethod
+    def clave(valor: str) -> str:
+        """ID del tweet si valor es una URL de tweet; si no (p. ej. una query), el propio valor."""
+        return id_tweet(valor) or valor
+
+    # ----------------------------------------------------------------------------------
+    # Visitas
+    # ----------------------------------------------------------------------------------
+    def resultado(self, etapa: str, valor: str) -> Optional[Any]:
+        """Resultado guardado de una visita exitosa, o None si aún no se hizo."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT resultado FROM visitas WHERE clave = ? AND etapa = ? AND estado = 'ok'",
+                (self.clave(valor), etapa),
+            ).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def pendiente(self, etapa: str, valor: str) -> bool:
+        """True si la visita no tiene resultado y no agotó sus intentos."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT estado, intentos FROM visitas WHERE clave = ? AND etapa = ?", (self.clave(valor), etapa)
+            ).fetchone()
+        return fila is None or (fila[0] != "ok" and fila[1] < self.max_intentos)
+
+    def guardar(self, etapa: str, valor: str, resultado: Any) -> None:
+        """Registra una visita exitosa con su resultado (serializable a JSON)."""
+        self._escribir(
+            """
+            INSERT INTO visitas (clave, etapa, url, estado, intentos, resultado, error, actualizado)
+            VALUES (?, ?, ?, 'ok', 1, ?, NULL, ?)
+            ON CONFLICT(clave, etapa) DO UPDATE SET
+                estado = 'ok', intentos = intentos + 1, resultado = excluded.resultado,
+                error = NULL, actualizado = excluded.actualizado
+            """,
+            (self.clave(valor), etapa, valor, json.dumps(resultado, ensure_ascii=False), _ahora()),
+        )
+
+    def marcar_error(self, etapa: str, valor: str, error: Any) -> None:
+        """Registra un intento fallido (se reintenta hasta max_intentos)."""
+        self._escribir(
+            """
+            INSERT INTO visitas (clave, etapa, url, estado, intentos, error, actualizado)
+            VALUES (?, ?, ?, 'error', 1, ?, ?)
+            ON CONFLICT(clave, etapa) DO UPDATE SET
+                estado = 'error', intentos = intentos + 1, error = excluded.error, actualizado = excluded.actualizado
+            """,
+            (self.clave(valor), etapa, valor, str(error), _ahora()),
+        )
+
+    # ----------------------------------------------------------------------------------
+    # Descubrimientos (deduplicación global)
+    # ----------------------------------------------------------------------------------
+    def registrar_enlaces(self, urls: Iterable[str], origen: str) -> int:
+        """
+        Registra los tweets encontrados por una búsqueda o publicación (origen) y
+        devuelve cuántos no se habían encontrado antes desde ningún origen.
+        """
+        filas = {(id_tweet(url), url) for url in urls if id_tweet(url)}
+        with self._lock:
+            nuevos = 0
+            for id_, url in filas:
+                visto = self._conexion.execute("SELECT 1 FROM descubrimientos WHERE id_tweet = ? LIMIT 1", (id_,)).fetchone()
+                nuevos += visto is None
+                self._conexion.execute(
+                    "INSERT OR IGNORE INTO descubrimientos (id_tweet, origen, url) VALUES (?, ?, ?)", (id_, origen, url)
+                )
+            self._conexion.commit()
+        return nuevos
+
+    def resumen(self) -> Dict[str, Dict[str, int]]:
+        """Visitas por etapa y estado, y tweets distintos descubiertos."""
+        with self._lock:
+            filas = self._conexion.execute("SELECT etapa, estado, count(*) FROM visitas GROUP BY etapa, estado").fetchall()
+            descubiertos = self._conexion.execute("SELECT count(DISTINCT id_tweet) FROM descubrimientos").fetchone()[0]
+        resumen: Dict[str, Dict[str, int]] = {}
+        for etapa, estado, cantidad in filas:
+            resumen.setdefault(etapa, {})[estado] = cantidad
+        resumen["descubiertos"] = {"tweets": descubiertos}
+        return resumen
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+    def _escribir(self, sql: str, parametros: tuple) -> None:
+        with self._lock:
+            self._conexion.execute(sql, parametros)
+            self._conexion.commit()
+
+
+def _ahora() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
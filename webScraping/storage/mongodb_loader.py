@@ -1,86 +1,140 @@
-from pymongo import MongoClient
-import json
+from pymongo import MongoClient, UpdateOne
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
 from dotenv import load_dotenv
 
-def cargar_json_a_mongo(ruta_json, collection_name=None):
+from .publicaciones_json import fecha_publicacion, leer_publicaciones
+
+# Colección <coleccion>_version: contador de cargas que cambiaron datos. El backend lo
+# usa en la firma del corpus (CorpusMongo.firma) para detectar publicaciones actualizadas.
+SUFIJO_VERSION = "_version"
+
+
+def _filtro_upsert(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Asumimos que 'id_post' es el identificador único del post
+    if "id_post" in doc:
+        return {"id_post": doc["id_post"]}
+    # Fallback simple si no hay id_post (aunque el script de transformación lo genera)
+    return {"candidato": doc.get("candidato"), "texto": doc.get("texto")}
+
+
+def cargar_publicaciones_a_mongo(
+    publicaciones: Iterable[Dict[str, Any]],
+    collection,
+    tamano_lote: int = 1000,
+    hilos: int = 1
+) -> Dict[str, Any]:
+    """
+    Inserta/actualiza publicaciones en una colección con bulk_write no ordenados de
+    UpdateOne(upsert=True) basados en id_post. Las publicaciones se consumen en lotes,
+    así que pueden venir de un generador (leer_publicaciones o el pipeline de
+    preprocesamiento) sin tenerlas todas en memoria.
+
+    Cada documento se guarda además con fecha_ts (la fecha parseada, o null si no es
+    válida), que el backend usa para filtrar por rango de fechas con un índice. Si la
+    carga agregó o modificó documentos se incrementa el contador de la colección
+    <coleccion>_version, así el backend nota también las publicaciones actualizadas
+    (p. ej. con comentarios nuevos).
+
+    Args:
+        publicaciones: Iterable de documentos.
+        collection: Colección de pymongo (o mongomock).
+        tamano_lote (int): Operaciones por bulk_write.
+        hilos (int): Lotes que se envían a la vez (cada lote en flujo ocupa memoria).
+
+    Returns:
+        Dict con documentos, nuevos, actualizados, segundos y docs_por_seg.
+    """
+    collection.create_index("id_post")
+    reporte = {"documentos": 0, "nuevos": 0, "actualizados": 0}
+    inicio = time.perf_counter()
+
+    def sumar(resultado):
+        reporte["nuevos"] += resultado.upserted_count
+        reporte["actualizados"] += resultado.modified_count
+
+    def lotes():
+        lote: List[UpdateOne] = []
+        for doc in publicaciones:
+            documento = {**doc, "fecha_ts": fecha_publicacion(doc)}
+            lote.append(UpdateOne(_filtro_upsert(doc), {"$set": documento}, upsert=True))
+            if len(lote) >= tamano_lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as executor:
+        pendientes = []
+        for lote in lotes():
+            pendientes.append(executor.submit(collection.bulk_write, lote, ordered=False))
+            reporte["documentos"] += len(lote)
+            # Como mucho `hilos` lotes en vuelo: se espera al más antiguo antes de leer más
+            if len(pendientes) >= max(1, hilos):
+                sumar(pendientes.pop(0).result())
+                print(f"   - Procesados {reporte['documentos']}...")
+        for pendiente in pendientes:
+            sumar(pendiente.result())
+
+    if reporte["nuevos"] or reporte["actualizados"]:
+        collection.database[collection.name + SUFIJO_VERSION].update_one(
+            {"_id": "corpus"}, {"$inc": {"cargas": 1}}, upsert=True
+        )
+
+    segundos = time.perf_counter() - inicio
+    reporte["segundos"] = round(segundos, 3)
+    reporte["docs_por_seg"] = round(reporte["documentos"] / segundos, 1) if segundos else None
+    return reporte
+
+
+def cargar_json_a_mongo(ruta_json, collection_name=None, tamano_lote=1000, hilos=1):
     """
     Carga los datos de un archivo JSON a una colección de MongoDB.
     Usa la variable de entorno MONGO_URI para la conexión.
-    
+
     Args:
         ruta_json (str): Ruta al archivo JSON (ej: 'datasets/processed/corpus_completo.json')
         collection_name (str, optional): Nombre de la colección. Si es None, se lee de MONGO_COLLECTION_NAME.
+        tamano_lote (int): Documentos por bulk_write.
+        hilos (int): Lotes que se envían a la vez.
     """
     # 1. Cargar variables de entorno
     load_dotenv()
     mongo_uri = os.getenv("MONGO_URI")
     db_name = os.getenv("MONGO_DB_NAME", "tesis_analisis_sentimiento")
-    
+
     # Obtener nombre de colección desde env si no se pasa explícitamente
     if collection_name is None:
         collection_name = os.getenv("MONGO_COLLECTION_NAME", "corpus_politico")
-    
+
     if not mongo_uri:
         print("- Error: No se encontró la variable MONGO_URI en el archivo .env")
         return
 
+    # 2. Verificar archivo JSON
+    if not os.path.exists(ruta_json):
+        print(f"- Error: El archivo {ruta_json} no existe.")
+        return
+
     try:
-        # 2. Conectar a MongoDB
+        # 3. Conectar a MongoDB
         client = MongoClient(mongo_uri)
-        db = client[db_name]
-        collection = db[collection_name]
-        
+        collection = client[db_name][collection_name]
         print(f"- Conectado a MongoDB: {db_name}.{collection_name}")
 
-        # 3. Leer archivo JSON
-        if not os.path.exists(ruta_json):
-            print(f"- Error: El archivo {ruta_json} no existe.")
-            return
-
-        with open(ruta_json, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if not isinstance(data, list):
-            print("- Advertencia: El JSON no es una lista de objetos. Se intentará insertar como un solo documento.")
-            data = [data]
-
-        total_docs = len(data)
-        print(f"- Archivo leído. Preparando para procesar {total_docs} documentos...")
-
-        # 4. Insertar/Actualizar documentos (Upsert basado en id_post)
-        operaciones = 0
-        modificados = 0
-        nuevos = 0
-
-        for doc in data:
-            # Asumimos que 'id_post' es el identificador único del post
-            # Si no existe, usamos una combinación de candidato+usuario+fecha o generamos un hash
-            filtro = {}
-            if "id_post" in doc:
-                filtro = {"id_post": doc["id_post"]}
-            else:
-                # Fallback simple si no hay id_post (aunque el script de transformación lo genera)
-                filtro = {"candidato": doc.get("candidato"), "texto": doc.get("texto")}
-
-            # Upsert: Actualiza si existe, Inserta si no
-            resultado = collection.update_one(filtro, {"$set": doc}, upsert=True)
-            
-            if resultado.upserted_id:
-                nuevos += 1
-            elif resultado.modified_count > 0:
-                modificados += 1
-            
-            operaciones += 1
-            if operaciones % 100 == 0:
-                print(f"   - Procesados {operaciones}/{total_docs}...")
+        # 4. Insertar/Actualizar documentos por lotes (Upsert basado en id_post)
+        reporte = cargar_publicaciones_a_mongo(leer_publicaciones(ruta_json), collection, tamano_lote, hilos)
 
         print(f"\nProceso completado en MongoDB.")
-        print(f" - Documentos nuevos: {nuevos}")
-        print(f" - Documentos actualizados: {modificados}")
-        print(f" - Total en colección: {collection.count_documents({})}")
+        print(f" - Documentos procesados: {reporte['documentos']} ({reporte['docs_por_seg']} docs/seg)")
+        print(f" - Documentos nuevos: {reporte['nuevos']}")
+        print(f" - Documentos actualizados: {reporte['actualizados']}")
+        print(f" - Total en colección (estimado): {collection.estimated_document_count()}")
 
         client.close()
+        return reporte
 
     except Exception as e:
         print(f"Error crítico en la carga a MongoDB: {e}")
@@ -0,0 +1,56 @@
+"""
+Lectura en flujo del corpus JSON que generan reestructurar_csv_a_json y el pipeline
+de preprocesamiento; la usan los cargadores de MongoDB y SQLite.
+"""
+
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+# Caracteres que se leen del archivo JSON en cada lectura
+CARACTERES_POR_LECTURA = 1 << 20
+_ESPACIOS = re.compile(r"[\s,]*")
+
+
+def leer_publicaciones(ruta_json: str) -> Iterator[Dict[str, Any]]:
+    """
+    Lee las publicaciones de un archivo JSON de una en una, sin cargar el archivo completo.
+
+    Acepta un arreglo JSON (con cualquier formato, p. ej. indent=4 o una publicación por
+    línea) o NDJSON (un objeto por línea). Un objeto suelto se devuelve como una sola publicación.
+    """
+    decodificador = json.JSONDecoder()
+    with open(ruta_json, "r", encoding="utf-8") as f:
+        buffer = f.read(CARACTERES_POR_LECTURA).lstrip()
+        es_arreglo = buffer.startswith("[")
+        posicion = 1 if es_arreglo else 0
+        fin_archivo = False
+        while True:
+            # Saltar espacios y la coma entre elementos del arreglo
+            posicion = _ESPACIOS.match(buffer, posicion).end()
+            if es_arreglo and buffer.startswith("]", posicion):
+                return
+            try:
+                if posicion == len(buffer):
+                    raise ValueError("buffer vacío")
+                publicacion, posicion = decodificador.raw_decode(buffer, posicion)
+            except ValueError:
+                # Elemento incompleto: se lee otro trozo (y se descarta lo ya procesado)
+                if fin_archivo:
+                    if posicion == len(buffer) and not es_arreglo:
+                        return
+                    raise
+                mas = f.read(CARACTERES_POR_LECTURA)
+                fin_archivo = not mas
+                buffer, posicion = buffer[posicion:] + mas, 0
+                continue
+            yield publicacion
+
+
+def fecha_publicacion(publicacion: Dict[str, Any]) -> Optional[datetime]:
+    """Fecha ISO de la publicación (ej. 2025-01-05T17:57:48.000Z) como datetime, o None si no es válida."""
+    try:
+        return datetime.fromisoformat(publicacion.get("fecha").replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
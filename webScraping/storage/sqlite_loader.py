@@ -0,0 +1,162 @@
+"""
+Carga del corpus JSON a una base SQLite con búsqueda de texto completo (FTS5).
+
+Alternativa a MongoDB para despliegues de un solo nodo: el backend lee la base con
+SENTIVOTE_ALMACENAMIENTO=sqlite (ver backend/corpus_sqlite.py).
+
+Esquema:
+- publicaciones(id_post, candidato, usuario, fecha, fecha_ts, texto), con índice en
+  fecha_ts (microsegundos Unix UTC; NULL si la fecha no es válida).
+- comentarios(id_post, id_comentario, texto_comentario), con índice en id_post.
+- publicaciones_fts: tabla FTS5 sobre candidato y texto con el tokenizador
+  unicode61 remove_diacritics 2 ("gonzalez" encuentra "González"). Se mantiene
+  con triggers, así que las cargas incrementales no reconstruyen el índice.
+
+Uso (desde la raíz del repositorio):
+
+    python -m webScraping.storage.sqlite_loader \
+        webScraping/datasets/processed/corpus_completo.json backend/data/corpus.sqlite
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from .publicaciones_json import fecha_publicacion, leer_publicaciones
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS publicaciones (
+    id_post INTEGER PRIMARY KEY,
+    candidato TEXT,
+    usuario TEXT,
+    fecha TEXT,
+    fecha_ts INTEGER,
+    texto TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_publicaciones_fecha_ts ON publicaciones(fecha_ts);
+
+CREATE TABLE IF NOT EXISTS comentarios (
+    id_post INTEGER NOT NULL,
+    id_comentario INTEGER,
+    texto_comentario TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_comentarios_id_post ON comentarios(id_post);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS publicaciones_fts USING fts5(
+    candidato, texto, content='publicaciones', content_rowid='id_post',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS publicaciones_fts_insertar AFTER INSERT ON publicaciones BEGIN
+    INSERT INTO publicaciones_fts(rowid, candidato, texto) VALUES (new.id_post, new.candidato, new.texto);
+END;
+CREATE TRIGGER IF NOT EXISTS publicaciones_fts_borrar AFTER DELETE ON publicaciones BEGIN
+    INSERT INTO publicaciones_fts(publicaciones_fts, rowid, candidato, texto)
+    VALUES ('delete', old.id_post, old.candidato, old.texto);
+END;
+CREATE TRIGGER IF NOT EXISTS publicaciones_fts_actualizar AFTER UPDATE ON publicaciones BEGIN
+    INSERT INTO publicaciones_fts(publicaciones_fts, rowid, candidato, texto)
+    VALUES ('delete', old.id_post, old.candidato, old.texto);
+    INSERT INTO publicaciones_fts(rowid, candidato, texto) VALUES (new.id_post, new.candidato, new.texto);
+END;
+"""
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def microsegundos_utc(fecha: Optional[datetime]) -> Optional[int]:
+    """Fecha como microsegundos Unix (entero: las comparaciones son exactas)."""
+    if fecha is None:
+        return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return (fecha - _EPOCA) // timedelta(microseconds=1)
+
+
+def crear_esquema(conexion: sqlite3.Connection) -> None:
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.executescript(ESQUEMA)
+
+
+def cargar_publicaciones_a_sqlite(publicaciones: Iterable[Dict[str, Any]], conexion: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    Inserta/actualiza publicaciones (upsert por id_post) en una sola transacción. Una
+    publicación que ya existe se reemplaza junto con sus comentarios. Las publicaciones
+    se consumen de una en una (pueden venir de leer_publicaciones o del pipeline).
+
+    Returns:
+        Dict con documentos, comentarios, segundos y docs_por_seg.
+    """
+    crear_esquema(conexion)
+    reporte = {"documentos": 0, "comentarios": 0}
+    inicio = time.perf_counter()
+
+    with conexion:
+        for post in publicaciones:
+            fila = (
+                post.get("id_post"), post.get("candidato"), post.get("usuario"), post.get("fecha"),
+                microsegundos_utc(fecha_publicacion(post)), post.get("texto"),
+            )
+            cursor = conexion.execute(
+                """
+                INSERT INTO publicaciones (id_post, candidato, usuario, fecha, fecha_ts, texto)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id_post) DO UPDATE SET
+                    candidato = excluded.candidato, usuario = excluded.usuario, fecha = excluded.fecha,
+                    fecha_ts = excluded.fecha_ts, texto = excluded.texto
+                """,
+                fila,
+            )
+            # Sin id_post, SQLite asigna uno nuevo
+            id_post = post.get("id_post", cursor.lastrowid)
+            comentarios = [
+                (id_post, com.get("id_comentario"), com.get("texto_comentario")) for com in post.get("comentarios", [])
+            ]
+            conexion.execute("DELETE FROM comentarios WHERE id_post = ?", (id_post,))
+            conexion.executemany("INSERT INTO comentarios VALUES (?, ?, ?)", comentarios)
+
+            reporte["documentos"] += 1
+            reporte["comentarios"] += len(comentarios)
+            if reporte["documentos"] % 10000 == 0:
+                print(f"   - Procesados {reporte['documentos']}...")
+
+    segundos = time.perf_counter() - inicio
+    reporte["segundos"] = round(segundos, 3)
+    reporte["docs_por_seg"] = round(reporte["documentos"] / segundos, 1) if segundos else None
+    return reporte
+
+
+def cargar_json_a_sqlite(ruta_json: str, ruta_sqlite: str) -> Optional[Dict[str, Any]]:
+    """
+    Carga (o actualiza) la base SQLite del corpus a partir de un archivo JSON
+    generado por reestructurar_csv_a_json_simple o por el pipeline de preprocesamiento.
+    """
+    if not os.path.exists(ruta_json):
+        print(f"- Error: El archivo {ruta_json} no existe.")
+        return None
+    os.makedirs(os.path.dirname(ruta_sqlite) or ".", exist_ok=True)
+
+    conexion = sqlite3.connect(ruta_sqlite)
+    try:
+        reporte = cargar_publicaciones_a_sqlite(leer_publicaciones(ruta_json), conexion)
+        total = conexion.execute("SELECT count(*) FROM publicaciones").fetchone()[0]
+        conexion.execute("PRAGMA optimize")
+    finally:
+        conexion.close()
+
+    print(f"\nProceso completado en SQLite: {ruta_sqlite}")
+    print(f" - Publicaciones procesadas: {reporte['documentos']} ({reporte['docs_por_seg']} docs/seg)")
+    print(f" - Comentarios: {reporte['comentarios']}")
+    print(f" - Total en la base: {total}")
+    return reporte
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga el corpus JSON a una base SQLite con FTS5.")
+    parser.add_argument("ruta_json")
+    parser.add_argument("ruta_sqlite")
+    args = parser.parse_args()
+    cargar_json_a_sqlite(args.ruta_json, args.ruta_sqlite)